@@ -1,6 +1,11 @@
 from django.contrib import admin
 
-from .models import AudioGeneration
+from .models import (
+    AudioGeneration,
+    DescriptionCacheEntry,
+    RouteAudioGuide,
+    TTSCacheEntry,
+)
 
 
 @admin.register(AudioGeneration)
@@ -9,10 +14,67 @@ class AudioGenerationAdmin(admin.ModelAdmin):
         "point",
         "user",
         "status",
+        "attempts",
         "language",
         "voice_type",
         "created_at",
     )
     list_filter = ("status", "language", "voice_type", "created_at")
     search_fields = ("text_content", "point__name")
-    readonly_fields = ("created_at", "completed_at", "processing_time")
+    readonly_fields = (
+        "created_at",
+        "completed_at",
+        "processing_time",
+        "locked_by",
+        "locked_at",
+    )
+
+
+@admin.register(TTSCacheEntry)
+class TTSCacheEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "key",
+        "audio_format",
+        "size",
+        "ref_count",
+        "hits",
+        "last_used_at",
+    )
+    list_filter = ("audio_format",)
+    search_fields = ("key",)
+    readonly_fields = ("created_at", "last_used_at", "hits", "ref_count")
+
+
+@admin.register(RouteAudioGuide)
+class RouteAudioGuideAdmin(admin.ModelAdmin):
+    list_display = (
+        "route",
+        "status",
+        "total_points",
+        "total_duration",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("route__name",)
+    readonly_fields = (
+        "created_at",
+        "updated_at",
+        "chapters",
+        "fingerprint",
+        "segment_entries",
+    )
+
+
+@admin.register(DescriptionCacheEntry)
+class DescriptionCacheEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "geohash",
+        "address",
+        "style",
+        "language",
+        "hits",
+        "expires_at",
+    )
+    list_filter = ("style", "language")
+    search_fields = ("geohash", "address", "text")
+    readonly_fields = ("key", "created_at", "hits")
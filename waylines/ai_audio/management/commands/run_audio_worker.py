@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai_audio.services.audio_jobs import AudioJobQueue, worker_name
+
+
+class Command(BaseCommand):
+    help = "Process queued AI audio generation jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.AUDIO_WORKER_CONCURRENCY,
+            help="Number of jobs synthesized in parallel",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        released = AudioJobQueue.release_stale()
+        if released:
+            self.stdout.write(f"Requeued {released} stale jobs")
+
+        processed = []
+        work_args = (options["poll_interval"], options["once"], processed)
+        if options["concurrency"] <= 1:
+            self.work(*work_args)
+        else:
+            threads = [
+                threading.Thread(target=self.work, args=work_args, daemon=True)
+                for _ in range(options["concurrency"])
+            ]
+            for thread in threads:
+                thread.start()
+            try:
+                for thread in threads:
+                    thread.join()
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping audio worker")
+                return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {len(processed)} audio jobs")
+        )
+
+    def work(self, poll_interval, once, processed):
+        name = worker_name()
+        while True:
+            count = AudioJobQueue.drain(name)
+            processed.extend([name] * count)
+            if once:
+                return
+            time.sleep(poll_interval)
+            close_old_connections()
+            AudioJobQueue.release_stale()
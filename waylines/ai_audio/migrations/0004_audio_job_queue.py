@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_audio", "0003_alter_audiogeneration_options_and_more"),
+        ("routes", "0015_route_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="audiogeneration",
+            options={
+                "ordering": ["-id"],
+                "verbose_name": "Audio generation",
+                "verbose_name_plural": "Audio generations",
+            },
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="Attempts"
+            ),
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="available_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Available at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="locked_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Locked at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="locked_by",
+            field=models.CharField(
+                blank=True, max_length=100, verbose_name="Locked by"
+            ),
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="options",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Synthesis options"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="audiogeneration",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("processing", "Processing"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                default="queued",
+                max_length=20,
+                verbose_name="Status",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="audiogeneration",
+            index=models.Index(
+                fields=["status", "available_at"], name="audiogen_queue_idx"
+            ),
+        ),
+    ]
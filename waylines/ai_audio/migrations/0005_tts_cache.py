@@ -0,0 +1,98 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_audio", "0004_audio_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TTSCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Key"
+                    ),
+                ),
+                (
+                    "audio_file",
+                    models.FileField(
+                        upload_to="tts_cache/", verbose_name="Audio file"
+                    ),
+                ),
+                (
+                    "audio_format",
+                    models.CharField(max_length=10, verbose_name="Format"),
+                ),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Size (bytes)"
+                    ),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="References"
+                    ),
+                ),
+                (
+                    "hits",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Hits"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created"
+                    ),
+                ),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Last used",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "TTS cache entry",
+                "verbose_name_plural": "TTS cache entries",
+                "indexes": [
+                    models.Index(
+                        fields=["ref_count", "last_used_at"],
+                        name="ttscache_lru_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="audiogeneration",
+            name="cache_entry",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="generations",
+                to="ai_audio.ttscacheentry",
+                verbose_name="Cache entry",
+            ),
+        ),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_audio", "0005_tts_cache"),
+        ("routes", "0015_route_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteAudioGuide",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "options",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        verbose_name="Synthesis options",
+                    ),
+                ),
+                (
+                    "audio_file",
+                    models.FileField(
+                        blank=True,
+                        null=True,
+                        upload_to="route_audio_guides/",
+                        verbose_name="Audio file",
+                    ),
+                ),
+                (
+                    "chapters",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Chapters"
+                    ),
+                ),
+                (
+                    "segment_entries",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        verbose_name="Cached segments",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        blank=True, max_length=64, verbose_name="Fingerprint"
+                    ),
+                ),
+                (
+                    "total_points",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Points"
+                    ),
+                ),
+                (
+                    "total_duration",
+                    models.FloatField(
+                        default=0, verbose_name="Duration (sec)"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "error_message",
+                    models.TextField(
+                        blank=True, null=True, verbose_name="Error message"
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Locked at"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Updated"
+                    ),
+                ),
+                (
+                    "route",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="full_audio_guide",
+                        to="routes.route",
+                        verbose_name="Route",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Route audio guide",
+                "verbose_name_plural": "Route audio guides",
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_audio", "0006_route_audio_guide"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DescriptionCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Key"
+                    ),
+                ),
+                (
+                    "geohash",
+                    models.CharField(
+                        db_index=True, max_length=12, verbose_name="Geohash"
+                    ),
+                ),
+                (
+                    "address",
+                    models.CharField(
+                        blank=True, max_length=500, verbose_name="Address"
+                    ),
+                ),
+                (
+                    "style",
+                    models.CharField(max_length=20, verbose_name="Style"),
+                ),
+                (
+                    "language",
+                    models.CharField(max_length=10, verbose_name="Language"),
+                ),
+                ("text", models.TextField(verbose_name="Text")),
+                (
+                    "hits",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Hits"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        db_index=True, verbose_name="Expires"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Description cache entry",
+                "verbose_name_plural": "Description cache entries",
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_audio", "0007_description_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routeaudioguide",
+            name="point_audio_hash",
+            field=models.CharField(
+                blank=True, max_length=64, verbose_name="Point audio hash"
+            ),
+        ),
+    ]
@@ -1,7 +1,78 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from routes.models import RoutePoint
+from routes.models import Route, RoutePoint
+
+
+class TTSCacheEntry(models.Model):
+    key = models.CharField(_("Key"), max_length=64, unique=True)
+    audio_file = models.FileField(_("Audio file"), upload_to="tts_cache/")
+    audio_format = models.CharField(_("Format"), max_length=10)
+    size = models.PositiveIntegerField(_("Size (bytes)"), default=0)
+    ref_count = models.PositiveIntegerField(_("References"), default=0)
+    hits = models.PositiveIntegerField(_("Hits"), default=0)
+    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
+    last_used_at = models.DateTimeField(_("Last used"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("TTS cache entry")
+        verbose_name_plural = _("TTS cache entries")
+        indexes = [
+            models.Index(
+                fields=["ref_count", "last_used_at"],
+                name="ttscache_lru_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.key[:12]}.{self.audio_format} ({self.ref_count} refs)"
+
+
+class DescriptionCacheEntry(models.Model):
+    key = models.CharField(_("Key"), max_length=64, unique=True)
+    geohash = models.CharField(_("Geohash"), max_length=12, db_index=True)
+    address = models.CharField(_("Address"), max_length=500, blank=True)
+    style = models.CharField(_("Style"), max_length=20)
+    language = models.CharField(_("Language"), max_length=10)
+    text = models.TextField(_("Text"))
+    hits = models.PositiveIntegerField(_("Hits"), default=0)
+    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Description cache entry")
+        verbose_name_plural = _("Description cache entries")
+
+    def __str__(self):
+        return f"{self.geohash} {self.style}/{self.language}"
+
+
+class AudioStreamToken(models.Model):
+    """Single-use link to a preview that is synthesized while it plays.
+
+    Kept in the database so whichever worker serves the stream request
+    can redeem it.
+    """
+
+    token = models.CharField(_("Token"), max_length=32, unique=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="audio_stream_tokens",
+        verbose_name=_("User"),
+    )
+    options = models.JSONField(_("Synthesis options"), default=dict)
+    expires_at = models.DateTimeField(_("Expires"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Audio stream token")
+        verbose_name_plural = _("Audio stream tokens")
+
+    def __str__(self):
+        return f"Stream {self.token[:8]} for user {self.user_id}"
 
 
 class AudioGeneration(models.Model):
@@ -22,6 +93,18 @@ class AudioGeneration(models.Model):
         ("fr-FR", _("French")),
     ]
 
+    STATUS_QUEUED = "queued"
+    STATUS_PROCESSING = "processing"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, _("Queued")),
+        (STATUS_PROCESSING, _("Processing")),
+        (STATUS_COMPLETED, _("Completed")),
+        (STATUS_FAILED, _("Failed")),
+    ]
+
     point = models.ForeignKey(
         RoutePoint,
         on_delete=models.CASCADE,
@@ -43,7 +126,29 @@ class AudioGeneration(models.Model):
     audio_file = models.FileField(
         _("Audio file"), upload_to="audio_guides/", null=True, blank=True
     )
-    status = models.CharField(_("Status"), max_length=20, default="queued")
+    cache_entry = models.ForeignKey(
+        TTSCacheEntry,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="generations",
+        verbose_name=_("Cache entry"),
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    options = models.JSONField(
+        _("Synthesis options"), default=dict, blank=True
+    )
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    available_at = models.DateTimeField(
+        _("Available at"), null=True, blank=True
+    )
+    locked_by = models.CharField(_("Locked by"), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_("Locked at"), null=True, blank=True)
     error_message = models.TextField(_("Error message"), blank=True, null=True)
     processing_time = models.FloatField(
         _("Processing time (sec)"), null=True, blank=True
@@ -56,6 +161,75 @@ class AudioGeneration(models.Model):
         verbose_name = _("Audio generation")
         verbose_name_plural = _("Audio generations")
         ordering = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"],
+                name="audiogen_queue_idx",
+            )
+        ]
 
     def __str__(self):
         return f"Audio for point {self.point.id} ({self.status})"
+
+
+class RouteAudioGuide(models.Model):
+    route = models.OneToOneField(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="full_audio_guide",
+        verbose_name=_("Route"),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name=_("User"),
+    )
+    options = models.JSONField(
+        _("Synthesis options"), default=dict, blank=True
+    )
+    audio_file = models.FileField(
+        _("Audio file"), upload_to="route_audio_guides/", null=True, blank=True
+    )
+    chapters = models.JSONField(_("Chapters"), default=list, blank=True)
+    segment_entries = models.JSONField(
+        _("Cached segments"), default=list, blank=True
+    )
+    fingerprint = models.CharField(_("Fingerprint"), max_length=64, blank=True)
+    point_audio_hash = models.CharField(
+        _("Point audio hash"), max_length=64, blank=True
+    )
+    total_points = models.PositiveIntegerField(_("Points"), default=0)
+    total_duration = models.FloatField(_("Duration (sec)"), default=0)
+    status = models.CharField(
+        _("Status"),
+        max_length=20,
+        choices=AudioGeneration.STATUS_CHOICES,
+        default=AudioGeneration.STATUS_QUEUED,
+    )
+    error_message = models.TextField(_("Error message"), blank=True, null=True)
+    locked_at = models.DateTimeField(_("Locked at"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Route audio guide")
+        verbose_name_plural = _("Route audio guides")
+
+    def __str__(self):
+        return f"Audio guide for route {self.route_id} ({self.status})"
+
+
+@receiver(post_delete, sender=AudioGeneration)
+def release_cache_entry(sender, instance, **kwargs):
+    if instance.cache_entry_id:
+        from ai_audio.services.tts_cache import TTSCacheService
+
+        TTSCacheService.release(instance.cache_entry_id)
+
+
+@receiver(post_delete, sender=RouteAudioGuide)
+def release_guide_segments(sender, instance, **kwargs):
+    from ai_audio.services.tts_cache import TTSCacheService
+
+    for entry_id in instance.segment_entries:
+        TTSCacheService.release(entry_id)
@@ -0,0 +1,462 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ai_audio.models import AudioGeneration, RouteAudioGuide
+from ai_audio.services.route_guide import RouteAudioGuideService
+from ai_audio.services.tts_cache import TTSCacheService
+from ai_audio.services.tts_service import TTSService
+from ai_audio.services.yandex_gpt_service import YandexGPTService
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 10
+STALE_LOCK_TIMEOUT = 5 * 60
+CLAIM_BATCH_SIZE = 10
+
+_executor = None
+_executor_lock = threading.Lock()
+_timer = None
+_timer_due = None
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class RateLimiter:
+    """Spaces job starts so at most ``per_minute`` begin each minute.
+
+    Shared by the worker threads of one process; zero disables it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self, per_minute):
+        if per_minute <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 60.0 / per_minute
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = RateLimiter()
+
+
+class AudioJobQueue:
+    """Database-backed queue of audio jobs.
+
+    Point jobs are ``AudioGeneration`` rows and whole-route jobs are
+    ``RouteAudioGuide`` rows; both move through the same statuses.
+
+    Jobs are claimed with a conditional UPDATE on ``status``, so any
+    number of threads and worker processes can poll the same table
+    without a broker or row locks.
+    """
+
+    @staticmethod
+    def enqueue(point, user, text, voice_type, language, options):
+        job = AudioGeneration.objects.create(
+            point=point,
+            user=user,
+            text_content=text,
+            voice_type=voice_type,
+            language=language,
+            options=options,
+            status=AudioGeneration.STATUS_QUEUED,
+            available_at=timezone.now(),
+        )
+        if settings.AUDIO_WORKER_IN_PROCESS:
+            transaction.on_commit(AudioJobQueue.wake)
+        return job
+
+    @staticmethod
+    def enqueue_route(route, user, voice_type, language, options, **kwargs):
+        """Queue description and audio jobs for every point of a route.
+
+        Points with a job already queued or running are skipped, as are
+        points that already have audio unless ``regenerate`` is set, so
+        calling this again resumes an interrupted batch. Points without
+        a description get one from YandexGPT in ``style`` first.
+        """
+        regenerate = kwargs.get("regenerate", False)
+        style = kwargs.get("style", "storytelling")
+        # A job orphaned by a restart must not keep its point busy.
+        AudioJobQueue.release_stale()
+        busy = set(
+            AudioGeneration.objects.filter(
+                point__route=route,
+                status__in=[
+                    AudioGeneration.STATUS_QUEUED,
+                    AudioGeneration.STATUS_PROCESSING,
+                ],
+            ).values_list("point_id", flat=True)
+        )
+        now = timezone.now()
+        jobs = []
+        for point in route.points.order_by("order", "id"):
+            if point.id in busy or (point.audio_guide and not regenerate):
+                continue
+            text = (point.description or "").strip()
+            job_options = dict(options)
+            if not text:
+                job_options["describe"] = style
+            jobs.append(
+                AudioGeneration(
+                    point=point,
+                    user=user,
+                    text_content=text,
+                    voice_type=voice_type,
+                    language=language,
+                    options=job_options,
+                    status=AudioGeneration.STATUS_QUEUED,
+                    available_at=now,
+                )
+            )
+        AudioGeneration.objects.bulk_create(jobs)
+        if jobs and settings.AUDIO_WORKER_IN_PROCESS:
+            for _ in range(min(len(jobs), settings.AUDIO_WORKER_CONCURRENCY)):
+                transaction.on_commit(AudioJobQueue.wake)
+        return jobs
+
+    @staticmethod
+    def route_progress(route):
+        """Status of the latest job of every point on the route."""
+        latest = {}
+        for job in AudioGeneration.objects.filter(point__route=route).order_by(
+            "point_id", "-created_at", "-id"
+        ):
+            latest.setdefault(job.point_id, job)
+        points = []
+        for point_id in route.points.order_by("order", "id").values_list(
+            "id", flat=True
+        ):
+            job = latest.get(point_id)
+            points.append(
+                {
+                    "point_id": point_id,
+                    "generation_id": job.id if job else None,
+                    "status": job.status if job else None,
+                    "attempts": job.attempts if job else 0,
+                    "error": (
+                        job.error_message
+                        if job and job.status == AudioGeneration.STATUS_FAILED
+                        else None
+                    ),
+                }
+            )
+        return points
+
+    @staticmethod
+    def enqueue_route_guide(route, user, options):
+        guide, _ = RouteAudioGuide.objects.update_or_create(
+            route=route,
+            defaults={
+                "user": user,
+                "options": options,
+                "status": AudioGeneration.STATUS_QUEUED,
+                "error_message": None,
+            },
+        )
+        if settings.AUDIO_WORKER_IN_PROCESS:
+            transaction.on_commit(AudioJobQueue.wake)
+        return guide
+
+    @staticmethod
+    def claim(worker_id):
+        now = timezone.now()
+        candidates = (
+            AudioGeneration.objects.filter(
+                status=AudioGeneration.STATUS_QUEUED
+            )
+            .filter(Q(available_at__isnull=True) | Q(available_at__lte=now))
+            .order_by("available_at", "id")
+            .values_list("id", flat=True)[:CLAIM_BATCH_SIZE]
+        )
+        for job_id in candidates:
+            claimed = AudioGeneration.objects.filter(
+                id=job_id, status=AudioGeneration.STATUS_QUEUED
+            ).update(
+                status=AudioGeneration.STATUS_PROCESSING,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return AudioGeneration.objects.select_related(
+                    "point__route"
+                ).get(id=job_id)
+        return None
+
+    @staticmethod
+    def claim_route_guide():
+        now = timezone.now()
+        candidates = (
+            RouteAudioGuide.objects.filter(
+                status=AudioGeneration.STATUS_QUEUED
+            )
+            .order_by("updated_at")
+            .values_list("id", flat=True)[:CLAIM_BATCH_SIZE]
+        )
+        for guide_id in candidates:
+            claimed = RouteAudioGuide.objects.filter(
+                id=guide_id, status=AudioGeneration.STATUS_QUEUED
+            ).update(status=AudioGeneration.STATUS_PROCESSING, locked_at=now)
+            if claimed:
+                return RouteAudioGuide.objects.select_related("route").get(
+                    id=guide_id
+                )
+        return None
+
+    @staticmethod
+    def describe(job, style):
+        """Fill in the job's text from YandexGPT, raising on failure."""
+        point = job.point
+        job.text_content = YandexGPTService().describe_location(
+            lat=point.latitude,
+            lng=point.longitude,
+            address=point.address or "",
+            style=style,
+            language=job.language,
+        )
+        job.save(update_fields=["text_content"])
+        if not (point.description or "").strip():
+            point.description = job.text_content
+            point.save(update_fields=["description"])
+
+    @staticmethod
+    def process(job):
+        options = dict(job.options or {})
+        try:
+            rate_limiter.wait(settings.AUDIO_JOBS_PER_MINUTE)
+            style = options.pop("describe", None)
+            if style and not job.text_content.strip():
+                AudioJobQueue.describe(job, style)
+            tts = TTSService()
+            config = tts.build_config(
+                job.text_content, job.language, job.voice_type, **options
+            )
+            entry, processing_time = TTSCacheService.acquire(tts, config)
+        except Exception as e:
+            AudioJobQueue.fail(job, e)
+            return job
+
+        job.cache_entry = entry
+        job.audio_file.name = entry.audio_file.name
+        job.status = AudioGeneration.STATUS_COMPLETED
+        job.processing_time = processing_time
+        job.completed_at = timezone.now()
+        job.error_message = None
+        job.locked_by = ""
+        job.locked_at = None
+        job.save(
+            update_fields=[
+                "audio_file",
+                "cache_entry",
+                "status",
+                "processing_time",
+                "completed_at",
+                "error_message",
+                "locked_by",
+                "locked_at",
+            ]
+        )
+
+        point = job.point
+        point.audio_guide = job.audio_file
+        point.save(update_fields=["audio_guide"])
+
+        route = point.route
+        if not route.has_audio_guide:
+            route.has_audio_guide = True
+            route.save(update_fields=["has_audio_guide"])
+
+        AudioJobQueue.refresh_route_guide(route.id)
+        return job
+
+    @staticmethod
+    def refresh_route_guide(route_id):
+        """Requeue a finished route guide whose point audio has changed.
+
+        Waits for the route's last pending point job, so a batch
+        rebuilds the guide once rather than once per point.
+        """
+        pending = AudioGeneration.objects.filter(
+            point__route_id=route_id,
+            status__in=[
+                AudioGeneration.STATUS_QUEUED,
+                AudioGeneration.STATUS_PROCESSING,
+            ],
+        )
+        if pending.exists():
+            return
+        guide = (
+            RouteAudioGuide.objects.filter(
+                route_id=route_id, status=AudioGeneration.STATUS_COMPLETED
+            )
+            .select_related("route")
+            .first()
+        )
+        if guide is None or (
+            guide.point_audio_hash
+            == RouteAudioGuideService.point_audio_hash(guide.route)
+        ):
+            return
+        RouteAudioGuide.objects.filter(
+            id=guide.id, status=AudioGeneration.STATUS_COMPLETED
+        ).update(status=AudioGeneration.STATUS_QUEUED)
+
+    @staticmethod
+    def fail(job, error):
+        logger.error(f"Audio job {job.id} attempt {job.attempts}: {error}")
+        retryable = not isinstance(error, ImproperlyConfigured)
+        job.error_message = str(error)
+        job.locked_by = ""
+        job.locked_at = None
+        if retryable and job.attempts < settings.AUDIO_JOB_MAX_ATTEMPTS:
+            delay = RETRY_BASE_DELAY * 2 ** max(job.attempts - 1, 0)
+            job.status = AudioGeneration.STATUS_QUEUED
+            job.available_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = AudioGeneration.STATUS_FAILED
+            job.completed_at = timezone.now()
+        AudioGeneration.objects.filter(id=job.id).update(
+            status=job.status,
+            error_message=job.error_message,
+            available_at=job.available_at,
+            completed_at=job.completed_at,
+            locked_by="",
+            locked_at=None,
+        )
+        if job.status == AudioGeneration.STATUS_FAILED:
+            AudioJobQueue.refresh_route_guide(job.point.route_id)
+
+    @staticmethod
+    def release_stale(timeout=STALE_LOCK_TIMEOUT):
+        """Requeue jobs whose worker died while processing them."""
+        cutoff = timezone.now() - timedelta(seconds=timeout)
+        released = AudioGeneration.objects.filter(
+            status=AudioGeneration.STATUS_PROCESSING, locked_at__lt=cutoff
+        ).update(
+            status=AudioGeneration.STATUS_QUEUED,
+            available_at=timezone.now(),
+            locked_by="",
+            locked_at=None,
+        )
+        released += RouteAudioGuide.objects.filter(
+            status=AudioGeneration.STATUS_PROCESSING, locked_at__lt=cutoff
+        ).update(status=AudioGeneration.STATUS_QUEUED, locked_at=None)
+        return released
+
+    @staticmethod
+    def next_wakeup():
+        """Seconds until a retry falls due or a lock goes stale, or None."""
+        now = timezone.now()
+        due = [
+            AudioGeneration.objects.filter(
+                status=AudioGeneration.STATUS_QUEUED, available_at__gt=now
+            )
+            .order_by("available_at")
+            .values_list("available_at", flat=True)
+            .first()
+        ]
+        stale = timedelta(seconds=STALE_LOCK_TIMEOUT)
+        for model in (AudioGeneration, RouteAudioGuide):
+            locked_at = (
+                model.objects.filter(status=AudioGeneration.STATUS_PROCESSING)
+                .order_by("locked_at")
+                .values_list("locked_at", flat=True)
+                .first()
+            )
+            if locked_at is not None:
+                # Released strictly after the timeout, hence the second.
+                due.append(locked_at + stale + timedelta(seconds=1))
+        due = [moment for moment in due if moment is not None]
+        if not due:
+            return None
+        return max((min(due) - now).total_seconds(), 0.0)
+
+    @staticmethod
+    def run_next(worker_id=None):
+        """Process one job. Returns False when the queue is empty."""
+        job = AudioJobQueue.claim(worker_id or worker_name())
+        if job is None:
+            guide = AudioJobQueue.claim_route_guide()
+            if guide is None:
+                return False
+            RouteAudioGuideService.build(guide)
+            return True
+        start_time = time.time()
+        AudioJobQueue.process(job)
+        logger.info(
+            f"Audio job {job.id} {job.status} "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return True
+
+    @staticmethod
+    def drain(worker_id=None):
+        processed = 0
+        while AudioJobQueue.run_next(worker_id):
+            processed += 1
+        return processed
+
+    @staticmethod
+    def wake():
+        """Drain the queue on the in-process thread pool.
+
+        Each drain first requeues jobs orphaned by a crash or restart,
+        and afterwards sets a timer for the next retry or stale lock,
+        so the pool keeps going without a new enqueue.
+        """
+        global _executor
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AUDIO_WORKER_CONCURRENCY,
+                    thread_name_prefix="audio-worker",
+                )
+        _executor.submit(_drain_in_thread)
+
+
+def _schedule_wake(delay):
+    """Wake the pool after ``delay`` seconds unless a sooner wake is set."""
+    global _timer, _timer_due
+    due = time.monotonic() + delay
+    with _executor_lock:
+        if _timer is not None and _timer.is_alive() and _timer_due <= due:
+            return
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(delay, AudioJobQueue.wake)
+        _timer.daemon = True
+        _timer_due = due
+        _timer.start()
+
+
+def _drain_in_thread():
+    try:
+        AudioJobQueue.release_stale()
+        AudioJobQueue.drain()
+        delay = AudioJobQueue.next_wakeup()
+        if delay is not None:
+            _schedule_wake(delay)
+    except Exception as e:
+        logger.error(f"Audio worker thread error: {e}")
+    finally:
+        close_old_connections()
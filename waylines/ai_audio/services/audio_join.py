@@ -0,0 +1,150 @@
+import struct
+
+ID3V2_HEADER_SIZE = 10
+ID3V1_TAG_SIZE = 128
+OGG_PAGE_HEADER_SIZE = 27
+
+
+def _ogg_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            crc = (crc << 1) ^ (0x04C11DB7 if crc & 0x80000000 else 0)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+OGG_CRC_TABLE = _ogg_crc_table()
+
+
+def ogg_crc(data):
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ OGG_CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def strip_id3(data):
+    """Remove ID3v2 and ID3v1 tags, leaving bare MP3 frames."""
+    if data[:3] == b"ID3" and len(data) >= ID3V2_HEADER_SIZE:
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        end = ID3V2_HEADER_SIZE + size
+        if data[5] & 0x10:
+            end += ID3V2_HEADER_SIZE
+        data = data[end:]
+    if len(data) >= ID3V1_TAG_SIZE and data[-ID3V1_TAG_SIZE:][:3] == b"TAG":
+        data = data[:-ID3V1_TAG_SIZE]
+    return data
+
+
+def chain_ogg(parts):
+    """Join Ogg streams into one chained stream.
+
+    Chained logical streams must have distinct serial numbers, so
+    every page of part ``n`` is renumbered to ``n + 1`` and its
+    checksum recomputed.
+    """
+    output = bytearray()
+    for serial, part in enumerate(parts, start=1):
+        position = 0
+        while position < len(part):
+            header = part[position : position + OGG_PAGE_HEADER_SIZE]
+            if len(header) < OGG_PAGE_HEADER_SIZE or header[:4] != b"OggS":
+                raise ValueError("Malformed Ogg page")
+            segments = header[26]
+            table_end = position + OGG_PAGE_HEADER_SIZE + segments
+            end = table_end + sum(part[table_end - segments : table_end])
+            if end > len(part):
+                raise ValueError("Truncated Ogg page")
+            page = bytearray(part[position:end])
+            page[14:18] = struct.pack("<I", serial)
+            page[22:26] = b"\0\0\0\0"
+            page[22:26] = struct.pack("<I", ogg_crc(page))
+            output += page
+            position = end
+    return bytes(output)
+
+
+def join_audio(parts, audio_format):
+    """Concatenate synthesized segments into one stream.
+
+    MP3 frames are self-contained, so segments are joined frame to
+    frame once their tags are removed. Headerless LPCM is joined sample
+    to sample, and Ogg Opus segments become a chained Ogg stream.
+    """
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+    if audio_format == "mp3":
+        return b"".join(strip_id3(part) for part in parts)
+    if audio_format == "lpcm":
+        return b"".join(parts)
+    if audio_format == "oggopus":
+        return chain_ogg(parts)
+    raise ValueError(f"Cannot join {audio_format} audio")
+
+
+# Layer III bitrates in kbps, indexed by the header's bitrate index.
+MPEG1_BITRATES = (
+    0,
+    32,
+    40,
+    48,
+    56,
+    64,
+    80,
+    96,
+    112,
+    128,
+    160,
+    192,
+    224,
+    256,
+    320,
+)
+MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+
+def mp3_duration(data):
+    """Return the playing time of MPEG Layer III data in seconds.
+
+    Frames are walked header to header; bytes that do not start a
+    valid frame are skipped one at a time to resynchronize.
+    """
+    data = strip_id3(data)
+    position = 0
+    duration = 0.0
+    while position + 4 <= len(data):
+        if data[position] != 0xFF or data[position + 1] & 0xE0 != 0xE0:
+            position += 1
+            continue
+        version = (data[position + 1] >> 3) & 0x03
+        layer = (data[position + 1] >> 1) & 0x03
+        bitrate_index = data[position + 2] >> 4
+        rate_index = (data[position + 2] >> 2) & 0x03
+        padding = (data[position + 2] >> 1) & 0x01
+        if (
+            version == 1
+            or layer != 1
+            or bitrate_index in (0, 15)
+            or rate_index == 3
+        ):
+            position += 1
+            continue
+
+        mpeg1 = version == 3
+        bitrates = MPEG1_BITRATES if mpeg1 else MPEG2_BITRATES
+        bitrate = bitrates[bitrate_index] * 1000
+        sample_rate = SAMPLE_RATES[version][rate_index]
+        samples = 1152 if mpeg1 else 576
+        duration += samples / sample_rate
+        position += samples // 8 * bitrate // sample_rate + padding
+    return duration
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ai_audio.models import DescriptionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+ADDRESS_NOISE = re.compile(r"[^\w\s]")
+
+
+def encode_geohash(lat, lng, precision):
+    """Standard base32 geohash of a coordinate."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        coord, bounds = (lng, lng_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coord >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def normalize_address(address):
+    address = ADDRESS_NOISE.sub(" ", (address or "").lower())
+    return " ".join(address.split())
+
+
+class DescriptionCacheService:
+    """Generated place descriptions keyed by location, style and language.
+
+    Coordinates are reduced to a geohash cell, so the same landmark
+    added to different routes shares one description.
+    """
+
+    @staticmethod
+    def cache_key(lat, lng, address, style, language):
+        cell = encode_geohash(
+            lat, lng, settings.DESCRIPTION_CACHE_GEOHASH_PRECISION
+        )
+        address = normalize_address(address)
+        payload = "|".join((cell, address, style, language))
+        return cell, address, hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def get(lat, lng, address, style, language):
+        _, _, key = DescriptionCacheService.cache_key(
+            lat, lng, address, style, language
+        )
+        entry = DescriptionCacheEntry.objects.filter(
+            key=key, expires_at__gt=timezone.now()
+        ).first()
+        if entry is None:
+            return None
+        DescriptionCacheEntry.objects.filter(id=entry.id).update(
+            hits=F("hits") + 1
+        )
+        return entry.text
+
+    @staticmethod
+    def store(lat, lng, address, style, language, text):
+        cell, address, key = DescriptionCacheService.cache_key(
+            lat, lng, address, style, language
+        )
+        DescriptionCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "geohash": cell,
+                "address": address[:500],
+                "style": style,
+                "language": language,
+                "text": text,
+                "hits": 0,
+                "expires_at": timezone.now()
+                + timedelta(seconds=settings.DESCRIPTION_CACHE_TTL),
+            },
+        )
+        DescriptionCacheService.purge_expired()
+
+    @staticmethod
+    def purge_expired():
+        deleted, _ = DescriptionCacheEntry.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        if deleted:
+            logger.info(f"Description cache: purged {deleted} entries")
+        return deleted
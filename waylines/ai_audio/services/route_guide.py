@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import time
+
+from django.core.files.base import ContentFile
+
+from ai_audio.models import AudioGeneration, TTSCacheEntry
+from ai_audio.services.audio_join import join_audio, mp3_duration
+from ai_audio.services.tts_cache import TTSCacheService
+from ai_audio.services.tts_service import TTSService
+
+logger = logging.getLogger(__name__)
+
+# One entry per language the TTS service has a voice for; guides in
+# other languages are refused rather than read in the wrong language.
+INTROS = {
+    "ru": "Аудиогид по маршруту «{name}».",
+    "kk": "«{name}» маршруты бойынша аудиогид.",
+    "uz": "«{name}» yoʻnalishi boʻyicha audiogid.",
+    "en": "Audio guide for the route {name}.",
+    "de": "Audioguide für die Route {name}.",
+    "he": "מדריך קולי למסלול {name}.",
+}
+TRANSITIONS = {
+    "ru": "Точка {number}. {name}.",
+    "kk": "{number}-аялдама. {name}.",
+    "uz": "{number}-bekat. {name}.",
+    "en": "Stop {number}. {name}.",
+    "de": "Station {number}. {name}.",
+    "he": "תחנה {number}. {name}.",
+}
+SUPPORTED_LANGUAGES = tuple(INTROS)
+
+
+class RouteAudioGuideService:
+    """Assembles one MP3 for a whole route with a chapter per point.
+
+    Every segment (intro, transitions, point narration) is a
+    content-addressed TTS cache entry, so a rebuild only synthesizes
+    segments whose text changed and reuses existing point audio.
+    """
+
+    @staticmethod
+    def build(guide):
+        start_time = time.time()
+        held = []
+        guide.point_audio_hash = RouteAudioGuideService.point_audio_hash(
+            guide.route
+        )
+        try:
+            segments = RouteAudioGuideService._collect_segments(guide, held)
+            rebuilt = RouteAudioGuideService._assemble(guide, segments, held)
+        except Exception as e:
+            logger.error(f"Route audio guide {guide.id} failed: {e}")
+            for entry_id in held:
+                TTSCacheService.release(entry_id)
+            guide.status = AudioGeneration.STATUS_FAILED
+            guide.error_message = str(e)
+            guide.locked_at = None
+            guide.save(update_fields=["status", "error_message", "locked_at"])
+            return guide
+
+        logger.info(
+            f"Route audio guide {guide.id}: {len(segments)} segments, "
+            f"{'rebuilt' if rebuilt else 'unchanged'} "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return guide
+
+    @staticmethod
+    def point_audio_hash(route):
+        """Digest of the point audio a guide of ``route`` is built from."""
+        points = route.points.order_by("order", "id").values_list(
+            "id", "audio_guide"
+        )
+        return hashlib.sha256(
+            "|".join(f"{pid}:{audio or ''}" for pid, audio in points).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def _collect_segments(guide, held):
+        """Return ``(point_id, entry)`` pairs in playback order."""
+        route = guide.route
+        options = dict(guide.options or {})
+        language = options.pop("language", "ru")
+        voice_type = options.pop("voice_type", "alloy")
+        options["format"] = "mp3"
+        tts = TTSService()
+
+        def synthesized(text):
+            config = tts.build_config(text, language, voice_type, **options)
+            entry, _ = TTSCacheService.acquire(tts, config)
+            held.append(entry.id)
+            return entry
+
+        if language not in SUPPORTED_LANGUAGES:
+            raise ValueError(f"Unsupported guide language: {language}")
+        intro = INTROS[language]
+        transition = TRANSITIONS[language]
+        segments = [(None, synthesized(intro.format(name=route.name)))]
+        for number, point in enumerate(
+            route.points.order_by("order", "id"), start=1
+        ):
+            segments.append(
+                (
+                    point.id,
+                    synthesized(
+                        transition.format(number=number, name=point.name)
+                    ),
+                )
+            )
+            narration = RouteAudioGuideService._point_entry(point, held)
+            if narration is None and point.description.strip():
+                narration = synthesized(point.description)
+            if narration is not None:
+                segments.append((point.id, narration))
+        return segments
+
+    @staticmethod
+    def _point_entry(point, held):
+        """Reuse the point's own MP3 audio guide when it is cached."""
+        if not point.audio_guide:
+            return None
+        entry = TTSCacheEntry.objects.filter(
+            audio_file=point.audio_guide.name, audio_format="mp3"
+        ).first()
+        if entry is None or not TTSCacheService.retain(entry.id):
+            return None
+        held.append(entry.id)
+        return entry
+
+    @staticmethod
+    def _assemble(guide, segments, held):
+        previous = list(guide.segment_entries)
+        fingerprint = hashlib.sha256(
+            "|".join(f"{pid}:{entry.key}" for pid, entry in segments).encode()
+        ).hexdigest()
+        unchanged = (
+            fingerprint == guide.fingerprint
+            and guide.audio_file
+            and guide.audio_file.storage.exists(guide.audio_file.name)
+        )
+
+        if not unchanged:
+            parts = []
+            chapters = []
+            offset = 0.0
+            for point_id, entry in segments:
+                with entry.audio_file.open("rb") as audio_file:
+                    data = audio_file.read()
+                if point_id is not None and (
+                    not chapters or chapters[-1]["point_id"] != point_id
+                ):
+                    chapters.append({"point_id": point_id, "offset": offset})
+                offset += mp3_duration(data)
+                parts.append(data)
+
+            names = dict(guide.route.points.values_list("id", "name"))
+            for chapter in chapters:
+                chapter["name"] = names.get(chapter["point_id"], "")
+                chapter["offset"] = round(chapter["offset"], 3)
+
+            if guide.audio_file:
+                guide.audio_file.delete(save=False)
+            guide.audio_file.save(
+                f"route_guide_{guide.route_id}.mp3",
+                ContentFile(join_audio(parts, "mp3")),
+                save=False,
+            )
+            guide.chapters = chapters
+            guide.total_points = len(chapters)
+            guide.total_duration = round(offset, 3)
+            guide.fingerprint = fingerprint
+
+        guide.segment_entries = held
+        guide.status = AudioGeneration.STATUS_COMPLETED
+        guide.error_message = None
+        guide.locked_at = None
+        guide.save()
+        for entry_id in previous:
+            TTSCacheService.release(entry_id)
+        return not unchanged
@@ -0,0 +1,54 @@
+import re
+
+MAX_CHUNK_CHARS = 600
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def split_text(text, max_chars=MAX_CHUNK_CHARS):
+    """Split text into chunks of at most ``max_chars`` characters.
+
+    Sentences are packed greedily but never across paragraphs, so
+    editing one paragraph leaves the chunks of the others unchanged
+    and their synthesized audio can be reused.
+    """
+    chunks = []
+    for paragraph in PARAGRAPH_RE.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        current = ""
+        for sentence in SENTENCE_END_RE.split(paragraph):
+            for piece in _split_sentence(sentence, max_chars):
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                elif current:
+                    current = f"{current} {piece}"
+                else:
+                    current = piece
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def _split_sentence(sentence, max_chars):
+    if len(sentence) <= max_chars:
+        return [sentence] if sentence else []
+
+    pieces = []
+    current = ""
+    for word in sentence.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
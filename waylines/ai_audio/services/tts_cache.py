@@ -0,0 +1,254 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ai_audio.models import TTSCacheEntry
+from ai_audio.services.audio_join import join_audio, strip_id3
+from ai_audio.services.tts_service import MAX_PARALLEL_REQUESTS, pool_task
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCacheService:
+    """Content-addressed store of synthesized audio.
+
+    Entries are keyed by ``TTSService.cache_key``. Point audio holds a
+    reference through ``AudioGeneration.cache_entry``; entries nobody
+    references only back temporary previews and are evicted least
+    recently used first.
+    """
+
+    @staticmethod
+    def get_or_create(tts, config):
+        """Return ``(entry, processing_time)``, synthesizing on a miss."""
+        key = tts.cache_key(config)
+        entry = TTSCacheEntry.objects.filter(key=key).first()
+        if entry is not None and entry.audio_file.storage.exists(
+            entry.audio_file.name
+        ):
+            TTSCacheService.touch(entry)
+            return entry, 0.0
+
+        chunks = tts.chunk_configs(config)
+        if len(chunks) > 1:
+            audio_content, processing_time = (
+                TTSCacheService._synthesize_chunks(tts, chunks, config.format)
+            )
+        else:
+            audio_content, processing_time = tts.synthesize(config)
+        entry = TTSCacheService._store(
+            entry or TTSCacheEntry(key=key), config.format, audio_content
+        )
+        return entry, processing_time
+
+    @staticmethod
+    def _synthesize_chunks(tts, chunks, audio_format):
+        """Synthesize chunks missing from the cache and join all of them.
+
+        Every chunk is cached on its own, so after an edit only the
+        chunks whose text changed reach SpeechKit.
+        """
+        start_time = time.time()
+        keys = [tts.cache_key(chunk) for chunk in chunks]
+        entries = {
+            entry.key: entry
+            for entry in TTSCacheEntry.objects.filter(key__in=keys)
+            if entry.audio_file.storage.exists(entry.audio_file.name)
+        }
+
+        missing = {}
+        for key, chunk in zip(keys, chunks):
+            if key not in entries:
+                missing.setdefault(key, chunk)
+        results = tts.synthesize_many(list(missing.values()))
+        for key, (content, _) in zip(missing, results):
+            entry = TTSCacheEntry.objects.filter(key=key).first()
+            entries[key] = TTSCacheService._store(
+                entry or TTSCacheEntry(key=key), audio_format, content
+            )
+        hits = [entries[key].id for key in keys if key not in missing]
+        if hits:
+            TTSCacheEntry.objects.filter(id__in=hits).update(
+                hits=F("hits") + 1, last_used_at=timezone.now()
+            )
+
+        parts = []
+        for key in keys:
+            with entries[key].audio_file.open("rb") as audio_file:
+                parts.append(audio_file.read())
+        logger.info(
+            f"TTS cache: {len(chunks)} chunks, {len(missing)} synthesized"
+        )
+        return join_audio(parts, audio_format), time.time() - start_time
+
+    @staticmethod
+    def find(tts, config):
+        """Return the cached entry for ``config`` or None."""
+        entry = TTSCacheEntry.objects.filter(key=tts.cache_key(config)).first()
+        if entry is not None and entry.audio_file.storage.exists(
+            entry.audio_file.name
+        ):
+            return entry
+        return None
+
+    @staticmethod
+    def stream(tts, config):
+        """Yield audio for ``config`` while it is being synthesized.
+
+        The first chunk is relayed from SpeechKit as it arrives and the
+        remaining chunks are synthesized in the background meanwhile.
+        Everything sent is also written to the cache, so the finished
+        audio is served from storage next time.
+        """
+        entry = TTSCacheService.find(tts, config)
+        if entry is not None:
+            TTSCacheService.touch(entry)
+            with entry.audio_file.open("rb") as audio_file:
+                yield audio_file.read()
+            return
+
+        entry_key = tts.cache_key(config)
+        chunks = tts.chunk_configs(config)
+        keys = [tts.cache_key(chunk) for chunk in chunks]
+        cached = {}
+        if len(chunks) > 1:
+            cached = {
+                entry.key: entry
+                for entry in TTSCacheEntry.objects.filter(key__in=keys)
+                if entry.audio_file.storage.exists(entry.audio_file.name)
+            }
+
+        parts = []
+        with ThreadPoolExecutor(
+            max_workers=min(MAX_PARALLEL_REQUESTS, len(chunks))
+        ) as executor:
+            # Cache entries are stored from the thread serving the
+            # response; pool threads only reach the single-flight cache.
+            pending = [
+                (
+                    None
+                    if key in cached
+                    else executor.submit(pool_task, tts.synthesize, c)
+                )
+                for key, c in zip(keys[1:], chunks[1:])
+            ]
+            for index, key in enumerate(keys):
+                relayed = False
+                if key in cached:
+                    with cached[key].audio_file.open("rb") as audio_file:
+                        content = audio_file.read()
+                elif index == 0:
+                    received = []
+                    for block in tts.stream(chunks[0]):
+                        received.append(block)
+                        yield block
+                    content = b"".join(received)
+                    relayed = True
+                else:
+                    content, _ = pending[index - 1].result()
+
+                if key not in cached and len(chunks) > 1:
+                    cached[key] = TTSCacheService._store(
+                        TTSCacheEntry.objects.filter(key=key).first()
+                        or TTSCacheEntry(key=key),
+                        config.format,
+                        content,
+                    )
+                parts.append(content)
+                if relayed:
+                    continue
+                if index and config.format == "mp3":
+                    yield strip_id3(content)
+                else:
+                    yield content
+
+        entry = TTSCacheService._store(
+            TTSCacheEntry.objects.filter(key=entry_key).first()
+            or TTSCacheEntry(key=entry_key),
+            config.format,
+            join_audio(parts, config.format),
+        )
+        TTSCacheService.evict(keep_id=entry.id)
+
+    @staticmethod
+    def _store(entry, audio_format, audio_content):
+        entry.audio_format = audio_format
+        entry.audio_file.save(
+            f"{entry.key}.{audio_format}",
+            ContentFile(audio_content),
+            save=False,
+        )
+        entry.size = len(audio_content)
+        entry.last_used_at = timezone.now()
+        try:
+            with transaction.atomic():
+                entry.save()
+        except IntegrityError:
+            # Another worker stored the same audio first.
+            entry.audio_file.delete(save=False)
+            entry = TTSCacheEntry.objects.get(key=entry.key)
+        return entry
+
+    @staticmethod
+    def acquire(tts, config):
+        """Like ``get_or_create`` but also takes a reference."""
+        for _ in range(3):
+            entry, processing_time = TTSCacheService.get_or_create(tts, config)
+            acquired = TTSCacheEntry.objects.filter(id=entry.id).update(
+                ref_count=F("ref_count") + 1
+            )
+            if acquired:
+                entry.ref_count += 1
+                return entry, processing_time
+        raise RuntimeError("TTS cache entry was evicted while acquiring")
+
+    @staticmethod
+    def retain(entry_id):
+        """Take a reference on an existing entry. False if it is gone."""
+        return bool(
+            TTSCacheEntry.objects.filter(id=entry_id).update(
+                ref_count=F("ref_count") + 1
+            )
+        )
+
+    @staticmethod
+    def release(entry_id):
+        TTSCacheEntry.objects.filter(id=entry_id, ref_count__gt=0).update(
+            ref_count=F("ref_count") - 1
+        )
+
+    @staticmethod
+    def touch(entry):
+        TTSCacheEntry.objects.filter(id=entry.id).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+
+    @staticmethod
+    def evict(max_bytes=None, keep_id=None):
+        """Delete unreferenced entries until they fit in ``max_bytes``."""
+        if max_bytes is None:
+            max_bytes = settings.TTS_CACHE_TEMP_MAX_BYTES
+        unreferenced = TTSCacheEntry.objects.filter(ref_count=0).exclude(
+            id=keep_id
+        )
+        total = unreferenced.aggregate(total=Sum("size"))["total"] or 0
+        evicted = 0
+        for entry in unreferenced.order_by("last_used_at").iterator():
+            if total <= max_bytes:
+                break
+            deleted, _ = TTSCacheEntry.objects.filter(
+                id=entry.id, ref_count=0
+            ).delete()
+            if deleted:
+                entry.audio_file.delete(save=False)
+                total -= entry.size
+                evicted += 1
+        if evicted:
+            logger.info(f"TTS cache: evicted {evicted} temporary entries")
+        return evicted
@@ -1,13 +1,37 @@
+import copy
+import hashlib
+import json
 import time
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
 
-import requests
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from ai_audio.services.audio_join import join_audio
+from ai_audio.services.text_chunks import split_text
+from waylines import http_client, single_flight
 
 logger = logging.getLogger(__name__)
 
+TTS_URL = "https://tts.api.cloud.yandex.net/speech/v1/tts:synthesize"
+MAX_PARALLEL_REQUESTS = 4
+STREAM_CHUNK_SIZE = 8 * 1024
+
+
+def pool_task(fn, *args):
+    """Run ``fn`` on a pool thread, then close its database connections.
+
+    ``single_flight`` reaches the cache, which may be database-backed,
+    and a connection opened on a pool thread is never reused.
+    """
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
 
 class TTSConfig:
     def __init__(
@@ -96,9 +120,7 @@ class TTSService:
             "nova": "jane",
         }
 
-    def generate_audio_with_config(
-        self, config: TTSConfig
-    ) -> tuple[bytes, float]:
+    def build_request_data(self, config: TTSConfig) -> Dict[str, Any]:
         lang_info = self.lang_voice_map.get(
             config.language, self.lang_voice_map["ru"]
         )
@@ -123,36 +145,102 @@ class TTSService:
         if config.pitch != 0:
             data["pitch"] = str(config.pitch)
 
-        return self._make_tts_request(data, lang_info["lang"], final_voice)
+        return data
 
-    def generate_audio(
-        self,
+    def cache_key(self, config: TTSConfig) -> str:
+        """Hash of the request SpeechKit would receive for ``config``.
+
+        Voice aliases are resolved and whitespace in the text collapsed,
+        so configs that produce identical audio share one key.
+        """
+        data = self.build_request_data(config)
+        data["text"] = " ".join(config.text.split())
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def chunk_configs(self, config: TTSConfig) -> list[TTSConfig]:
+        """Split ``config`` into one config per text chunk."""
+        texts = split_text(config.text)
+        if len(texts) <= 1:
+            return [config]
+        chunks = []
+        for text in texts:
+            chunk = copy.copy(config)
+            chunk.text = text
+            chunks.append(chunk)
+        return chunks
+
+    def synthesize(self, config: TTSConfig) -> tuple[bytes, float]:
+        """Synthesize ``config`` with a single SpeechKit request.
+
+        Identical requests already in flight are joined, not repeated.
+        """
+        data = self.build_request_data(config)
+        return single_flight.do(
+            f"tts:{self.cache_key(config)}",
+            lambda: self._make_tts_request(data, data["lang"], data["voice"]),
+        )
+
+    def synthesize_many(
+        self, configs: list[TTSConfig]
+    ) -> list[tuple[bytes, float]]:
+        """Synthesize configs concurrently, keeping their order."""
+        if len(configs) <= 1:
+            return [self.synthesize(config) for config in configs]
+        workers = min(MAX_PARALLEL_REQUESTS, len(configs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda config: pool_task(self.synthesize, config), configs
+                )
+            )
+
+    def generate_audio_with_config(
+        self, config: TTSConfig
+    ) -> tuple[bytes, float]:
+        chunks = self.chunk_configs(config)
+        if len(chunks) == 1:
+            return self.synthesize(config)
+
+        start_time = time.time()
+        results = self.synthesize_many(chunks)
+        audio_content = join_audio(
+            [content for content, _ in results], config.format
+        )
+        return audio_content, time.time() - start_time
+
+    @staticmethod
+    def build_config(
         text: str,
         language: str = "ru",
         voice_type: str = "alloy",
         expressiveness: int = 50,
         **kwargs,
-    ) -> tuple[bytes, float]:
-        voice = kwargs.get("voice")
-        emotion = kwargs.get("emotion", "neutral")
-        speed = float(kwargs.get("speed", 1.0))
-        pitch = int(kwargs.get("pitch", 0))
-        audio_format = kwargs.get("format", "mp3")
-        sample_rate = int(kwargs.get("sample_rate", 48000))
-
-        config = TTSConfig(
+    ) -> TTSConfig:
+        return TTSConfig(
             text=text,
             language=language,
             voice_type=voice_type,
             expressiveness=expressiveness,
-            voice=voice,
-            emotion=emotion,
-            speed=speed,
-            pitch=pitch,
-            audio_format=audio_format,
-            sample_rate=sample_rate,
+            voice=kwargs.get("voice"),
+            emotion=kwargs.get("emotion", "neutral"),
+            speed=float(kwargs.get("speed", 1.0)),
+            pitch=int(kwargs.get("pitch", 0)),
+            audio_format=kwargs.get("format", "mp3"),
+            sample_rate=int(kwargs.get("sample_rate", 48000)),
         )
 
+    def generate_audio(
+        self,
+        text: str,
+        language: str = "ru",
+        voice_type: str = "alloy",
+        expressiveness: int = 50,
+        **kwargs,
+    ) -> tuple[bytes, float]:
+        config = self.build_config(
+            text, language, voice_type, expressiveness, **kwargs
+        )
         return self.generate_audio_with_config(config)
 
     def _make_tts_request(
@@ -160,11 +248,10 @@ class TTSService:
     ) -> tuple[bytes, float]:
         try:
             start_time = time.time()
-            response = requests.post(
-                "https://tts.api.cloud.yandex.net/speech/v1/tts:synthesize",
+            response = http_client.post(
+                TTS_URL,
                 headers={"Authorization": f"Api-Key {self.api_key}"},
                 data=data,
-                timeout=30,
             )
 
             if response.status_code != 200:
@@ -184,3 +271,22 @@ class TTSService:
         except Exception as e:
             logger.error(f"Yandex TTS error: {e}")
             raise
+
+    def stream(self, config: TTSConfig) -> Iterator[bytes]:
+        """Yield audio for a single request as SpeechKit sends it."""
+        data = self.build_request_data(config)
+        response = http_client.post(
+            TTS_URL,
+            headers={"Authorization": f"Api-Key {self.api_key}"},
+            data=data,
+            stream=True,
+        )
+        try:
+            if response.status_code != 200:
+                raise Exception(
+                    f"Yandex TTS error ({response.status_code}): "
+                    f"{response.text[:500]}"
+                )
+            yield from response.iter_content(STREAM_CHUNK_SIZE)
+        finally:
+            response.close()
@@ -1,12 +1,22 @@
+import json
 import time
 import logging
+from typing import Iterator
+
+from requests import Response
 
-import requests
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
+from ai_audio.services.description_cache import DescriptionCacheService
+from waylines import http_client
+
 logger = logging.getLogger(__name__)
 
+COMPLETION_URL = (
+    "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+)
+
 
 class YandexGPTService:
     def __init__(self):
@@ -34,7 +44,150 @@ class YandexGPTService:
         address: str = "",
         style: str = "storytelling",
         language: str = "ru",
+        regenerate: bool = False,
+    ) -> str:
+        """Describe a place, falling back to a template if GPT fails."""
+        try:
+            return self.describe_location(
+                lat, lng, address, style, language, regenerate
+            )
+        except Exception as e:
+            logger.error(f"Yandex GPT error: {e}")
+            return self._generate_fallback_description(
+                lat, lng, address, style, language
+            )
+
+    def describe_location(
+        self,
+        lat: float,
+        lng: float,
+        address: str = "",
+        style: str = "storytelling",
+        language: str = "ru",
+        regenerate: bool = False,
     ) -> str:
+        """Describe a place, reusing a cached text for the same spot.
+
+        ``regenerate`` skips the cache and replaces its entry. Errors
+        from YandexGPT are raised, so fallback texts are never cached.
+        """
+        if not regenerate:
+            cached = DescriptionCacheService.get(
+                lat, lng, address, style, language
+            )
+            if cached is not None:
+                return cached
+
+        system_prompt, user_prompt = self._build_prompts(
+            lat, lng, address, style, language
+        )
+
+        start_time = time.time()
+        response = self._completion_request(system_prompt, user_prompt)
+
+        result = response.json()
+        generated_text = result["result"]["alternatives"][0]["message"]["text"]
+        processing_time = time.time() - start_time
+        logger.info(
+            f"Yandex GPT: generated in {processing_time:.2f}s,"
+            f" {len(generated_text)} chars, lang={language}"
+        )
+
+        DescriptionCacheService.store(
+            lat, lng, address, style, language, generated_text
+        )
+        return generated_text
+
+    def stream_location_description(
+        self,
+        lat: float,
+        lng: float,
+        address: str = "",
+        style: str = "storytelling",
+        language: str = "ru",
+        regenerate: bool = False,
+    ) -> Iterator[str]:
+        """Yield the description piece by piece as YandexGPT writes it.
+
+        A cached description is yielded whole. The complete text is
+        cached once the stream finishes; errors are raised.
+        """
+        if not regenerate:
+            cached = DescriptionCacheService.get(
+                lat, lng, address, style, language
+            )
+            if cached is not None:
+                yield cached
+                return
+
+        system_prompt, user_prompt = self._build_prompts(
+            lat, lng, address, style, language
+        )
+        start_time = time.time()
+        response = self._completion_request(
+            system_prompt, user_prompt, stream=True
+        )
+        generated_text = ""
+        try:
+            # Every line is a JSON result holding the text so far.
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                result = json.loads(line)["result"]
+                text = result["alternatives"][0]["message"]["text"]
+                if text.startswith(generated_text):
+                    delta = text[len(generated_text) :]
+                    generated_text = text
+                    if delta:
+                        yield delta
+        finally:
+            response.close()
+
+        if not generated_text:
+            raise Exception("Yandex GPT returned an empty stream")
+        logger.info(
+            f"Yandex GPT: streamed in {time.time() - start_time:.2f}s,"
+            f" {len(generated_text)} chars, lang={language}"
+        )
+        DescriptionCacheService.store(
+            lat, lng, address, style, language, generated_text
+        )
+
+    def _completion_request(
+        self, system_prompt: str, user_prompt: str, stream: bool = False
+    ) -> Response:
+        response = http_client.post(
+            COMPLETION_URL,
+            headers={
+                "Authorization": f"Api-Key {self.api_key}",
+                "x-folder-id": self.folder_id,
+                "Content-Type": "application/json",
+            },
+            json={
+                "modelUri": f"gpt://{self.folder_id}/yandexgpt/latest",
+                "completionOptions": {
+                    "stream": stream,
+                    "temperature": 0.7,
+                    "maxTokens": 2000,
+                },
+                "messages": [
+                    {"role": "system", "text": system_prompt},
+                    {"role": "user", "text": user_prompt},
+                ],
+            },
+            stream=stream,
+        )
+        if response.status_code != 200:
+            error = response.text[:200]
+            response.close()
+            raise Exception(
+                f"Yandex GPT error ({response.status_code}): {error}"
+            )
+        return response
+
+    def _build_prompts(
+        self, lat: float, lng: float, address: str, style: str, language: str
+    ) -> tuple[str, str]:
         lang_config = {
             "ru": {
                 "system_intro": "Ты профессиональный гид и экскурсовод.",
@@ -218,54 +371,7 @@ class YandexGPTService:
             "Important: Make the text lively and engaging,"
             " as if a guide is giving a live tour right here!"
         )
-
-        try:
-            start_time = time.time()
-            response = requests.post(
-                "https://llm.api.cloud.yandex."
-                "net/foundationModels/v1/completion",
-                headers={
-                    "Authorization": f"Api-Key {self.api_key}",
-                    "x-folder-id": self.folder_id,
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "modelUri": f"gpt://{self.folder_id}/yandexgpt/latest",
-                    "completionOptions": {
-                        "stream": False,
-                        "temperature": 0.7,
-                        "maxTokens": 2000,
-                    },
-                    "messages": [
-                        {"role": "system", "text": system_prompt},
-                        {"role": "user", "text": user_prompt},
-                    ],
-                },
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                raise Exception(
-                    f"Yandex GPT error"
-                    f" ({response.status_code}): {response.text[:200]}"
-                )
-
-            result = response.json()
-            generated_text = result["result"]["alternatives"][0]["message"][
-                "text"
-            ]
-            processing_time = time.time() - start_time
-            logger.info(
-                f"Yandex GPT: generated in {processing_time:.2f}s,"
-                f" {len(generated_text)} chars, lang={language}"
-            )
-            return generated_text
-
-        except Exception as e:
-            logger.error(f"Yandex GPT error: {e}")
-            return self._generate_fallback_description(
-                lat, lng, address, style, language
-            )
+        return system_prompt, user_prompt
 
     def _generate_fallback_description(
         self,
@@ -1,11 +1,44 @@
 import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from routes.models import Route, RoutePoint
 
-from .models import AudioGeneration
+from .models import (
+    AudioGeneration,
+    AudioStreamToken,
+    DescriptionCacheEntry,
+    RouteAudioGuide,
+    TTSCacheEntry,
+)
+from .services.audio_jobs import (
+    AudioJobQueue,
+    RateLimiter,
+    _drain_in_thread,
+)
+from .services.audio_join import (
+    join_audio,
+    mp3_duration,
+    ogg_crc,
+    strip_id3,
+)
+from .services.description_cache import (
+    DescriptionCacheService,
+    encode_geohash,
+)
+from .services.text_chunks import split_text
+from .services.tts_cache import TTSCacheService
+from .services.tts_service import TTSService
+from .services.yandex_gpt_service import YandexGPTService
 
 
 class AudioGenerationModelTest(TestCase):
@@ -234,6 +267,149 @@ class LocationDescriptionViewTest(TestCase):
             pass
 
 
+GPT_POST = "ai_audio.services.yandex_gpt_service.http_client.post"
+
+
+def gpt_response(text):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {
+        "result": {"alternatives": [{"message": {"text": text}}]}
+    }
+    return response
+
+
+def gpt_stream_response(*texts):
+    response = mock.Mock(status_code=200)
+    response.iter_lines.return_value = [
+        json.dumps({"result": {"alternatives": [{"message": {"text": t}}]}})
+        for t in texts
+    ]
+    return response
+
+
+@override_settings(YANDEX_API_KEY="test-key", YANDEX_FOLDER_ID="folder")
+class DescriptionCacheTest(TestCase):
+    def describe(self, lat=55.75580, lng=37.61760, **kwargs):
+        return YandexGPTService().generate_location_description(
+            lat=lat, lng=lng, **kwargs
+        )
+
+    def test_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    @mock.patch(GPT_POST, return_value=gpt_response("Красная площадь"))
+    def test_nearby_points_share_description(self, post):
+        first = self.describe(address="Красная площадь, 1")
+        second = self.describe(
+            lat=55.75581, lng=37.61762, address=" красная  площадь 1 "
+        )
+
+        self.assertEqual(first, second)
+        post.assert_called_once()
+        self.assertEqual(DescriptionCacheEntry.objects.get().hits, 1)
+
+        self.describe(address="Красная площадь, 1", style="poetic")
+        self.describe(address="Красная площадь, 1", language="en")
+        self.assertEqual(post.call_count, 3)
+
+    def test_regenerate_replaces_entry(self):
+        with mock.patch(GPT_POST, return_value=gpt_response("old")):
+            self.describe()
+        with mock.patch(GPT_POST, return_value=gpt_response("new")) as post:
+            self.assertEqual(self.describe(regenerate=True), "new")
+            self.assertEqual(self.describe(), "new")
+        post.assert_called_once()
+        self.assertEqual(DescriptionCacheEntry.objects.count(), 1)
+
+    def test_expired_and_fallback_entries_are_not_served(self):
+        with mock.patch(GPT_POST, return_value=gpt_response("old")):
+            self.describe()
+        DescriptionCacheEntry.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        with mock.patch(GPT_POST, side_effect=Exception("quota")) as post:
+            self.assertNotEqual(self.describe(), "old")
+            self.describe()
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(DescriptionCacheService.purge_expired(), 1)
+
+
+@override_settings(YANDEX_API_KEY="test-key", YANDEX_FOLDER_ID="folder")
+class DescriptionStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client = Client()
+        self.client.login(username="testuser", password="testpass123")
+        self.route = Route.objects.create(
+            author=self.user, name="Test Route", privacy="public"
+        )
+        self.point = RoutePoint.objects.create(
+            route=self.route,
+            name="Test Point",
+            latitude=55.7558,
+            longitude=37.6176,
+            order=1,
+        )
+        self.url = reverse(
+            "ai_audio:generate_location_description", args=[self.point.id]
+        )
+
+    def stream(self, **data):
+        response = self.client.post(
+            self.url,
+            data=json.dumps({"stream": True, **data}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response.streaming_content
+
+    def parse(self, event):
+        name, data = event.decode().strip().split("\n")
+        return name[len("event: ") :], json.loads(data[len("data: ") :])
+
+    @mock.patch(
+        GPT_POST,
+        return_value=gpt_stream_response(
+            "Здесь", "Здесь стоит", "Здесь стоит"
+        ),
+    )
+    def test_stream_sends_deltas_and_saves_on_completion(self, post):
+        events = self.stream(save_to_point=True)
+        self.assertEqual(
+            self.parse(next(events)), ("delta", {"text": "Здесь"})
+        )
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.description, "")
+
+        self.assertEqual(
+            [self.parse(event) for event in events],
+            [
+                ("delta", {"text": " стоит"}),
+                (
+                    "done",
+                    {"status": "success", "description": "Здесь стоит"},
+                ),
+            ],
+        )
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.description, "Здесь стоит")
+        self.assertTrue(post.call_args.kwargs["stream"])
+
+        # The finished text is cached like a regular completion.
+        events = list(self.stream())
+        self.assertEqual(len(events), 2)
+        post.assert_called_once()
+
+    @mock.patch(GPT_POST, side_effect=Exception("quota"))
+    def test_stream_error_does_not_save(self, _):
+        events = [self.parse(event) for event in self.stream(save_to_point=1)]
+        self.assertEqual(events, [("error", {"error": "quota"})])
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.description, "")
+
+
 class AudioStatusViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -352,3 +528,644 @@ class DeleteAudioViewTest(TestCase):
         self.assertFalse(
             AudioGeneration.objects.filter(id=audio_to_delete.id).exists()
         )
+
+
+TTS_REQUEST = "ai_audio.services.tts_service.TTSService._make_tts_request"
+TTS_STREAM = "ai_audio.services.tts_service.TTSService.stream"
+
+
+@override_settings(AUDIO_JOB_MAX_ATTEMPTS=2, YANDEX_API_KEY="test-key")
+class AudioJobQueueTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client = Client()
+        self.client.login(username="testuser", password="testpass123")
+        self.route = Route.objects.create(
+            author=self.user, name="Test Route", privacy="public"
+        )
+        self.point = RoutePoint.objects.create(
+            route=self.route,
+            name="Test Point",
+            latitude=55.7558,
+            longitude=37.6176,
+            order=1,
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def enqueue(self):
+        return AudioJobQueue.enqueue(
+            point=self.point,
+            user=self.user,
+            text="Test text",
+            voice_type="alloy",
+            language="ru",
+            options={"voice": "ermil", "format": "mp3"},
+        )
+
+    def test_generate_audio_returns_queued_job(self):
+        with (
+            mock.patch(TTS_REQUEST) as tts_request,
+            self.captureOnCommitCallbacks() as callbacks,
+        ):
+            response = self.client.post(
+                reverse("ai_audio:generate_audio", args=[self.point.id]),
+                data=json.dumps({"text": "Hello", "speed": 1.2}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["status"], "queued")
+        tts_request.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+        job = AudioGeneration.objects.get(id=data["generation_id"])
+        self.assertEqual(job.options["speed"], 1.2)
+        self.assertEqual(
+            data["status_url"],
+            reverse("ai_audio:audio_status", args=[job.id]),
+        )
+
+    @mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.5))
+    def test_run_next_completes_job(self, tts_request):
+        job = self.enqueue()
+
+        self.assertTrue(AudioJobQueue.run_next("worker-1"))
+        self.assertFalse(AudioJobQueue.run_next("worker-1"))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AudioGeneration.STATUS_COMPLETED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.processing_time, 0.5)
+        self.assertEqual(job.cache_entry.ref_count, 1)
+        self.assertEqual(job.audio_file.name, job.cache_entry.audio_file.name)
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.audio_guide.name, job.audio_file.name)
+        self.route.refresh_from_db()
+        self.assertTrue(self.route.has_audio_guide)
+        data = tts_request.call_args[0][0]
+        self.assertEqual(data["text"], "Test text")
+        self.assertEqual(data["format"], "mp3")
+
+    def test_claim_is_exclusive(self):
+        job = self.enqueue()
+        claimed = AudioJobQueue.claim("worker-1")
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.locked_by, "worker-1")
+        self.assertIsNone(AudioJobQueue.claim("worker-2"))
+
+    @mock.patch(TTS_REQUEST, side_effect=Exception("timeout"))
+    def test_failed_job_is_retried_then_failed(self, tts_request):
+        job = self.enqueue()
+
+        AudioJobQueue.run_next("worker-1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, AudioGeneration.STATUS_QUEUED)
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertFalse(AudioJobQueue.run_next("worker-1"))
+
+        AudioGeneration.objects.filter(id=job.id).update(
+            available_at=timezone.now()
+        )
+        AudioJobQueue.run_next("worker-1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, AudioGeneration.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error_message, "timeout")
+
+        response = self.client.get(
+            reverse("ai_audio:audio_status", args=[job.id])
+        )
+        self.assertEqual(json.loads(response.content)["error"], "timeout")
+
+    def test_release_stale_requeues_job(self):
+        job = self.enqueue()
+        AudioJobQueue.claim("worker-1")
+        AudioGeneration.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(AudioJobQueue.release_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AudioGeneration.STATUS_QUEUED)
+
+    @mock.patch("ai_audio.services.audio_jobs.close_old_connections")
+    @mock.patch("ai_audio.services.audio_jobs._schedule_wake")
+    def test_in_process_pool_rearms_itself(self, schedule_wake, _):
+        job = self.enqueue()
+        AudioJobQueue.claim("worker-1")
+        AudioGeneration.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        with mock.patch.object(AudioJobQueue, "drain") as drain:
+            _drain_in_thread()
+            job.refresh_from_db()
+            self.assertEqual(job.status, AudioGeneration.STATUS_QUEUED)
+            drain.assert_called_once()
+            schedule_wake.assert_not_called()
+
+            AudioGeneration.objects.filter(id=job.id).update(
+                available_at=timezone.now() + timedelta(seconds=30)
+            )
+            _drain_in_thread()
+        (delay,), _ = schedule_wake.call_args
+        self.assertAlmostEqual(delay, 30, delta=5)
+
+    @mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.1))
+    def test_run_audio_worker_command(self, tts_request):
+        self.enqueue()
+        out = StringIO()
+        call_command("run_audio_worker", "--once", concurrency=1, stdout=out)
+        self.assertIn("Processed 1 audio jobs", out.getvalue())
+
+    @override_settings(YANDEX_FOLDER_ID="folder")
+    @mock.patch(GPT_POST, return_value=gpt_response("Текст от гида"))
+    @mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.1))
+    def test_route_batch_describes_points_and_resumes(self, tts, gpt):
+        described = RoutePoint.objects.create(
+            route=self.route,
+            name="Second Point",
+            description="Готовый текст",
+            latitude=55.76,
+            longitude=37.62,
+            order=2,
+        )
+        url = reverse("ai_audio:generate_route_audio", args=[self.route.id])
+        response = self.client.post(
+            url, data=json.dumps({}), content_type="application/json"
+        )
+        self.assertEqual(json.loads(response.content)["queued"], 2)
+
+        # The worker stops after one job; a second request only fills in
+        # what is missing.
+        AudioJobQueue.run_next("worker-1")
+        response = self.client.post(
+            url, data=json.dumps({}), content_type="application/json"
+        )
+        self.assertEqual(json.loads(response.content)["queued"], 0)
+        AudioJobQueue.drain("worker-1")
+
+        status = json.loads(
+            self.client.get(
+                reverse("ai_audio:route_audio_status", args=[self.route.id])
+            ).content
+        )
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual((status["completed"], status["total"]), (2, 2))
+        self.point.refresh_from_db()
+        self.assertEqual(self.point.description, "Текст от гида")
+        gpt.assert_called_once()
+        self.assertEqual(
+            tts.call_args_list[-1][0][0]["text"], described.description
+        )
+
+    def test_route_batch_releases_orphaned_jobs(self):
+        url = reverse("ai_audio:generate_route_audio", args=[self.route.id])
+        self.client.post(
+            url, data=json.dumps({}), content_type="application/json"
+        )
+        job = AudioJobQueue.claim("worker-1")
+        AudioGeneration.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        response = self.client.post(
+            url, data=json.dumps({}), content_type="application/json"
+        )
+        self.assertEqual(json.loads(response.content)["queued"], 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AudioGeneration.STATUS_QUEUED)
+        self.assertEqual(AudioGeneration.objects.count(), 1)
+
+    @mock.patch("ai_audio.services.audio_jobs.time.sleep")
+    def test_rate_limiter_spaces_job_starts(self, sleep):
+        limiter = RateLimiter()
+        for _ in range(3):
+            limiter.wait(per_minute=120)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args[0][0], 1.0, places=1)
+        limiter.wait(per_minute=0)
+        self.assertEqual(sleep.call_count, 2)
+
+
+@override_settings(YANDEX_API_KEY="test-key")
+class TTSCacheTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client = Client()
+        self.client.login(username="testuser", password="testpass123")
+        self.route = Route.objects.create(
+            author=self.user, name="Test Route", privacy="public"
+        )
+        self.point = RoutePoint.objects.create(
+            route=self.route,
+            name="Test Point",
+            latitude=55.7558,
+            longitude=37.6176,
+            order=1,
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def post_temp_audio(self, **data):
+        return self.client.post(
+            reverse("ai_audio:generate_temp_audio"),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+
+    def test_cache_key_normalizes_config(self):
+        tts = TTSService()
+        key = tts.cache_key(tts.build_config("Hello  world", voice="Filipp"))
+        self.assertEqual(
+            key,
+            tts.cache_key(tts.build_config(" Hello world ", voice="Filipp")),
+        )
+        self.assertEqual(
+            key, tts.cache_key(tts.build_config("Hello world", voice="echo"))
+        )
+        self.assertNotEqual(
+            key,
+            tts.cache_key(
+                tts.build_config("Hello world", voice="Filipp", speed=1.2)
+            ),
+        )
+
+    @mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.4))
+    def test_temp_audio_reuses_blob(self, tts_request):
+        first = json.loads(self.post_temp_audio(text="Привет").content)
+        second = json.loads(self.post_temp_audio(text="Привет ").content)
+
+        self.assertEqual(first["audio_url"], second["audio_url"])
+        self.assertEqual(second["processing_time"], 0)
+        tts_request.assert_called_once()
+        entry = TTSCacheEntry.objects.get()
+        self.assertEqual(entry.hits, 1)
+        self.assertEqual(entry.ref_count, 0)
+
+    @mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.4))
+    def test_point_audio_shares_temp_blob(self, tts_request):
+        self.post_temp_audio(text="Привет", voice="ermil")
+        job = AudioJobQueue.enqueue(
+            point=self.point,
+            user=self.user,
+            text="Привет",
+            voice_type="alloy",
+            language="ru",
+            options={"voice": "ermil"},
+        )
+        AudioJobQueue.run_next("worker-1")
+
+        tts_request.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual(job.cache_entry.ref_count, 1)
+
+        response = self.client.delete(
+            reverse("ai_audio:delete_audio", args=[job.id])
+        )
+        self.assertEqual(response.status_code, 200)
+        entry = TTSCacheEntry.objects.get()
+        self.assertEqual(entry.ref_count, 0)
+        self.assertTrue(entry.audio_file.storage.exists(entry.audio_file.name))
+
+    @mock.patch(TTS_REQUEST, return_value=(b"x" * 100, 0.1))
+    def test_evict_removes_least_recently_used_temp_entries(self, _):
+        tts = TTSService()
+        old, _ = TTSCacheService.get_or_create(tts, tts.build_config("one"))
+        kept, _ = TTSCacheService.acquire(tts, tts.build_config("two"))
+        new, _ = TTSCacheService.get_or_create(tts, tts.build_config("three"))
+        TTSCacheEntry.objects.filter(id=old.id).update(
+            last_used_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual(TTSCacheService.evict(max_bytes=100), 1)
+        self.assertEqual(
+            set(TTSCacheEntry.objects.values_list("id", flat=True)),
+            {kept.id, new.id},
+        )
+        self.assertFalse(old.audio_file.storage.exists(old.audio_file.name))
+
+    def test_long_text_reuses_unchanged_chunks(self):
+        paragraphs = [f"Абзац номер {i}. " + "Слово " * 80 for i in range(3)]
+        tts = TTSService()
+        with mock.patch(TTS_REQUEST, return_value=(b"ID3audio", 0.1)) as req:
+            TTSCacheService.get_or_create(
+                tts, tts.build_config("\n\n".join(paragraphs))
+            )
+            self.assertEqual(req.call_count, 3)
+
+            paragraphs[1] = "Новый текст второго абзаца."
+            entry, _ = TTSCacheService.get_or_create(
+                tts, tts.build_config("\n\n".join(paragraphs))
+            )
+            self.assertEqual(req.call_count, 4)
+        self.assertEqual(req.call_args[0][0]["text"], paragraphs[1])
+        self.assertEqual(TTSCacheEntry.objects.count(), 6)
+
+    @mock.patch(TTS_STREAM, return_value=iter([b"AB", b"CD"]))
+    @mock.patch(TTS_REQUEST, return_value=(b"audio", 0.1))
+    def test_stream_relays_first_chunk_and_caches_audio(self, req, stream):
+        paragraphs = [f"Абзац номер {i}. " + "Слово " * 80 for i in range(3)]
+        response = self.post_temp_audio(
+            text="\n\n".join(paragraphs), stream=True
+        )
+        data = json.loads(response.content)
+        self.assertTrue(data["streaming"])
+
+        with mock.patch(
+            "ai_audio.services.tts_service.close_old_connections"
+        ) as close_connections:
+            response = self.client.get(data["audio_url"])
+            self.assertEqual(response["Content-Type"], "audio/mpeg")
+            blocks = list(response.streaming_content)
+        # Each pool thread closes the connections it opened.
+        self.assertEqual(close_connections.call_count, 2)
+        self.assertEqual(blocks[:2], [b"AB", b"CD"])
+        self.assertEqual(b"".join(blocks), b"ABCDaudioaudio")
+        stream.assert_called_once()
+        self.assertEqual(req.call_count, 2)
+        self.assertEqual(TTSCacheEntry.objects.count(), 4)
+
+        data = json.loads(
+            self.post_temp_audio(
+                text="\n\n".join(paragraphs), stream=True
+            ).content
+        )
+        self.assertNotIn("streaming", data)
+        self.assertEqual(data["processing_time"], 0)
+        self.assertEqual(req.call_count, 2)
+
+    def test_stream_token_is_single_use_and_per_user(self):
+        data = json.loads(
+            self.post_temp_audio(text="Привет", stream=True).content
+        )
+        other = User.objects.create_user(username="other", password="pass")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(data["audio_url"]).status_code, 404)
+
+        # Another worker has none of this process's cache.
+        cache.clear()
+        self.client.force_login(self.user)
+        with mock.patch(TTS_STREAM, return_value=iter([b"ID3audio"])):
+            response = self.client.get(data["audio_url"])
+            self.assertEqual(b"".join(response.streaming_content), b"ID3audio")
+        self.assertEqual(self.client.get(data["audio_url"]).status_code, 404)
+        self.assertEqual(TTSCacheEntry.objects.count(), 1)
+
+    def test_expired_stream_token_is_refused(self):
+        data = json.loads(
+            self.post_temp_audio(text="Привет", stream=True).content
+        )
+        AudioStreamToken.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.client.get(data["audio_url"]).status_code, 404)
+
+
+class TextChunkingTest(TestCase):
+    def test_short_text_is_single_chunk(self):
+        self.assertEqual(split_text("  Short   text. "), ["Short text."])
+
+    def test_sentences_are_packed_up_to_limit(self):
+        text = "One two. Three four! Five six? Seven."
+        self.assertEqual(
+            split_text(text, max_chars=20),
+            ["One two. Three four!", "Five six? Seven."],
+        )
+
+    def test_paragraphs_are_not_merged(self):
+        self.assertEqual(
+            split_text("First.\n\nSecond."), ["First.", "Second."]
+        )
+
+    def test_long_sentence_is_split_on_words(self):
+        chunks = split_text("word " * 50, max_chars=30)
+        self.assertTrue(all(len(chunk) <= 30 for chunk in chunks))
+        self.assertEqual(" ".join(chunks), " ".join(["word"] * 50))
+
+    def test_join_mp3_strips_tags(self):
+        tagged = b"ID3\x04\x00\x00\x00\x00\x00\x02ab" + b"\xff\xfbframe"
+        self.assertEqual(strip_id3(tagged), b"\xff\xfbframe")
+        self.assertEqual(
+            join_audio([b"\xff\xfbone", tagged], "mp3"),
+            b"\xff\xfbone\xff\xfbframe",
+        )
+        self.assertEqual(join_audio([b"ab", b"cd"], "lpcm"), b"abcd")
+        with self.assertRaises(ValueError):
+            join_audio([b"ab", b"cd"], "wav")
+
+    def test_join_ogg_chains_streams(self):
+        def page(payload):
+            return (
+                b"OggS\x00\x02"
+                + b"\x00" * 8
+                + b"\x07\x00\x00\x00"
+                + b"\x00" * 8
+                + bytes([1, len(payload)])
+                + payload
+            )
+
+        joined = join_audio([page(b"one"), page(b"two")], "oggopus")
+        first, second = joined[:31], joined[31:]
+        self.assertEqual(first[-3:], b"one")
+        self.assertEqual(second[-3:], b"two")
+        self.assertEqual(first[14:18], (1).to_bytes(4, "little"))
+        self.assertEqual(second[14:18], (2).to_bytes(4, "little"))
+        for chunk in (first, second):
+            unsigned = chunk[:22] + b"\x00" * 4 + chunk[26:]
+            self.assertEqual(
+                chunk[22:26], ogg_crc(unsigned).to_bytes(4, "little")
+            )
+        with self.assertRaises(ValueError):
+            join_audio([page(b"one"), b"junk"], "oggopus")
+
+    @override_settings(YANDEX_API_KEY="test-key")
+    def test_long_text_is_synthesized_in_parallel_chunks(self):
+        text = ". ".join(f"Sentence {i}" for i in range(200))
+        with (
+            mock.patch(TTS_REQUEST, return_value=(b"\xff\xfb", 0.1)) as req,
+            mock.patch(
+                "ai_audio.services.tts_service.close_old_connections"
+            ) as close_connections,
+        ):
+            audio, _ = TTSService().generate_audio(text)
+        self.assertGreater(req.call_count, 1)
+        self.assertEqual(close_connections.call_count, req.call_count)
+        self.assertEqual(audio, b"\xff\xfb" * req.call_count)
+
+
+# One MPEG-1 Layer III frame: 128 kbps, 48 kHz, 24 ms of audio.
+MP3_FRAME = b"\xff\xfb\x94\x00" + b"\x00" * 380
+
+
+def fake_speech(data, lang, voice):
+    # One frame per word so segment lengths follow the text.
+    return MP3_FRAME * len(data["text"].split()), 0.1
+
+
+@override_settings(YANDEX_API_KEY="test-key")
+class RouteAudioGuideTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client = Client()
+        self.client.login(username="testuser", password="testpass123")
+        self.route = Route.objects.create(
+            author=self.user, name="Old town", privacy="public"
+        )
+        self.first = RoutePoint.objects.create(
+            route=self.route,
+            name="Square",
+            description="A big old square",
+            latitude=55.75,
+            longitude=37.61,
+            order=1,
+        )
+        self.second = RoutePoint.objects.create(
+            route=self.route,
+            name="Bridge",
+            latitude=55.76,
+            longitude=37.62,
+            order=2,
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def build(self):
+        response = self.client.post(
+            reverse("ai_audio:generate_route_guide", args=[self.route.id]),
+            data=json.dumps({"language": "en"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(AudioJobQueue.run_next("worker-1"))
+        return RouteAudioGuide.objects.get(route=self.route)
+
+    def test_mp3_duration_counts_frames(self):
+        self.assertAlmostEqual(mp3_duration(MP3_FRAME * 50), 1.2)
+        self.assertAlmostEqual(mp3_duration(b"junk" + MP3_FRAME * 2), 0.048)
+
+    @mock.patch(TTS_REQUEST, side_effect=fake_speech)
+    def test_build_creates_chapter_index(self, tts_request):
+        guide = self.build()
+
+        self.assertEqual(guide.status, AudioGeneration.STATUS_COMPLETED)
+        self.assertEqual(guide.total_points, 2)
+        # Intro (7 words), "Stop 1. Square." (3), narration (4),
+        # "Stop 2. Bridge." (3) at 24 ms per frame.
+        self.assertEqual(
+            [(c["name"], c["offset"]) for c in guide.chapters],
+            [("Square", 0.168), ("Bridge", 0.336)],
+        )
+        self.assertAlmostEqual(guide.total_duration, 0.408)
+        with guide.audio_file.open("rb") as audio_file:
+            self.assertEqual(audio_file.read(), MP3_FRAME * 17)
+        self.assertEqual(TTSCacheEntry.objects.filter(ref_count=1).count(), 4)
+
+        response = self.client.get(
+            reverse("ai_audio:route_guide_status", args=[self.route.id])
+        )
+        self.assertEqual(
+            json.loads(response.content)["chapters"][1]["name"], "Bridge"
+        )
+
+    @mock.patch(TTS_REQUEST, side_effect=fake_speech)
+    def test_rebuild_only_synthesizes_changed_segments(self, tts_request):
+        first = self.build()
+        self.assertEqual(tts_request.call_count, 4)
+
+        unchanged = self.build()
+        self.assertEqual(tts_request.call_count, 4)
+        self.assertEqual(unchanged.fingerprint, first.fingerprint)
+
+        self.second.name = "Stone bridge"
+        self.second.save()
+        rebuilt = self.build()
+        self.assertEqual(tts_request.call_count, 5)
+        self.assertNotEqual(rebuilt.fingerprint, first.fingerprint)
+        self.assertEqual(rebuilt.chapters[1]["name"], "Stone bridge")
+        self.assertEqual(
+            TTSCacheEntry.objects.filter(ref_count__gt=0).count(), 4
+        )
+
+    @mock.patch(TTS_REQUEST, side_effect=fake_speech)
+    def test_point_audio_is_reused(self, tts_request):
+        AudioJobQueue.enqueue(
+            point=self.second,
+            user=self.user,
+            text="Recorded narration",
+            voice_type="alloy",
+            language="en",
+            options={},
+        )
+        AudioJobQueue.run_next("worker-1")
+        self.assertEqual(tts_request.call_count, 1)
+
+        guide = self.build()
+        self.assertEqual(tts_request.call_count, 5)
+        self.assertAlmostEqual(guide.total_duration, 0.456)
+
+    @mock.patch(TTS_REQUEST, side_effect=fake_speech)
+    def test_point_batch_requeues_guide_once(self, tts_request):
+        self.second.description = "An old stone bridge"
+        self.second.save()
+        guide = self.build()
+
+        def regenerate():
+            AudioJobQueue.enqueue_route(
+                self.route, self.user, "alloy", "en", {}, regenerate=True
+            )
+            statuses = []
+            while AudioGeneration.objects.filter(
+                status=AudioGeneration.STATUS_QUEUED
+            ).exists():
+                AudioJobQueue.run_next("worker-1")
+                guide.refresh_from_db()
+                statuses.append(guide.status)
+            return statuses
+
+        # New point audio: the guide waits for the last point job.
+        self.assertEqual(
+            regenerate(),
+            [AudioGeneration.STATUS_COMPLETED, AudioGeneration.STATUS_QUEUED],
+        )
+        self.assertTrue(AudioJobQueue.run_next("worker-1"))
+        guide.refresh_from_db()
+        self.assertEqual(guide.status, AudioGeneration.STATUS_COMPLETED)
+
+        # Same text again resolves to the same cached audio.
+        self.assertEqual(regenerate(), [AudioGeneration.STATUS_COMPLETED] * 2)
+
+    def test_author_only(self):
+        other = User.objects.create_user(username="other", password="pass")
+        self.client.force_login(other)
+        response = self.client.post(
+            reverse("ai_audio:generate_route_guide", args=[self.route.id])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsupported_language_is_rejected(self):
+        response = self.client.post(
+            reverse("ai_audio:generate_route_guide", args=[self.route.id]),
+            data=json.dumps({"language": "es"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RouteAudioGuide.objects.exists())
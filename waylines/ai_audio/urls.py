@@ -26,9 +26,34 @@ urlpatterns = [
         views.generate_temp_description,
         name="generate_temp_description",
     ),
+    path(
+        "route-audio/<int:route_id>/",
+        views.generate_route_audio,
+        name="generate_route_audio",
+    ),
+    path(
+        "route-audio/<int:route_id>/status/",
+        views.route_audio_status,
+        name="route_audio_status",
+    ),
+    path(
+        "route-guide/<int:route_id>/",
+        views.generate_route_guide,
+        name="generate_route_guide",
+    ),
+    path(
+        "route-guide/<int:route_id>/status/",
+        views.route_guide_status,
+        name="route_guide_status",
+    ),
     path(
         "generate-temp-audio/",
         views.generate_temp_audio,
         name="generate_temp_audio",
     ),
+    path(
+        "stream/<str:token>/",
+        views.stream_audio,
+        name="stream_audio",
+    ),
 ]
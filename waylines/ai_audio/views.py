@@ -2,22 +2,67 @@ __all__ = ()
 
 import json
 import logging
+import os
+import uuid
+from datetime import timedelta
 
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext as _
-from routes.models import RoutePoint
+from routes.models import Route, RoutePoint
 
-from .models import AudioGeneration
+from .models import AudioGeneration, AudioStreamToken, RouteAudioGuide
+from .services.audio_jobs import AudioJobQueue
+from .services.route_guide import SUPPORTED_LANGUAGES
+from .services.tts_cache import TTSCacheService
 from .services.tts_service import TTSService
 from .services.yandex_gpt_service import YandexGPTService
 
 logger = logging.getLogger(__name__)
 
+STREAM_TOKEN_TTL = 10 * 60
+AUDIO_CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "oggopus": "audio/ogg",
+}
+
+
+def _sse(event, payload):
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _description_events(gpt_service, params, on_complete=None):
+    """Relay a streamed description as Server-Sent Events.
+
+    ``delta`` events carry new text, then ``done`` carries the whole
+    description, which is only then passed to ``on_complete``.
+    """
+    description = ""
+    try:
+        for delta in gpt_service.stream_location_description(**params):
+            description += delta
+            yield _sse("delta", {"text": delta})
+        if on_complete is not None:
+            on_complete(description)
+    except Exception as e:
+        logger.error(f"Description stream error: {e}")
+        yield _sse("error", {"error": str(e)})
+        return
+    yield _sse("done", {"status": "success", "description": description})
+
 
 @csrf_exempt
 @login_required
@@ -34,54 +79,32 @@ def generate_audio(request, point_id):
             return JsonResponse({"error": _("Text is empty")}, status=400)
 
         voice_type = data.get("voice_type", "alloy")
-        voice = data.get("voice", "ermil")
         language = data.get("language", "ru")
-        expressiveness = int(data.get("expressiveness", 50))
-        emotion = data.get("emotion", "neutral")
-        speed = float(data.get("speed", 1.0))
-        pitch = int(data.get("pitch", 0))
-        format = data.get("format", "mp3")
-
-        tts = TTSService()
-        audio_content, processing_time = tts.generate_audio(
-            text=text,
-            language=language,
-            voice_type=voice_type,
-            expressiveness=expressiveness,
-            voice=voice,
-            emotion=emotion,
-            speed=speed,
-            pitch=pitch,
-            format=format,
-        )
+        options = {
+            "voice": data.get("voice", "ermil"),
+            "expressiveness": int(data.get("expressiveness", 50)),
+            "emotion": data.get("emotion", "neutral"),
+            "speed": float(data.get("speed", 1.0)),
+            "pitch": int(data.get("pitch", 0)),
+            "format": data.get("format", "mp3"),
+        }
 
-        audio_gen = AudioGeneration.objects.create(
+        audio_gen = AudioJobQueue.enqueue(
             point=point,
             user=request.user,
-            text_content=text,
+            text=text,
             voice_type=voice_type,
             language=language,
-            status="completed",
-            processing_time=processing_time,
+            options=options,
         )
 
-        filename = f"audio_guide_{point.id}_{audio_gen.id}.{format}"
-        audio_gen.audio_file.save(
-            filename, ContentFile(audio_content), save=True
-        )
-
-        point.audio_guide = audio_gen.audio_file
-        point.save(update_fields=["audio_guide"])
-
-        route = point.route
-        if not route.has_audio_guide:
-            route.has_audio_guide = True
-            route.save(update_fields=["has_audio_guide"])
-
         return JsonResponse(
             {
-                "status": "success",
-                "audio_url": audio_gen.audio_file.url,
+                "status": audio_gen.status,
+                "generation_id": audio_gen.id,
+                "status_url": reverse(
+                    "ai_audio:audio_status", args=[audio_gen.id]
+                ),
             }
         )
 
@@ -122,14 +145,30 @@ def generate_location_description(request, point_id):
 
         address = getattr(point, "address", "") or ""
 
+        params = {
+            "lat": float(lat),
+            "lng": float(lng),
+            "address": address,
+            "style": style,
+            "language": language,
+            "regenerate": bool(data.get("regenerate", False)),
+        }
         gpt_service = YandexGPTService()
-        description = gpt_service.generate_location_description(
-            lat=float(lat),
-            lng=float(lng),
-            address=address,
-            style=style,
-            language=language,
-        )
+
+        if data.get("stream"):
+
+            def save_description(description):
+                point.description = description
+                point.save(update_fields=["description"])
+
+            on_complete = (
+                save_description if data.get("save_to_point") else None
+            )
+            return _event_stream(
+                _description_events(gpt_service, params, on_complete)
+            )
+
+        description = gpt_service.generate_location_description(**params)
 
         if data.get("save_to_point", False):
             point.description = description
@@ -164,9 +203,16 @@ def get_audio_status(request, generation_id):
     return JsonResponse(
         {
             "status": audio_gen.status,
+            "generation_id": audio_gen.id,
+            "attempts": audio_gen.attempts,
             "audio_url": (
                 audio_gen.audio_file.url if audio_gen.audio_file else None
             ),
+            "error": (
+                audio_gen.error_message
+                if audio_gen.status == AudioGeneration.STATUS_FAILED
+                else None
+            ),
         }
     )
 
@@ -178,7 +224,7 @@ def delete_audio(request, generation_id):
     audio_gen = get_object_or_404(
         AudioGeneration, id=generation_id, user=request.user
     )
-    if audio_gen.audio_file:
+    if audio_gen.audio_file and not audio_gen.cache_entry_id:
         audio_gen.audio_file.delete(save=False)
     audio_gen.delete()
     return JsonResponse({"status": "success"})
@@ -201,14 +247,20 @@ def generate_temp_description(request):
                 {"error": _("Coordinates are required")}, status=400
             )
 
+        params = {
+            "lat": float(lat),
+            "lng": float(lng),
+            "address": address,
+            "style": style,
+            "language": language,
+            "regenerate": bool(data.get("regenerate", False)),
+        }
         gpt_service = YandexGPTService()
-        description = gpt_service.generate_location_description(
-            lat=float(lat),
-            lng=float(lng),
-            address=address,
-            style=style,
-            language=language,
-        )
+
+        if data.get("stream"):
+            return _event_stream(_description_events(gpt_service, params))
+
+        description = gpt_service.generate_location_description(**params)
 
         return JsonResponse(
             {
@@ -236,41 +288,54 @@ def generate_temp_audio(request):
         if not text:
             return JsonResponse({"error": _("Text is empty")}, status=400)
 
-        voice_type = data.get("voice_type", "alloy")
-        voice = data.get("voice", "ermil")
-        language = data.get("language", "ru")
-        expressiveness = int(data.get("expressiveness", 50))
-        emotion = data.get("emotion", "neutral")
-        speed = float(data.get("speed", 1.0))
-        pitch = int(data.get("pitch", 0))
-        format = data.get("format", "mp3")
-
+        options = {
+            "text": text,
+            "language": data.get("language", "ru"),
+            "voice_type": data.get("voice_type", "alloy"),
+            "expressiveness": int(data.get("expressiveness", 50)),
+            "voice": data.get("voice", "ermil"),
+            "emotion": data.get("emotion", "neutral"),
+            "speed": float(data.get("speed", 1.0)),
+            "pitch": int(data.get("pitch", 0)),
+            "format": data.get("format", "mp3"),
+        }
         tts = TTSService()
-        audio_content, processing_time = tts.generate_audio(
-            text=text,
-            language=language,
-            voice_type=voice_type,
-            expressiveness=expressiveness,
-            voice=voice,
-            emotion=emotion,
-            speed=speed,
-            pitch=pitch,
-            format=format,
-        )
-
-        from django.core.files.storage import default_storage
-        from django.utils import timezone
-        import os
-
-        timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"temp_audio_{request.user.id}_{timestamp}.{format}"
-        filepath = os.path.join("temp", filename)
-
-        path = default_storage.save(filepath, ContentFile(audio_content))
-        audio_url = default_storage.url(path)
+        config = tts.build_config(**options)
+
+        if data.get("stream"):
+            entry = TTSCacheService.find(tts, config)
+            if entry is None:
+                now = timezone.now()
+                AudioStreamToken.objects.filter(expires_at__lte=now).delete()
+                token = uuid.uuid4().hex
+                AudioStreamToken.objects.create(
+                    token=token,
+                    user=request.user,
+                    options=options,
+                    expires_at=now + timedelta(seconds=STREAM_TOKEN_TTL),
+                )
+                return JsonResponse(
+                    {
+                        "status": "success",
+                        "streaming": True,
+                        "audio_url": reverse(
+                            "ai_audio:stream_audio", args=[token]
+                        ),
+                    }
+                )
+            TTSCacheService.touch(entry)
+            processing_time = 0.0
+        else:
+            entry, processing_time = TTSCacheService.get_or_create(tts, config)
+        TTSCacheService.evict(keep_id=entry.id)
 
         return JsonResponse(
-            {"status": "success", "audio_url": audio_url, "filename": filename}
+            {
+                "status": "success",
+                "audio_url": entry.audio_file.url,
+                "filename": os.path.basename(entry.audio_file.name),
+                "processing_time": processing_time,
+            }
         )
 
     except (ValueError, TypeError) as e:
@@ -279,3 +344,160 @@ def generate_temp_audio(request):
     except Exception as e:
         logger.error(f"Temp audio generation error: {e}")
         return JsonResponse({"error": str(e)}, status=500)
+
+
+@login_required
+@require_http_methods(["GET"])
+def stream_audio(request, token):
+    """Relay audio prepared by ``generate_temp_audio`` as it is synthesized.
+
+    The token is single use; the audio it produces stays in the TTS
+    cache, so replaying the preview hits storage instead.
+    """
+    pending = AudioStreamToken.objects.filter(
+        token=token, user=request.user, expires_at__gt=timezone.now()
+    ).first()
+    # Deleting claims the token; a concurrent request gets nothing.
+    if (
+        pending is None
+        or not AudioStreamToken.objects.filter(id=pending.id).delete()[0]
+    ):
+        raise Http404
+
+    tts = TTSService()
+    config = tts.build_config(**pending.options)
+    response = StreamingHttpResponse(
+        TTSCacheService.stream(tts, config),
+        content_type=AUDIO_CONTENT_TYPES.get(
+            config.format, "application/octet-stream"
+        ),
+    )
+    response["Cache-Control"] = "no-store"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+@login_required
+@require_http_methods(["POST"])
+def generate_route_audio(request, route_id):
+    route = get_object_or_404(Route, id=route_id, author=request.user)
+
+    try:
+        data = json.loads(request.body or "{}")
+        options = {
+            "voice": data.get("voice", "ermil"),
+            "expressiveness": int(data.get("expressiveness", 50)),
+            "emotion": data.get("emotion", "neutral"),
+            "speed": float(data.get("speed", 1.0)),
+            "pitch": int(data.get("pitch", 0)),
+            "format": data.get("format", "mp3"),
+        }
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid parameter in route audio request: {e}")
+        return JsonResponse({"error": _("Invalid parameter")}, status=400)
+
+    if not route.points.exists():
+        return JsonResponse({"error": _("Route has no points")}, status=400)
+
+    jobs = AudioJobQueue.enqueue_route(
+        route,
+        request.user,
+        voice_type=data.get("voice_type", "alloy"),
+        language=data.get("language", "ru"),
+        options=options,
+        style=data.get("style", "storytelling"),
+        regenerate=bool(data.get("regenerate", False)),
+    )
+    return JsonResponse(
+        {
+            "status": "success",
+            "queued": len(jobs),
+            "status_url": reverse(
+                "ai_audio:route_audio_status", args=[route.id]
+            ),
+        }
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+def route_audio_status(request, route_id):
+    route = get_object_or_404(Route, id=route_id, author=request.user)
+    points = AudioJobQueue.route_progress(route)
+    counts = {}
+    for point in points:
+        counts[point["status"]] = counts.get(point["status"], 0) + 1
+    done = counts.get(AudioGeneration.STATUS_COMPLETED, 0)
+    pending = counts.get(AudioGeneration.STATUS_QUEUED, 0) + counts.get(
+        AudioGeneration.STATUS_PROCESSING, 0
+    )
+    return JsonResponse(
+        {
+            "status": (
+                AudioGeneration.STATUS_PROCESSING
+                if pending
+                else AudioGeneration.STATUS_COMPLETED
+            ),
+            "total": len(points),
+            "completed": done,
+            "failed": counts.get(AudioGeneration.STATUS_FAILED, 0),
+            "points": points,
+        }
+    )
+
+
+@csrf_exempt
+@login_required
+@require_http_methods(["POST"])
+def generate_route_guide(request, route_id):
+    route = get_object_or_404(Route, id=route_id, author=request.user)
+
+    try:
+        data = json.loads(request.body or "{}")
+        options = {
+            "language": data.get("language", "ru"),
+            "voice_type": data.get("voice_type", "alloy"),
+            "voice": data.get("voice", "ermil"),
+            "emotion": data.get("emotion", "neutral"),
+            "speed": float(data.get("speed", 1.0)),
+        }
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid parameter in route guide request: {e}")
+        return JsonResponse({"error": _("Invalid parameter")}, status=400)
+
+    if options["language"] not in SUPPORTED_LANGUAGES:
+        return JsonResponse({"error": _("Unsupported language")}, status=400)
+    if not route.points.exists():
+        return JsonResponse({"error": _("Route has no points")}, status=400)
+
+    guide = AudioJobQueue.enqueue_route_guide(route, request.user, options)
+    return JsonResponse(
+        {
+            "status": guide.status,
+            "status_url": reverse(
+                "ai_audio:route_guide_status", args=[route.id]
+            ),
+        }
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+def route_guide_status(request, route_id):
+    guide = get_object_or_404(
+        RouteAudioGuide, route_id=route_id, route__author=request.user
+    )
+    return JsonResponse(
+        {
+            "status": guide.status,
+            "audio_url": guide.audio_file.url if guide.audio_file else None,
+            "total_duration": guide.total_duration,
+            "chapters": guide.chapters,
+            "error": (
+                guide.error_message
+                if guide.status == AudioGeneration.STATUS_FAILED
+                else None
+            ),
+        }
+    )
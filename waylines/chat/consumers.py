@@ -0,0 +1,107 @@
+import abc
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from routes.models import Route
+from routes.views import can_view_route
+
+from .models import Conversation
+from .services.realtime import (
+    MESSAGE_EVENT,
+    UNREAD_EVENT,
+    ChatRealtimeService,
+)
+from .services.unread import UnreadSummaryService
+
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer, abc.ABC):
+    """Read-only feed of new messages in one chat.
+
+    Messages are still sent through the HTTP endpoints; the socket
+    replaces polling for them.
+    """
+
+    group_name = None
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.group_name = await self.get_group_name(
+            user, **self.scope["url_route"]["kwargs"]
+        )
+        if self.group_name is None:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group_name is not None:
+            await self.channel_layer.group_discard(
+                self.group_name, self.channel_name
+            )
+
+    async def dispatch(self, message):
+        # Channels hops to a sync thread to close stale database
+        # connections before every handler; pushed messages need no
+        # database, and that hop dominated fan-out time.
+        if message["type"] == MESSAGE_EVENT:
+            await self.chat_message(message)
+        elif message["type"] == UNREAD_EVENT:
+            await self.chat_unread(message)
+        else:
+            await super().dispatch(message)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("type") == "ping":
+            await self.send_json({"type": "pong"})
+
+    async def chat_message(self, event):
+        await self.send_json({"type": "message", "message": event["message"]})
+
+    async def chat_unread(self, event):
+        await self.send_json({"type": "unread_changed"})
+
+    @abc.abstractmethod
+    async def get_group_name(self, user, **kwargs):
+        """Group to join for ``user``, or None to refuse the socket."""
+
+
+class PrivateChatConsumer(ChatConsumer):
+    @database_sync_to_async
+    def get_group_name(self, user, conversation_id):
+        if not Conversation.objects.filter(
+            id=conversation_id, participants=user
+        ).exists():
+            return None
+        return ChatRealtimeService.conversation_group(conversation_id)
+
+
+class RouteChatConsumer(ChatConsumer):
+    @database_sync_to_async
+    def get_group_name(self, user, route_id):
+        route = Route.objects.filter(id=route_id).first()
+        if route is None or not can_view_route(user, route):
+            return None
+        return ChatRealtimeService.route_group(route_id)
+
+
+class UnreadConsumer(ChatConsumer):
+    """Unread summary for the navbar badge, sent on connect and change."""
+
+    async def connect(self):
+        await super().connect()
+        if self.group_name is not None:
+            summary = await database_sync_to_async(UnreadSummaryService.get)(
+                self.scope["user"]
+            )
+            await self.send_json({"type": "unread", "unread": summary})
+
+    async def get_group_name(self, user):
+        return ChatRealtimeService.user_group(user.id)
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import resource
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.consumers import RouteChatConsumer
+from chat.models import RouteChatMessage
+from chat.services.realtime import ChatRealtimeService
+from routes.models import Route
+
+RECEIVE_TIMEOUT = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure chat WebSocket fan-out in one worker: connect clients "
+        "to a route chat, then write and push messages to all of them. "
+        "Test data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument(
+            "--burst",
+            type=int,
+            default=50,
+            help="Messages sent before waiting for every client to get them",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["clients"], options["messages"], options["burst"]) < 1:
+            raise CommandError("All counts must be positive")
+
+        user = User.objects.create_user(
+            username=f"chat-benchmark-{uuid.uuid4().hex[:8]}"
+        )
+        try:
+            route = Route.objects.create(
+                author=user, name="Chat benchmark", privacy="public"
+            )
+            stats = async_to_sync(self.run)(
+                user,
+                route,
+                options["clients"],
+                options["messages"],
+                options["burst"],
+            )
+        finally:
+            # Removes the route, its chat and the messages as well.
+            user.delete()
+
+        clients, messages = options["clients"], options["messages"]
+        self.stdout.write(
+            f"Connected {clients} clients in {stats['connect']:.2f}s "
+            f"({clients / stats['connect']:.0f} connections/s, "
+            f"~{stats['memory_kb'] / clients:.1f} KB per client)"
+        )
+        for phase, label in (
+            ("write", "Saved and pushed"),
+            ("push", "Pushed (no database writes)"),
+        ):
+            seconds = stats[phase]
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{label}: {messages} messages to {clients} clients in "
+                    f"{seconds:.2f}s, {messages / seconds:.0f} messages/s, "
+                    f"{messages * clients / seconds:.0f} deliveries/s"
+                )
+            )
+
+    async def run(self, user, route, client_count, message_count, burst):
+        route_chat = await database_sync_to_async(lambda: route.chat)()
+        group = ChatRealtimeService.route_group(route.id)
+
+        memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        clients = [
+            await self.connect(user, route.id) for _ in range(client_count)
+        ]
+        connect_time = time.perf_counter() - started
+        memory_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        create = database_sync_to_async(RouteChatMessage.objects.create)
+        payload = None
+
+        async def write(number):
+            # Saving publishes the message through the post_save hook.
+            nonlocal payload
+            message = await create(
+                route_chat=route_chat,
+                user=user,
+                message=f"Benchmark message {number}",
+            )
+            payload = ChatRealtimeService.serialize_route_message(
+                message, route.id
+            )
+
+        async def push(number):
+            await ChatRealtimeService.apublish(group, payload)
+
+        timings = {}
+        for phase, send in (("write", write), ("push", push)):
+            started = time.perf_counter()
+            sent = 0
+            while sent < message_count:
+                size = min(burst, message_count - sent)
+                for _ in range(size):
+                    await send(sent)
+                    sent += 1
+                await asyncio.gather(
+                    *(self.drain(client, size) for client in clients)
+                )
+            timings[phase] = time.perf_counter() - started
+
+        for client in clients:
+            await client.send_input(
+                {"type": "websocket.disconnect", "code": 1000}
+            )
+            await client.wait(RECEIVE_TIMEOUT)
+        return {
+            "connect": connect_time,
+            **timings,
+            "memory_kb": max(memory_after - memory_before, 0),
+        }
+
+    @staticmethod
+    async def connect(user, route_id):
+        client = ApplicationCommunicator(
+            RouteChatConsumer.as_asgi(),
+            {
+                "type": "websocket",
+                "path": f"/ws/chat/route/{route_id}/",
+                "headers": [],
+                "subprotocols": [],
+                "user": user,
+                "url_route": {"args": (), "kwargs": {"route_id": route_id}},
+            },
+        )
+        await client.send_input({"type": "websocket.connect"})
+        response = await client.receive_output(RECEIVE_TIMEOUT)
+        if response["type"] != "websocket.accept":
+            raise CommandError(f"Connection refused: {response}")
+        return client
+
+    @staticmethod
+    async def drain(client, count):
+        for _ in range(count):
+            event = await client.receive_output(RECEIVE_TIMEOUT)
+            json.loads(event["text"])
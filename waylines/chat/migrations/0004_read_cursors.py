@@ -0,0 +1,205 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def last_read_id(messages):
+    """Highest id before the first unread message of the old flags."""
+    first_unread = (
+        messages.filter(is_read=False)
+        .order_by("id")
+        .values_list("id", flat=True)
+        .first()
+    )
+    if first_unread is not None:
+        return first_unread - 1
+    return messages.order_by("-id").values_list("id", flat=True).first()
+
+
+def seed_read_cursors(apps, schema_editor):
+    Conversation = apps.get_model("chat", "Conversation")
+    RouteChat = apps.get_model("chat", "RouteChat")
+    ConversationReadCursor = apps.get_model("chat", "ConversationReadCursor")
+    RouteChatReadCursor = apps.get_model("chat", "RouteChatReadCursor")
+
+    cursors = []
+    for conversation in Conversation.objects.prefetch_related("participants"):
+        for user in conversation.participants.all():
+            last_read = last_read_id(
+                conversation.messages.exclude(sender=user)
+            )
+            if last_read:
+                cursors.append(
+                    ConversationReadCursor(
+                        conversation=conversation,
+                        user=user,
+                        last_read_id=last_read,
+                    )
+                )
+    ConversationReadCursor.objects.bulk_create(cursors, batch_size=500)
+
+    # The old flag was shared by every reader; only the author and the
+    # users a route is shared with are known readers.
+    cursors = []
+    for route_chat in RouteChat.objects.select_related(
+        "route"
+    ).prefetch_related("route__shared_with"):
+        readers = {route_chat.route.author_id}
+        readers.update(user.id for user in route_chat.route.shared_with.all())
+        for user_id in readers:
+            last_read = last_read_id(
+                route_chat.messages.exclude(user_id=user_id)
+            )
+            if last_read:
+                cursors.append(
+                    RouteChatReadCursor(
+                        route_chat=route_chat,
+                        user_id=user_id,
+                        last_read_id=last_read,
+                    )
+                )
+    RouteChatReadCursor.objects.bulk_create(cursors, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_alter_conversation_options_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConversationReadCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_read_id",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Last read message"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Updated"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Conversation read cursor",
+                "verbose_name_plural": "Conversation read cursors",
+            },
+        ),
+        migrations.CreateModel(
+            name="RouteChatReadCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_read_id",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Last read message"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Updated"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Route chat read cursor",
+                "verbose_name_plural": "Route chat read cursors",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="privatemessage",
+            index=models.Index(
+                fields=["conversation", "id"],
+                name="chat_privat_convers_f9c05a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routechatmessage",
+            index=models.Index(
+                fields=["route_chat", "id"],
+                name="chat_routec_route_c_565fd6_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationreadcursor",
+            name="conversation",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="read_cursors",
+                to="chat.conversation",
+                verbose_name="Conversation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversationreadcursor",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="conversation_read_cursors",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+        migrations.AddField(
+            model_name="routechatreadcursor",
+            name="route_chat",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="read_cursors",
+                to="chat.routechat",
+                verbose_name="Route chat",
+            ),
+        ),
+        migrations.AddField(
+            model_name="routechatreadcursor",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="route_chat_read_cursors",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="conversationreadcursor",
+            unique_together={("user", "conversation")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="routechatreadcursor",
+            unique_together={("user", "route_chat")},
+        ),
+        migrations.RunPython(seed_read_cursors, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="privatemessage",
+            name="is_read",
+        ),
+        migrations.RemoveField(
+            model_name="routechatmessage",
+            name="is_read",
+        ),
+    ]
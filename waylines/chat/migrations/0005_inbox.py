@@ -0,0 +1,219 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def last_read_id(thread, user_id):
+    return (
+        thread.read_cursors.filter(user_id=user_id)
+        .values_list("last_read_id", flat=True)
+        .first()
+    )
+
+
+def build_inbox(apps, schema_editor):
+    Conversation = apps.get_model("chat", "Conversation")
+    RouteChat = apps.get_model("chat", "RouteChat")
+    InboxEntry = apps.get_model("chat", "InboxEntry")
+
+    entries = []
+    for conversation in Conversation.objects.prefetch_related("participants"):
+        participants = [user.id for user in conversation.participants.all()]
+        last = conversation.messages.order_by("-id").first()
+        for user_id in participants:
+            entries.append(
+                InboxEntry(
+                    user_id=user_id,
+                    kind="private",
+                    conversation=conversation,
+                    other_user_id=next(
+                        (other for other in participants if other != user_id),
+                        None,
+                    ),
+                    last_message_id=last.id if last else None,
+                    last_message_preview=last.content[:100] if last else "",
+                    last_sender_id=last.sender_id if last else None,
+                    last_activity=(
+                        last.created_at if last else conversation.updated_at
+                    ),
+                    unread_count=conversation.messages.exclude(
+                        sender_id=user_id
+                    )
+                    .filter(id__gt=last_read_id(conversation, user_id) or 0)
+                    .count(),
+                )
+            )
+
+    for route_chat in RouteChat.objects.select_related(
+        "route"
+    ).prefetch_related("route__shared_with"):
+        route = route_chat.route
+        readers = {route.author_id: "own_route"}
+        for user in route.shared_with.all():
+            readers.setdefault(user.id, "shared_route")
+        # Public chats are in the inbox of those who opened or wrote in
+        # them; a writer has read everything up to their last message.
+        own_posts = {}
+        for user_id, message_id in route_chat.messages.values_list(
+            "user_id", "id"
+        ):
+            own_posts[user_id] = max(own_posts.get(user_id, 0), message_id)
+        for user_id in [
+            *route_chat.read_cursors.values_list("user_id", flat=True),
+            *own_posts,
+        ]:
+            readers.setdefault(user_id, "public_route")
+
+        last = route_chat.messages.order_by("-id").first()
+        for user_id, kind in readers.items():
+            last_read = last_read_id(route_chat, user_id)
+            if last_read is None and kind == "public_route":
+                last_read = own_posts[user_id]
+            entries.append(
+                InboxEntry(
+                    user_id=user_id,
+                    kind=kind,
+                    route_chat=route_chat,
+                    last_message_id=last.id if last else None,
+                    last_message_preview=last.message[:100] if last else "",
+                    last_sender_id=last.user_id if last else None,
+                    last_activity=last.timestamp if last else route.created_at,
+                    unread_count=route_chat.messages.exclude(user_id=user_id)
+                    .filter(id__gt=last_read or 0)
+                    .count(),
+                )
+            )
+    InboxEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_read_cursors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InboxEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("private", "Private conversation"),
+                            ("own_route", "Own route chat"),
+                            ("shared_route", "Shared route chat"),
+                            ("public_route", "Public route chat"),
+                        ],
+                        max_length=20,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "last_message_id",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="Last message"
+                    ),
+                ),
+                (
+                    "last_message_preview",
+                    models.CharField(
+                        blank=True,
+                        max_length=100,
+                        verbose_name="Last message preview",
+                    ),
+                ),
+                (
+                    "last_activity",
+                    models.DateTimeField(verbose_name="Last activity"),
+                ),
+                (
+                    "unread_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Unread"
+                    ),
+                ),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_entries",
+                        to="chat.conversation",
+                        verbose_name="Conversation",
+                    ),
+                ),
+                (
+                    "last_sender",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Last sender",
+                    ),
+                ),
+                (
+                    "other_user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Other participant",
+                    ),
+                ),
+                (
+                    "route_chat",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_entries",
+                        to="chat.routechat",
+                        verbose_name="Route chat",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Inbox entry",
+                "verbose_name_plural": "Inbox entries",
+                "ordering": ["-last_activity"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-last_activity"],
+                        name="chat_inboxe_user_id_a54ee5_idx",
+                    )
+                ],
+                "unique_together": {
+                    ("user", "conversation"),
+                    ("user", "route_chat"),
+                },
+            },
+        ),
+        migrations.RunPython(build_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0005_inbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="privatemessage",
+            index=models.Index(
+                fields=["conversation", "created_at", "id"],
+                name="chat_privat_convers_9c92a8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routechatmessage",
+            index=models.Index(
+                fields=["route_chat", "timestamp", "id"],
+                name="chat_routec_route_c_6b644c_idx",
+            ),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from routes.models import Route
@@ -32,7 +32,9 @@ class Conversation(models.Model):
         )
 
     def get_unread_count(self, user):
-        return self.messages.exclude(sender=user).filter(is_read=False).count()
+        from chat.services.read_state import ReadStateService
+
+        return ReadStateService.conversation_unread_count(user, self)
 
 
 class PrivateMessage(models.Model):
@@ -49,13 +51,16 @@ class PrivateMessage(models.Model):
         verbose_name=_("Sender"),
     )
     content = models.TextField(_("Message"), max_length=1000)
-    is_read = models.BooleanField(_("Read"), default=False)
     created_at = models.DateTimeField(_("Created"), auto_now_add=True)
 
     class Meta:
         verbose_name = _("Private message")
         verbose_name_plural = _("Private messages")
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["conversation", "id"]),
+            models.Index(fields=["conversation", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
@@ -93,12 +98,15 @@ class RouteChatMessage(models.Model):
     )
     message = models.TextField(_("Message"), max_length=1000)
     timestamp = models.DateTimeField(_("Time"), auto_now_add=True)
-    is_read = models.BooleanField(_("Read"), default=False)
 
     class Meta:
         verbose_name = _("Route chat message")
         verbose_name_plural = _("Route chat messages")
         ordering = ["timestamp"]
+        indexes = [
+            models.Index(fields=["route_chat", "id"]),
+            models.Index(fields=["route_chat", "timestamp", "id"]),
+        ]
 
     def __str__(self):
         return (
@@ -107,7 +115,217 @@ class RouteChatMessage(models.Model):
         )
 
 
+class ConversationReadCursor(models.Model):
+    """The last message a participant has read in a conversation."""
+
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name="read_cursors",
+        verbose_name=_("Conversation"),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="conversation_read_cursors",
+        verbose_name=_("User"),
+    )
+    last_read_id = models.PositiveBigIntegerField(
+        _("Last read message"), default=0
+    )
+    updated_at = models.DateTimeField(_("Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Conversation read cursor")
+        verbose_name_plural = _("Conversation read cursors")
+        unique_together = ["user", "conversation"]
+
+    def __str__(self):
+        return (
+            f"User {self.user_id} read conversation "
+            f"{self.conversation_id} up to {self.last_read_id}"
+        )
+
+
+class RouteChatReadCursor(models.Model):
+    """The last message a reader has seen in a route chat."""
+
+    route_chat = models.ForeignKey(
+        RouteChat,
+        on_delete=models.CASCADE,
+        related_name="read_cursors",
+        verbose_name=_("Route chat"),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="route_chat_read_cursors",
+        verbose_name=_("User"),
+    )
+    last_read_id = models.PositiveBigIntegerField(
+        _("Last read message"), default=0
+    )
+    updated_at = models.DateTimeField(_("Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Route chat read cursor")
+        verbose_name_plural = _("Route chat read cursors")
+        unique_together = ["user", "route_chat"]
+
+    def __str__(self):
+        return (
+            f"User {self.user_id} read route chat "
+            f"{self.route_chat_id} up to {self.last_read_id}"
+        )
+
+
+class InboxEntry(models.Model):
+    """One row per user and chat thread, kept current on every write.
+
+    The chat dashboard reads a user's threads from here in a single
+    query instead of computing the last message and the unread count
+    of every conversation and route chat on each request.
+    """
+
+    KIND_PRIVATE = "private"
+    KIND_OWN_ROUTE = "own_route"
+    KIND_SHARED_ROUTE = "shared_route"
+    KIND_PUBLIC_ROUTE = "public_route"
+    KIND_CHOICES = [
+        (KIND_PRIVATE, _("Private conversation")),
+        (KIND_OWN_ROUTE, _("Own route chat")),
+        (KIND_SHARED_ROUTE, _("Shared route chat")),
+        (KIND_PUBLIC_ROUTE, _("Public route chat")),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="inbox_entries",
+        verbose_name=_("User"),
+    )
+    kind = models.CharField(_("Kind"), max_length=20, choices=KIND_CHOICES)
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="inbox_entries",
+        verbose_name=_("Conversation"),
+    )
+    route_chat = models.ForeignKey(
+        RouteChat,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="inbox_entries",
+        verbose_name=_("Route chat"),
+    )
+    other_user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Other participant"),
+    )
+    last_message_id = models.PositiveBigIntegerField(
+        _("Last message"), null=True, blank=True
+    )
+    last_message_preview = models.CharField(
+        _("Last message preview"), max_length=100, blank=True
+    )
+    last_sender = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Last sender"),
+    )
+    last_activity = models.DateTimeField(_("Last activity"))
+    unread_count = models.PositiveIntegerField(_("Unread"), default=0)
+
+    class Meta:
+        verbose_name = _("Inbox entry")
+        verbose_name_plural = _("Inbox entries")
+        ordering = ["-last_activity"]
+        unique_together = [["user", "conversation"], ["user", "route_chat"]]
+        indexes = [models.Index(fields=["user", "-last_activity"])]
+
+    def __str__(self):
+        thread = (
+            f"conversation {self.conversation_id}"
+            if self.conversation_id
+            else f"route chat {self.route_chat_id}"
+        )
+        return f"Inbox of user {self.user_id}: {thread}"
+
+    @staticmethod
+    def visible():
+        """Hide public route chats that are no longer public or active."""
+        return ~models.Q(kind=InboxEntry.KIND_PUBLIC_ROUTE) | models.Q(
+            route_chat__route__privacy="public",
+            route_chat__route__is_active=True,
+        )
+
+
 @receiver(post_save, sender=Route)
 def create_route_chat(sender, instance, created, **kwargs):
     if created:
-        RouteChat.objects.get_or_create(route=instance)
+        route_chat = RouteChat.objects.get_or_create(route=instance)[0]
+        from chat.services.inbox import InboxService
+
+        InboxService.add_route_reader(route_chat, instance.author)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def sync_conversation_inbox(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Conversation):
+        return
+    from chat.services.inbox import InboxService
+
+    if action == "post_add":
+        InboxService.add_participants(instance)
+    elif action == "post_remove":
+        InboxService.remove_readers(pk_set, conversation=instance)
+
+
+@receiver(m2m_changed, sender=Route.shared_with.through)
+def sync_shared_route_inbox(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Route):
+        return
+    route_chat = RouteChat.objects.filter(route=instance).first()
+    if route_chat is None:
+        return
+    from chat.services.inbox import InboxService
+
+    if action == "post_add":
+        for user in User.objects.filter(id__in=pk_set):
+            InboxService.add_route_reader(route_chat, user)
+    elif action == "post_remove":
+        InboxService.remove_readers(pk_set, route_chat=route_chat)
+
+
+@receiver(post_save, sender=PrivateMessage)
+def publish_private_message(sender, instance, created, **kwargs):
+    if created:
+        from chat.services.inbox import InboxService
+        from chat.services.realtime import ChatRealtimeService
+
+        InboxService.record_private_message(instance)
+        transaction.on_commit(
+            lambda: ChatRealtimeService.publish_private_message(instance)
+        )
+
+
+@receiver(post_save, sender=RouteChatMessage)
+def publish_route_message(sender, instance, created, **kwargs):
+    if created:
+        from chat.services.inbox import InboxService
+        from chat.services.realtime import ChatRealtimeService
+
+        InboxService.record_route_message(instance)
+        transaction.on_commit(
+            lambda: ChatRealtimeService.publish_route_message(instance)
+        )
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path(
+        "ws/chat/private/<int:conversation_id>/",
+        consumers.PrivateChatConsumer.as_asgi(),
+    ),
+    path(
+        "ws/chat/route/<int:route_id>/",
+        consumers.RouteChatConsumer.as_asgi(),
+    ),
+    path("ws/chat/unread/", consumers.UnreadConsumer.as_asgi()),
+]
@@ -0,0 +1,195 @@
+from django.db.models import Case, F, When
+
+from chat.models import InboxEntry, RouteChatReadCursor
+from chat.services.read_state import ReadStateService
+from chat.services.unread import UnreadSummaryService
+
+PREVIEW_LENGTH = 100
+
+
+class InboxService:
+    """Maintains the per-user inbox behind the chat dashboard.
+
+    Entries are written together with the messages and membership
+    changes they describe, so reading the inbox never touches the
+    message tables.
+    """
+
+    @staticmethod
+    def entries(user):
+        """A user's threads, newest activity first, in one query."""
+        return (
+            InboxEntry.objects.filter(InboxEntry.visible(), user=user)
+            .select_related(
+                "conversation",
+                "other_user__profile",
+                "last_sender",
+                "route_chat__route__author",
+            )
+            .order_by("-last_activity")
+        )
+
+    @staticmethod
+    def route_kind(route_chat, user):
+        route = route_chat.route
+        if route.author_id == user.id:
+            return InboxEntry.KIND_OWN_ROUTE
+        if route.shared_with.filter(id=user.id).exists():
+            return InboxEntry.KIND_SHARED_ROUTE
+        return InboxEntry.KIND_PUBLIC_ROUTE
+
+    @staticmethod
+    def add_participants(conversation):
+        participants = list(conversation.participants.only("id"))
+        last = conversation.messages.order_by("-id").first()
+        changed = []
+        for user in participants:
+            other = next((p for p in participants if p.id != user.id), None)
+            entry, created = InboxEntry.objects.get_or_create(
+                user=user,
+                conversation=conversation,
+                defaults={
+                    "kind": InboxEntry.KIND_PRIVATE,
+                    "other_user": other,
+                    "last_activity": conversation.updated_at,
+                    "unread_count": (
+                        ReadStateService.conversation_unread_count(
+                            user, conversation
+                        )
+                    ),
+                    **InboxService._snapshot(
+                        last, "content", "sender_id", "created_at"
+                    ),
+                },
+            )
+            if created and entry.unread_count:
+                changed.append(user.id)
+            if not created and entry.other_user_id is None and other:
+                entry.other_user = other
+                entry.save(update_fields=["other_user"])
+        UnreadSummaryService.changed(changed)
+
+    @staticmethod
+    def add_route_reader(route_chat, user):
+        """Add the route chat to ``user``'s inbox, or update its kind."""
+        kind = InboxService.route_kind(route_chat, user)
+        entry, created = InboxEntry.objects.get_or_create(
+            user=user,
+            route_chat=route_chat,
+            defaults={
+                "kind": kind,
+                "last_activity": route_chat.route.created_at,
+                "unread_count": InboxService._route_unread(
+                    user, route_chat, kind
+                ),
+                **InboxService._snapshot(
+                    route_chat.messages.order_by("-id").first(),
+                    "message",
+                    "user_id",
+                    "timestamp",
+                ),
+            },
+        )
+        if not created and entry.kind != kind:
+            entry.kind = kind
+            entry.save(update_fields=["kind"])
+        elif not created:
+            return entry
+        if entry.unread_count:
+            UnreadSummaryService.changed([user.id])
+        return entry
+
+    @staticmethod
+    def remove_readers(user_ids, **thread):
+        InboxEntry.objects.filter(user_id__in=user_ids, **thread).delete()
+        UnreadSummaryService.changed(user_ids)
+        if "conversation" in thread:
+            # Whoever stays no longer has anyone to talk to here.
+            InboxEntry.objects.filter(
+                other_user_id__in=user_ids, **thread
+            ).update(other_user=None)
+
+    @staticmethod
+    def record_private_message(message):
+        InboxService._record(
+            InboxEntry.objects.filter(conversation_id=message.conversation_id),
+            message,
+            message.content,
+            message.sender_id,
+            message.created_at,
+        )
+
+    @staticmethod
+    def record_route_message(message):
+        # Writing in a public chat keeps it in the sender's inbox.
+        InboxService.add_route_reader(message.route_chat, message.user)
+        InboxService._record(
+            InboxEntry.objects.filter(route_chat_id=message.route_chat_id),
+            message,
+            message.message,
+            message.user_id,
+            message.timestamp,
+        )
+
+    @staticmethod
+    def sync_conversation_read(user, conversation):
+        InboxEntry.objects.filter(user=user, conversation=conversation).update(
+            unread_count=ReadStateService.conversation_unread_count(
+                user, conversation
+            )
+        )
+        UnreadSummaryService.changed([user.id])
+
+    @staticmethod
+    def sync_route_chat_read(user, route_chat):
+        """Refresh the unread count; opening a chat adds it to the inbox."""
+        entry = InboxService.add_route_reader(route_chat, user)
+        InboxEntry.objects.filter(id=entry.id).update(
+            unread_count=ReadStateService.route_chat_unread_count(
+                user, route_chat
+            )
+        )
+        UnreadSummaryService.changed([user.id])
+
+    @staticmethod
+    def _route_unread(user, route_chat, kind):
+        # Public chats count nothing until the user has opened them.
+        if (
+            kind == InboxEntry.KIND_PUBLIC_ROUTE
+            and not RouteChatReadCursor.objects.filter(
+                user=user, route_chat=route_chat
+            ).exists()
+        ):
+            return 0
+        return ReadStateService.route_chat_unread_count(user, route_chat)
+
+    @staticmethod
+    def _snapshot(message, text_field, sender_field, time_field):
+        if message is None:
+            return {}
+        return {
+            "last_message_id": message.id,
+            "last_message_preview": getattr(message, text_field)[
+                :PREVIEW_LENGTH
+            ],
+            "last_sender_id": getattr(message, sender_field),
+            "last_activity": getattr(message, time_field),
+        }
+
+    @staticmethod
+    def _record(entries, message, text, sender_id, created_at):
+        UnreadSummaryService.changed(
+            entries.exclude(user_id=sender_id).values_list(
+                "user_id", flat=True
+            )
+        )
+        entries.update(
+            last_message_id=message.id,
+            last_message_preview=text[:PREVIEW_LENGTH],
+            last_sender_id=sender_id,
+            last_activity=created_at,
+            unread_count=Case(
+                When(user_id=sender_id, then=F("unread_count")),
+                default=F("unread_count") + 1,
+            ),
+        )
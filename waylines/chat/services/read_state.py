@@ -0,0 +1,104 @@
+from django.utils import timezone
+
+from chat.models import ConversationReadCursor, RouteChatReadCursor
+
+
+class ReadStateService:
+    """Per-reader read position in conversations and route chats.
+
+    Each reader has one cursor per thread holding the id of the last
+    message they have seen. Message ids grow with time, so unread
+    messages are a range on the (thread, id) index, and marking a
+    thread as read updates one cursor row however long the backlog.
+    """
+
+    @staticmethod
+    def conversation_last_read(user, conversation):
+        return (
+            ConversationReadCursor.objects.filter(
+                user=user, conversation=conversation
+            )
+            .values_list("last_read_id", flat=True)
+            .first()
+            or 0
+        )
+
+    @staticmethod
+    def route_chat_last_read(user, route_chat):
+        return (
+            RouteChatReadCursor.objects.filter(
+                user=user, route_chat=route_chat
+            )
+            .values_list("last_read_id", flat=True)
+            .first()
+            or 0
+        )
+
+    @staticmethod
+    def conversation_unread_count(user, conversation):
+        return (
+            conversation.messages.filter(
+                id__gt=ReadStateService.conversation_last_read(
+                    user, conversation
+                )
+            )
+            .exclude(sender=user)
+            .count()
+        )
+
+    @staticmethod
+    def route_chat_unread_count(user, route_chat):
+        return (
+            route_chat.messages.filter(
+                id__gt=ReadStateService.route_chat_last_read(user, route_chat)
+            )
+            .exclude(user=user)
+            .count()
+        )
+
+    @staticmethod
+    def mark_conversation_read(user, conversation, message_id=None):
+        """Move the user's cursor to ``message_id`` or the newest message."""
+        from chat.services.inbox import InboxService
+
+        if message_id is None:
+            message_id = ReadStateService._newest_id(conversation.messages)
+        last_read_id = ReadStateService._advance(
+            ConversationReadCursor,
+            user,
+            message_id,
+            conversation=conversation,
+        )
+        InboxService.sync_conversation_read(user, conversation)
+        return last_read_id
+
+    @staticmethod
+    def mark_route_chat_read(user, route_chat, message_id=None):
+        from chat.services.inbox import InboxService
+
+        if message_id is None:
+            message_id = ReadStateService._newest_id(route_chat.messages)
+        last_read_id = ReadStateService._advance(
+            RouteChatReadCursor, user, message_id, route_chat=route_chat
+        )
+        InboxService.sync_route_chat_read(user, route_chat)
+        return last_read_id
+
+    @staticmethod
+    def _newest_id(messages):
+        return (
+            messages.order_by("-id").values_list("id", flat=True).first() or 0
+        )
+
+    @staticmethod
+    def _advance(model, user, message_id, **thread):
+        cursor, created = model.objects.get_or_create(
+            user=user, **thread, defaults={"last_read_id": message_id}
+        )
+        if created or message_id <= cursor.last_read_id:
+            return cursor.last_read_id
+        # The filter keeps a concurrent, further read from going back.
+        model.objects.filter(id=cursor.id, last_read_id__lt=message_id).update(
+            last_read_id=message_id, updated_at=timezone.now()
+        )
+        return message_id
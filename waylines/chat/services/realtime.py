@@ -0,0 +1,93 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_EVENT = "chat.message"
+UNREAD_EVENT = "chat.unread"
+
+
+class ChatRealtimeService:
+    """Pushes new chat messages to WebSocket subscribers.
+
+    Each conversation and route chat is a channel layer group; the
+    consumers in ``chat.consumers`` join it on connect and forward
+    every ``chat.message`` event to their client. Each user also has
+    a group that receives ``chat.unread`` notices when the navbar
+    summary is out of date.
+    """
+
+    @staticmethod
+    def conversation_group(conversation_id):
+        return f"chat.conversation.{conversation_id}"
+
+    @staticmethod
+    def route_group(route_id):
+        return f"chat.route.{route_id}"
+
+    @staticmethod
+    def user_group(user_id):
+        return f"chat.user.{user_id}"
+
+    @staticmethod
+    def serialize_private_message(message):
+        return {
+            "id": message.id,
+            "conversation_id": message.conversation_id,
+            "content": message.content,
+            "sender": message.sender.username,
+            "sender_id": message.sender_id,
+            "created_at": message.created_at.strftime("%H:%M"),
+            "created_at_iso": message.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def serialize_route_message(message, route_id):
+        return {
+            "id": message.id,
+            "route_id": route_id,
+            "content": message.message,
+            "sender": message.user.username,
+            "sender_id": message.user_id,
+            "created_at": message.timestamp.strftime("%H:%M"),
+            "created_at_iso": message.timestamp.isoformat(),
+        }
+
+    @staticmethod
+    async def apublish(group, payload, event=MESSAGE_EVENT):
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        await layer.group_send(group, {"type": event, "message": payload})
+
+    @staticmethod
+    def publish(group, payload, event=MESSAGE_EVENT):
+        """Send from sync code; a failing layer never breaks a write."""
+        try:
+            async_to_sync(ChatRealtimeService.apublish)(group, payload, event)
+        except Exception as e:
+            logger.error(f"Failed to publish to {group}: {e}")
+
+    @staticmethod
+    def publish_private_message(message):
+        ChatRealtimeService.publish(
+            ChatRealtimeService.conversation_group(message.conversation_id),
+            ChatRealtimeService.serialize_private_message(message),
+        )
+
+    @staticmethod
+    def publish_route_message(message):
+        route_id = message.route_chat.route_id
+        ChatRealtimeService.publish(
+            ChatRealtimeService.route_group(route_id),
+            ChatRealtimeService.serialize_route_message(message, route_id),
+        )
+
+    @staticmethod
+    def publish_unread_changed(user_ids):
+        for user_id in user_ids:
+            ChatRealtimeService.publish(
+                ChatRealtimeService.user_group(user_id), None, UNREAD_EVENT
+            )
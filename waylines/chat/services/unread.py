@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from chat.models import InboxEntry
+from chat.services.realtime import ChatRealtimeService
+
+CACHE_TIMEOUT = 300
+
+SUMMARY_FIELDS = {
+    InboxEntry.KIND_PRIVATE: "private_unread",
+    InboxEntry.KIND_OWN_ROUTE: "my_routes_unread",
+    InboxEntry.KIND_SHARED_ROUTE: "shared_routes_unread",
+    InboxEntry.KIND_PUBLIC_ROUTE: "public_routes_unread",
+}
+
+
+class UnreadSummaryService:
+    """Unread totals per chat category, read from the inbox counters.
+
+    The summary is one query over a user's unread inbox rows, cached
+    per user. Writes that change a user's counters drop the cached
+    copy and, after commit, tell that user's sockets to fetch it again,
+    so a message to a busy chat costs no summary queries on the write.
+    """
+
+    @staticmethod
+    def cache_key(user_id):
+        return f"chat_unread_{user_id}"
+
+    @staticmethod
+    def get(user):
+        key = UnreadSummaryService.cache_key(user.id)
+        summary = cache.get(key)
+        if summary is None:
+            summary = UnreadSummaryService.compute(user.id)
+            cache.set(key, summary, CACHE_TIMEOUT)
+        return summary
+
+    @staticmethod
+    def compute(user_id):
+        summary = {field: 0 for field in SUMMARY_FIELDS.values()}
+        conversations = []
+        rows = (
+            InboxEntry.objects.filter(
+                InboxEntry.visible(), user_id=user_id, unread_count__gt=0
+            )
+            .order_by("-last_activity")
+            .values_list("kind", "conversation_id", "unread_count")
+        )
+        for kind, conversation_id, unread_count in rows:
+            summary[SUMMARY_FIELDS[kind]] += unread_count
+            if conversation_id is not None:
+                conversations.append(
+                    {"id": conversation_id, "unread_count": unread_count}
+                )
+        summary["total_unread"] = sum(summary.values())
+        summary["conversations"] = conversations
+        return summary
+
+    @staticmethod
+    def changed(user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        cache.delete_many(
+            [UnreadSummaryService.cache_key(user_id) for user_id in user_ids]
+        )
+        transaction.on_commit(
+            lambda: ChatRealtimeService.publish_unread_changed(user_ids)
+        )
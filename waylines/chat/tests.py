@@ -1,12 +1,34 @@
 import json
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase, TransactionTestCase, Client
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
 from django.urls import reverse
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from routes.models import Route
-from chat.models import Conversation, PrivateMessage, RouteChat
+from chat.views import ChatService
+from chat.consumers import (
+    ChatConsumer,
+    PrivateChatConsumer,
+    RouteChatConsumer,
+    UnreadConsumer,
+)
+from chat.models import (
+    Conversation,
+    InboxEntry,
+    PrivateMessage,
+    RouteChat,
+    RouteChatMessage,
+)
+from chat.services.read_state import ReadStateService
+from chat.services.unread import UnreadSummaryService
 
 
 class ChatModelsTestCase(TestCase):
@@ -140,3 +162,466 @@ class ChatViewsTestCase(TestCase):
             content_type="application/json",
         )
         self.assertIsNone(cache.get(cache_key))
+
+
+class ReadCursorTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username="alice", password="pass123"
+        )
+        self.bob = User.objects.create_user(username="bob", password="pass123")
+        self.carol = User.objects.create_user(
+            username="carol", password="pass123"
+        )
+        self.route = Route.objects.create(
+            name="Shared Route", author=self.alice, privacy="personal"
+        )
+        self.route.shared_with.add(self.bob, self.carol)
+        self.chat = self.route.chat
+        for text in ("one", "two", "three"):
+            RouteChatMessage.objects.create(
+                route_chat=self.chat, user=self.alice, message=text
+            )
+        self.client = Client()
+        cache.clear()
+
+    def test_each_reader_has_own_read_position(self):
+        self.client.login(username="bob", password="pass123")
+        response = self.client.post(
+            reverse("chat:mark_route_read", args=[self.route.id])
+        )
+        self.assertEqual(
+            response.json()["last_read_id"],
+            self.chat.messages.latest("id").id,
+        )
+        self.assertEqual(
+            ReadStateService.route_chat_unread_count(self.bob, self.chat), 0
+        )
+        self.assertEqual(
+            ReadStateService.route_chat_unread_count(self.carol, self.chat), 3
+        )
+
+        RouteChatMessage.objects.create(
+            route_chat=self.chat, user=self.carol, message="four"
+        )
+        self.assertEqual(
+            ReadStateService.route_chat_unread_count(self.bob, self.chat), 1
+        )
+
+    def test_cursor_never_moves_back(self):
+        newest = self.chat.messages.latest("id").id
+        ReadStateService.mark_route_chat_read(self.bob, self.chat)
+        self.assertEqual(
+            ReadStateService.mark_route_chat_read(
+                self.bob, self.chat, message_id=newest - 2
+            ),
+            newest,
+        )
+        self.assertEqual(self.bob.route_chat_read_cursors.count(), 1)
+
+    def test_unread_counts_use_cursors(self):
+        conversation = ChatService.get_or_create_conversation(
+            self.alice, self.bob
+        )
+        for text in ("hi", "there"):
+            PrivateMessage.objects.create(
+                conversation=conversation, sender=self.alice, content=text
+            )
+        public = Route.objects.create(
+            name="Public Route", author=self.alice, privacy="public"
+        )
+        RouteChatMessage.objects.create(
+            route_chat=public.chat, user=self.alice, message="welcome"
+        )
+
+        self.client.login(username="bob", password="pass123")
+        data = self.client.get(reverse("chat:get_unread_counts")).json()
+        self.assertEqual(data["private_unread"], 2)
+        self.assertEqual(data["shared_routes_unread"], 3)
+        # Public chats count only after the user has opened them.
+        self.assertEqual(data["public_routes_unread"], 0)
+        self.assertEqual(
+            data["conversations"],
+            [{"id": conversation.id, "unread_count": 2}],
+        )
+
+        self.client.get(reverse("chat:private_chat", args=[self.alice.id]))
+        self.client.get(reverse("chat:route_chat", args=[public.id]))
+        RouteChatMessage.objects.create(
+            route_chat=public.chat, user=self.alice, message="news"
+        )
+        data = self.client.get(reverse("chat:get_unread_counts")).json()
+        self.assertEqual(data["private_unread"], 0)
+        self.assertEqual(data["public_routes_unread"], 1)
+        self.assertEqual(data["total_unread"], 4)
+
+
+class InboxTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username="alice", password="pass123"
+        )
+        self.bob = User.objects.create_user(username="bob", password="pass123")
+        self.conversation = ChatService.get_or_create_conversation(
+            self.alice, self.bob
+        )
+        self.route = Route.objects.create(
+            name="Shared Route", author=self.alice, privacy="personal"
+        )
+        self.route.shared_with.add(self.bob)
+        self.client = Client()
+
+    def entry(self, user, **thread):
+        return InboxEntry.objects.get(user=user, **thread)
+
+    def test_messages_update_inbox_on_write(self):
+        PrivateMessage.objects.create(
+            conversation=self.conversation, sender=self.alice, content="Hi"
+        )
+        RouteChatMessage.objects.create(
+            route_chat=self.route.chat, user=self.bob, message="Ready?"
+        )
+
+        bob_entry = self.entry(self.bob, conversation=self.conversation)
+        self.assertEqual(bob_entry.other_user, self.alice)
+        self.assertEqual(bob_entry.last_message_preview, "Hi")
+        self.assertEqual(bob_entry.unread_count, 1)
+        self.assertEqual(
+            self.entry(
+                self.alice, conversation=self.conversation
+            ).unread_count,
+            0,
+        )
+        alice_route = self.entry(self.alice, route_chat=self.route.chat)
+        self.assertEqual(alice_route.kind, InboxEntry.KIND_OWN_ROUTE)
+        self.assertEqual(alice_route.unread_count, 1)
+        self.assertEqual(
+            self.entry(self.bob, route_chat=self.route.chat).kind,
+            InboxEntry.KIND_SHARED_ROUTE,
+        )
+
+        ReadStateService.mark_conversation_read(self.bob, self.conversation)
+        self.assertEqual(
+            self.entry(self.bob, conversation=self.conversation).unread_count,
+            0,
+        )
+
+    def test_public_chat_joins_inbox_when_opened(self):
+        public = Route.objects.create(
+            name="Public Route", author=self.alice, privacy="public"
+        )
+        self.assertFalse(
+            self.bob.inbox_entries.filter(route_chat=public.chat).exists()
+        )
+
+        self.client.login(username="bob", password="pass123")
+        self.client.get(reverse("chat:route_chat", args=[public.id]))
+        RouteChatMessage.objects.create(
+            route_chat=public.chat, user=self.alice, message="news"
+        )
+        entry = self.entry(self.bob, route_chat=public.chat)
+        self.assertEqual(entry.kind, InboxEntry.KIND_PUBLIC_ROUTE)
+        self.assertEqual(entry.unread_count, 1)
+
+    def test_leaving_conversation_removes_it_from_inbox(self):
+        self.conversation.participants.remove(self.alice)
+        self.assertFalse(
+            self.alice.inbox_entries.filter(
+                conversation=self.conversation
+            ).exists()
+        )
+        self.assertIsNone(
+            self.entry(self.bob, conversation=self.conversation).other_user
+        )
+
+    def test_dashboard_queries_do_not_grow_with_chats(self):
+        self.client.login(username="alice", password="pass123")
+
+        def dashboard_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("chat:chat_dashboard"))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        baseline = dashboard_queries()
+        for i in range(5):
+            friend = User.objects.create_user(username=f"friend{i}")
+            conversation = ChatService.get_or_create_conversation(
+                self.alice, friend
+            )
+            PrivateMessage.objects.create(
+                conversation=conversation, sender=friend, content="Hello"
+            )
+            Route.objects.create(name=f"Route {i}", author=self.alice)
+        self.assertEqual(dashboard_queries(), baseline)
+        response = self.client.get(reverse("chat:chat_dashboard"))
+        self.assertContains(response, "friend4")
+        self.assertContains(response, "Route 4")
+        self.assertEqual(len(response.context["conversations_data"]), 6)
+
+
+class UnreadSummaryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username="alice")
+        self.bob = User.objects.create_user(username="bob")
+        self.conversation = ChatService.get_or_create_conversation(
+            self.alice, self.bob
+        )
+        self.route = Route.objects.create(
+            name="Own Route", author=self.bob, privacy="public"
+        )
+
+    def test_summary_is_one_query_then_cached(self):
+        PrivateMessage.objects.create(
+            conversation=self.conversation, sender=self.alice, content="Hi"
+        )
+        RouteChatMessage.objects.create(
+            route_chat=self.route.chat, user=self.alice, message="Nice"
+        )
+        with self.assertNumQueries(1):
+            summary = UnreadSummaryService.get(self.bob)
+        self.assertEqual(summary["private_unread"], 1)
+        self.assertEqual(summary["my_routes_unread"], 1)
+        self.assertEqual(summary["total_unread"], 2)
+        self.assertEqual(
+            summary["conversations"],
+            [{"id": self.conversation.id, "unread_count": 1}],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadSummaryService.get(self.bob), summary)
+
+    def test_writes_invalidate_the_cached_summary(self):
+        self.assertEqual(UnreadSummaryService.get(self.bob)["total_unread"], 0)
+        with (
+            mock.patch.object(UnreadSummaryService, "compute") as compute,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            PrivateMessage.objects.create(
+                conversation=self.conversation, sender=self.alice, content="Hi"
+            )
+        # The write only drops the summary; the reader recomputes it.
+        compute.assert_not_called()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                UnreadSummaryService.get(self.bob)["total_unread"], 1
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReadStateService.mark_conversation_read(
+                self.bob, self.conversation
+            )
+        self.assertEqual(UnreadSummaryService.get(self.bob)["total_unread"], 0)
+
+
+class MessageHistoryPaginationTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username="alice", password="pass123"
+        )
+        self.bob = User.objects.create_user(username="bob", password="pass123")
+        self.route = Route.objects.create(
+            name="Busy Route", author=self.alice, privacy="public"
+        )
+        for i in range(7):
+            RouteChatMessage.objects.create(
+                route_chat=self.route.chat, user=self.alice, message=f"m{i}"
+            )
+        # Equal timestamps make the id the tie-breaker between pages.
+        self.route.chat.messages.update(
+            timestamp=self.route.chat.messages.first().timestamp
+        )
+        self.ids = list(
+            self.route.chat.messages.order_by("id").values_list(
+                "id", flat=True
+            )
+        )
+        self.client = Client()
+        self.client.login(username="bob", password="pass123")
+
+    def fetch(self, **params):
+        return self.client.get(
+            reverse("chat:get_route_messages", args=[self.route.id]), params
+        )
+
+    def page_ids(self, **params):
+        data = self.fetch(**params).json()
+        return [message["id"] for message in data["messages"]], data[
+            "has_more"
+        ]
+
+    def test_scrolls_back_and_forward_without_gaps(self):
+        self.assertEqual(self.page_ids(limit=3), (self.ids[4:], True))
+        self.assertEqual(
+            self.page_ids(before=self.ids[4], limit=3), (self.ids[1:4], True)
+        )
+        self.assertEqual(
+            self.page_ids(before=self.ids[1], limit=3), (self.ids[:1], False)
+        )
+        self.assertEqual(
+            self.page_ids(after=self.ids[1], limit=3), (self.ids[2:5], True)
+        )
+        self.assertEqual(
+            self.page_ids(last_id=self.ids[4], limit=3), (self.ids[5:], False)
+        )
+
+    def test_private_history_pages_by_created_at(self):
+        conversation = ChatService.get_or_create_conversation(
+            self.alice, self.bob
+        )
+        for text in ("one", "two", "three"):
+            PrivateMessage.objects.create(
+                conversation=conversation, sender=self.alice, content=text
+            )
+        newest = conversation.messages.latest("id")
+        data = self.client.get(
+            reverse("chat:get_private_messages", args=[conversation.id]),
+            {"before": newest.id, "limit": 1},
+        ).json()
+        self.assertEqual(
+            [message["content"] for message in data["messages"]], ["two"]
+        )
+        self.assertTrue(data["has_more"])
+
+    def test_page_size_is_capped_and_params_validated(self):
+        self.assertEqual(
+            ChatService.parse_page_params({"limit": "100000"}),
+            (None, None, 100),
+        )
+        self.assertEqual(self.fetch(limit="abc").status_code, 400)
+        self.assertEqual(
+            self.fetch(before=self.ids[3], after=self.ids[1]).status_code, 400
+        )
+        other = Route.objects.create(name="Other", author=self.alice)
+        foreign = RouteChatMessage.objects.create(
+            route_chat=other.chat, user=self.alice, message="elsewhere"
+        )
+        self.assertEqual(self.fetch(before=foreign.id).status_code, 400)
+
+
+class ChatWebSocketTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice")
+        self.bob = User.objects.create_user(username="bob")
+        self.eve = User.objects.create_user(username="eve")
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+        self.route = Route.objects.create(
+            name="Shared Route", author=self.alice, privacy="personal"
+        )
+        self.route.shared_with.add(self.bob)
+
+    async def connect(self, consumer, user, **kwargs):
+        socket = ApplicationCommunicator(
+            consumer.as_asgi(),
+            {
+                "type": "websocket",
+                "path": "/ws/chat/",
+                "headers": [],
+                "subprotocols": [],
+                "user": user,
+                "url_route": {"args": (), "kwargs": kwargs},
+            },
+        )
+        await socket.send_input({"type": "websocket.connect"})
+        return socket, await socket.receive_output(1)
+
+    async def disconnect(self, socket):
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(1)
+
+    def save_message(self, model, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(**fields)
+
+    def test_base_consumer_requires_group_name(self):
+        with self.assertRaises(TypeError):
+            ChatConsumer()
+
+    async def test_participant_receives_new_private_message(self):
+        socket, response = await self.connect(
+            PrivateChatConsumer, self.bob, conversation_id=self.conversation.id
+        )
+        self.assertEqual(response["type"], "websocket.accept")
+
+        message = await sync_to_async(self.save_message)(
+            PrivateMessage,
+            conversation=self.conversation,
+            sender=self.alice,
+            content="Hello Bob!",
+        )
+        event = json.loads((await socket.receive_output(1))["text"])
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["message"]["id"], message.id)
+        self.assertEqual(event["message"]["content"], "Hello Bob!")
+        self.assertEqual(event["message"]["sender_id"], self.alice.id)
+        await self.disconnect(socket)
+
+    async def test_shared_user_receives_route_message(self):
+        socket, response = await self.connect(
+            RouteChatConsumer, self.bob, route_id=self.route.id
+        )
+        self.assertEqual(response["type"], "websocket.accept")
+
+        await sync_to_async(self.save_message)(
+            RouteChatMessage,
+            route_chat=await sync_to_async(lambda: self.route.chat)(),
+            user=self.alice,
+            message="Meet at the start",
+        )
+        event = json.loads((await socket.receive_output(1))["text"])
+        self.assertEqual(event["message"]["route_id"], self.route.id)
+        self.assertEqual(event["message"]["content"], "Meet at the start")
+        await self.disconnect(socket)
+
+    async def test_unread_summary_is_pushed_on_connect_and_change(self):
+        await sync_to_async(cache.clear)()
+        socket, response = await self.connect(UnreadConsumer, self.bob)
+        self.assertEqual(response["type"], "websocket.accept")
+        event = json.loads((await socket.receive_output(1))["text"])
+        self.assertEqual(event["type"], "unread")
+        self.assertEqual(event["unread"]["total_unread"], 0)
+
+        await sync_to_async(self.save_message)(
+            PrivateMessage,
+            conversation=self.conversation,
+            sender=self.alice,
+            content="Hello Bob!",
+        )
+        event = json.loads((await socket.receive_output(1))["text"])
+        self.assertEqual(event, {"type": "unread_changed"})
+        summary = await sync_to_async(UnreadSummaryService.get)(self.bob)
+        self.assertEqual(summary["private_unread"], 1)
+        self.assertEqual(
+            summary["conversations"],
+            [{"id": self.conversation.id, "unread_count": 1}],
+        )
+        await self.disconnect(socket)
+
+    async def test_outsiders_and_anonymous_users_are_refused(self):
+        for consumer, kwargs in (
+            (PrivateChatConsumer, {"conversation_id": self.conversation.id}),
+            (RouteChatConsumer, {"route_id": self.route.id}),
+        ):
+            _, response = await self.connect(consumer, self.eve, **kwargs)
+            self.assertEqual(
+                response, {"type": "websocket.close", "code": 4403}
+            )
+            _, response = await self.connect(
+                consumer, AnonymousUser(), **kwargs
+            )
+            self.assertEqual(
+                response, {"type": "websocket.close", "code": 4401}
+            )
+
+
+class ChatBenchmarkTestCase(TransactionTestCase):
+    def test_benchmark_command_reports_throughput(self):
+        out = StringIO()
+        call_command("chat_benchmark", clients=3, messages=4, stdout=out)
+        self.assertIn("Connected 3 clients", out.getvalue())
+        self.assertIn("deliveries/s", out.getvalue())
+        self.assertFalse(
+            User.objects.filter(username__startswith="chat-benchmark").exists()
+        )
@@ -7,7 +7,7 @@ from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.db import transaction
-from django.db.models import Q, Prefetch
+from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
@@ -17,40 +17,24 @@ from django.views.decorators.http import require_http_methods, require_POST
 from routes.models import Route
 from routes.views import can_view_route
 
-from .models import Conversation, PrivateMessage, RouteChat, RouteChatMessage
+from .models import (
+    Conversation,
+    InboxEntry,
+    PrivateMessage,
+    RouteChat,
+    RouteChatMessage,
+)
+from .services.inbox import InboxService
+from .services.read_state import ReadStateService
+from .services.unread import UnreadSummaryService
 
 logger = logging.getLogger(__name__)
 
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 100
 
-class ChatService:
-    @staticmethod
-    def get_user_conversations(user):
-        conversations = (
-            Conversation.objects.filter(participants=user)
-            .prefetch_related(
-                Prefetch(
-                    "participants",
-                    queryset=User.objects.only("id", "username"),
-                ),
-                Prefetch(
-                    "messages",
-                    queryset=PrivateMessage.objects.filter(is_read=False)
-                    .exclude(sender=user)
-                    .only("id", "is_read"),
-                ),
-            )
-            .order_by("-updated_at")
-        )
-
-        for conv in conversations:
-            conv.unread_count = (
-                conv.messages.filter(is_read=False)
-                .exclude(sender=user)
-                .count()
-            )
-
-        return conversations
 
+class ChatService:
     @staticmethod
     def get_or_create_conversation(user1, user2):
         if user1 == user2:
@@ -84,53 +68,71 @@ class ChatService:
         return content
 
     @staticmethod
-    def get_route_chat_with_access_check(user, route_id):
-        route = get_object_or_404(Route, id=route_id)
-        if not can_view_route(user, route):
-            raise PermissionDenied(_("You do not have access to this route"))
-        route_chat, f = RouteChat.objects.get_or_create(route=route)
-        return route_chat, route
-
-    @staticmethod
-    def get_route_chats_with_unread(user):
-        user_routes_chats = (
-            RouteChat.objects.filter(route__author=user)
-            .select_related("route")
-            .order_by("-route__created_at")
-        )
+    def parse_page_params(params, legacy_after=None):
+        """Read ``before``/``after`` message ids and a capped ``limit``.
 
-        participant_chats = (
-            RouteChat.objects.filter(route__shared_with=user)
-            .exclude(route__author=user)
-            .select_related("route")
-            .order_by("-route__created_at")
-        )
-
-        public_chats = (
-            RouteChat.objects.filter(
-                route__privacy="public", route__is_active=True
+        ``legacy_after`` names the old "newer than" parameter, which is
+        still accepted as ``after``.
+        """
+        try:
+            before, after = (
+                int(params[name]) if params.get(name) else None
+                for name in ("before", "after")
             )
-            .select_related("route", "route__author")
-            .exclude(route__author=user)
-            .order_by("-route__created_at")
-        )
+            if after is None and legacy_after and params.get(legacy_after):
+                after = int(params[legacy_after])
+            limit = int(params.get("limit", MESSAGES_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError(_("Invalid pagination parameters"))
+        if before is not None and after is not None:
+            raise ValidationError(_("Use either before or after, not both"))
+        return before, after, max(1, min(limit, MESSAGES_MAX_PAGE_SIZE))
 
-        for chat in user_routes_chats:
-            chat.unread_count = (
-                chat.messages.filter(is_read=False).exclude(user=user).count()
+    @staticmethod
+    def get_message_page(
+        messages, time_field, before=None, after=None, limit=MESSAGES_PAGE_SIZE
+    ):
+        """One page of ``messages`` in chronological order.
+
+        Pages are keyed on (time, id) next to an anchor message, so each
+        one is a short range scan of the thread's (time, id) index at
+        any depth. Returns the page and whether more messages lie
+        beyond it in the direction of travel.
+        """
+        anchor_id = after if after is not None else before
+        if anchor_id is not None:
+            anchor = (
+                messages.filter(id=anchor_id)
+                .values_list(time_field, flat=True)
+                .first()
             )
-
-        for chat in participant_chats:
-            chat.unread_count = (
-                chat.messages.filter(is_read=False).exclude(user=user).count()
+            if anchor is None:
+                raise ValidationError(_("Unknown message"))
+            lookup = "gt" if after is not None else "lt"
+            messages = messages.filter(
+                Q(**{f"{time_field}__{lookup}": anchor})
+                | Q(**{time_field: anchor, f"id__{lookup}": anchor_id})
             )
 
-        for chat in public_chats:
-            chat.unread_count = (
-                chat.messages.filter(is_read=False).exclude(user=user).count()
+        if after is not None:
+            page = list(messages.order_by(time_field, "id")[: limit + 1])
+        else:
+            page = list(
+                messages.order_by(f"-{time_field}", "-id")[: limit + 1]
             )
+        has_more = len(page) > limit
+        page = page[:limit]
+        if after is None:
+            page.reverse()
+        return page, has_more
 
-        return user_routes_chats, participant_chats, public_chats
+    @staticmethod
+    def get_route_chat_with_access_check(user, route_id):
+        route = get_object_or_404(Route, id=route_id)
+        if not can_view_route(user, route):
+            raise PermissionDenied(_("You do not have access to this route"))
+        route_chat, f = RouteChat.objects.get_or_create(route=route)
+        return route_chat, route
 
 
 class JSONResponseMixin:
@@ -166,41 +168,34 @@ def chat_dashboard(request):
         return render(request, "chat/dashboard.html", cached_data)
 
     try:
-        conversations = ChatService.get_user_conversations(request.user)
         conversations_data = []
+        route_chats = {
+            InboxEntry.KIND_OWN_ROUTE: [],
+            InboxEntry.KIND_SHARED_ROUTE: [],
+            InboxEntry.KIND_PUBLIC_ROUTE: [],
+        }
         total_unread_count = 0
 
-        for conversation in conversations:
-            other_user = conversation.get_other_participant(request.user)
-            if other_user:
-                last_message = conversation.messages.order_by(
-                    "-created_at"
-                ).first()
-                unread_count = getattr(conversation, "unread_count", 0)
-                total_unread_count += unread_count
+        for entry in InboxService.entries(request.user):
+            if entry.kind == InboxEntry.KIND_PRIVATE:
+                if entry.other_user is None:
+                    continue
                 conversations_data.append(
                     {
-                        "conversation": conversation,
-                        "other_user": other_user,
-                        "unread_count": unread_count,
-                        "last_message": last_message,
-                        "is_online": getattr(other_user, "is_online", False),
+                        "conversation": entry.conversation,
+                        "other_user": entry.other_user,
+                        "unread_count": entry.unread_count,
+                        "entry": entry,
+                        "is_online": getattr(
+                            entry.other_user, "is_online", False
+                        ),
                     }
                 )
-
-        user_routes_chats, participant_chats, public_chats = (
-            ChatService.get_route_chats_with_unread(request.user)
-        )
-
-        route_unread_total = 0
-        for chat in user_routes_chats:
-            route_unread_total += getattr(chat, "unread_count", 0)
-        for chat in participant_chats:
-            route_unread_total += getattr(chat, "unread_count", 0)
-        for chat in public_chats:
-            route_unread_total += getattr(chat, "unread_count", 0)
-
-        total_unread_count += route_unread_total
+            else:
+                chat = entry.route_chat
+                chat.unread_count = entry.unread_count
+                route_chats[entry.kind].append(chat)
+            total_unread_count += entry.unread_count
 
         friends = (
             User.objects.filter(
@@ -226,9 +221,9 @@ def chat_dashboard(request):
 
         context = {
             "conversations_data": conversations_data,
-            "user_routes_chats": user_routes_chats,
-            "participant_chats": participant_chats,
-            "public_chats": public_chats,
+            "user_routes_chats": route_chats[InboxEntry.KIND_OWN_ROUTE],
+            "participant_chats": route_chats[InboxEntry.KIND_SHARED_ROUTE],
+            "public_chats": route_chats[InboxEntry.KIND_PUBLIC_ROUTE],
             "friends": friends,
             "friends_without_chats": friends_without_chats,
             "total_unread_count": total_unread_count,
@@ -268,14 +263,8 @@ def private_chat(request, user_id):
         request.user, other_user
     )
 
-    unread_messages = conversation.messages.filter(is_read=False).exclude(
-        sender=request.user
-    )
-    if unread_messages.exists():
-        with transaction.atomic():
-            unread_messages.update(is_read=True)
-        cache.delete(f"chat_dashboard_{request.user.id}")
-        cache.delete(f"chat_dashboard_{other_user.id}")
+    ReadStateService.mark_conversation_read(request.user, conversation)
+    cache.delete(f"chat_dashboard_{request.user.id}")
 
     try:
         accepted_friends_count = other_user.friendship_requests_sent.filter(
@@ -299,13 +288,8 @@ def route_chat(request, route_id):
             request.user, route_id
         )
 
-        unread_messages = route_chat.messages.filter(is_read=False).exclude(
-            user=request.user
-        )
-        if unread_messages.exists():
-            with transaction.atomic():
-                unread_messages.update(is_read=True)
-            cache.delete(f"chat_dashboard_{request.user.id}")
+        ReadStateService.mark_route_chat_read(request.user, route_chat)
+        cache.delete(f"chat_dashboard_{request.user.id}")
 
         chat_messages = route_chat.messages.select_related("user").order_by(
             "-timestamp"
@@ -411,9 +395,14 @@ def send_route_message(request):
                 user=request.user,
                 message=validated_content,
             )
-            participants = [route.author] + list(route.shared_with.all())
-            for participant in participants:
-                cache.delete(f"chat_dashboard_{participant.id}")
+            cache.delete_many(
+                [
+                    f"chat_dashboard_{user_id}"
+                    for user_id in route_chat.inbox_entries.values_list(
+                        "user_id", flat=True
+                    )
+                ]
+            )
 
         logger.info(
             f"User {request.user.id} sent message to route chat {route_id}"
@@ -447,17 +436,30 @@ def get_private_messages(request, conversation_id):
     if request.user not in conversation.participants.all():
         return JSONResponseMixin.error_response(_("Access denied"), status=403)
 
-    last_message_id = request.GET.get("last_message_id")
-    limit = int(request.GET.get("limit", 100))
+    try:
+        before, after, limit = ChatService.parse_page_params(
+            request.GET, legacy_after="last_message_id"
+        )
+        messages_list, has_more = ChatService.get_message_page(
+            conversation.messages.select_related("sender"),
+            "created_at",
+            before=before,
+            after=after,
+            limit=limit,
+        )
+    except ValidationError as e:
+        return JSONResponseMixin.error_response(str(e))
 
-    messages_qs = conversation.messages.select_related("sender").order_by(
-        "-created_at"
+    # Own messages are read once another participant's cursor passes them.
+    my_last_read = ReadStateService.conversation_last_read(
+        request.user, conversation
+    )
+    their_last_read = max(
+        conversation.read_cursors.exclude(user=request.user).values_list(
+            "last_read_id", flat=True
+        ),
+        default=0,
     )
-    if last_message_id:
-        messages_qs = messages_qs.filter(id__gt=last_message_id)
-    messages_qs = messages_qs[:limit]
-    messages_list = list(reversed(messages_qs))
-
     messages_data = [
         {
             "id": msg.id,
@@ -467,7 +469,10 @@ def get_private_messages(request, conversation_id):
             "created_at": msg.created_at.strftime("%H:%M"),
             "created_at_full": msg.created_at.strftime("%d.%m.%Y %H:%M"),
             "is_own": msg.sender == request.user,
-            "is_read": msg.is_read,
+            "is_read": msg.id
+            <= (
+                their_last_read if msg.sender == request.user else my_last_read
+            ),
         }
         for msg in messages_list
     ]
@@ -476,7 +481,7 @@ def get_private_messages(request, conversation_id):
         {
             "messages": messages_data,
             "conversation_id": conversation.id,
-            "has_more": len(messages_list) == limit,
+            "has_more": has_more,
         }
     )
 
@@ -488,17 +493,21 @@ def get_route_messages(request, route_id):
         request.user, route_id
     )
 
-    last_message_id = request.GET.get("last_id")
-    limit = int(request.GET.get("limit", 100))
-
-    messages_qs = route_chat.messages.select_related("user").order_by(
-        "-timestamp"
-    )
-    if last_message_id:
-        messages_qs = messages_qs.filter(id__gt=last_message_id)
-    messages_qs = messages_qs[:limit]
-    messages_list = list(reversed(messages_qs))
+    try:
+        before, after, limit = ChatService.parse_page_params(
+            request.GET, legacy_after="last_id"
+        )
+        messages_list, has_more = ChatService.get_message_page(
+            route_chat.messages.select_related("user"),
+            "timestamp",
+            before=before,
+            after=after,
+            limit=limit,
+        )
+    except ValidationError as e:
+        return JSONResponseMixin.error_response(str(e))
 
+    last_read = ReadStateService.route_chat_last_read(request.user, route_chat)
     messages_data = [
         {
             "id": msg.id,
@@ -507,7 +516,7 @@ def get_route_messages(request, route_id):
             "sender_id": msg.user.id,
             "created_at": msg.timestamp.strftime("%H:%M"),
             "is_own": msg.user == request.user,
-            "is_read": msg.is_read,
+            "is_read": msg.user == request.user or msg.id <= last_read,
         }
         for msg in messages_list
     ]
@@ -516,7 +525,7 @@ def get_route_messages(request, route_id):
         {
             "messages": messages_data,
             "route_id": route.id,
-            "has_more": len(messages_list) == limit,
+            "has_more": has_more,
         }
     )
 
@@ -534,10 +543,8 @@ def get_conversation_info(request, conversation_id):
             _("Conversation not found"), status=404
         )
 
-    unread_count = (
-        conversation.messages.filter(is_read=False)
-        .exclude(sender=request.user)
-        .count()
+    unread_count = ReadStateService.conversation_unread_count(
+        request.user, conversation
     )
 
     return JSONResponseMixin.success_response(
@@ -565,89 +572,23 @@ def mark_conversation_as_read(request, conversation_id):
     if request.user not in conversation.participants.all():
         return JSONResponseMixin.error_response(_("Access denied"), status=403)
 
-    with transaction.atomic():
-        updated_count = (
-            conversation.messages.filter(is_read=False)
-            .exclude(sender=request.user)
-            .update(is_read=True)
-        )
-        cache.delete(f"chat_dashboard_{request.user.id}")
+    last_read_id = ReadStateService.mark_conversation_read(
+        request.user, conversation
+    )
+    cache.delete(f"chat_dashboard_{request.user.id}")
 
     logger.info(
         f"User {request.user.id} marked conversation {conversation_id} as read"
     )
-    return JSONResponseMixin.success_response({"updated_count": updated_count})
+    return JSONResponseMixin.success_response({"last_read_id": last_read_id})
 
 
 @login_required
 @require_http_methods(["GET"])
 def get_unread_counts(request):
     try:
-        private_unread = (
-            PrivateMessage.objects.filter(
-                conversation__participants=request.user, is_read=False
-            )
-            .exclude(sender=request.user)
-            .count()
-        )
-
-        my_routes_unread = (
-            RouteChatMessage.objects.filter(
-                route_chat__route__author=request.user, is_read=False
-            )
-            .exclude(user=request.user)
-            .count()
-        )
-
-        shared_routes_unread = (
-            RouteChatMessage.objects.filter(
-                route_chat__route__shared_with=request.user, is_read=False
-            )
-            .exclude(user=request.user)
-            .count()
-        )
-
-        public_routes_unread = (
-            RouteChatMessage.objects.filter(
-                route_chat__route__privacy="public",
-                route_chat__route__is_active=True,
-                is_read=False,
-            )
-            .exclude(route_chat__route__author=request.user)
-            .exclude(user=request.user)
-            .count()
-        )
-
-        total_unread = (
-            private_unread
-            + my_routes_unread
-            + shared_routes_unread
-            + public_routes_unread
-        )
-
-        conversations_unread = []
-        conversations = Conversation.objects.filter(participants=request.user)
-        for conv in conversations:
-            unread = (
-                conv.messages.filter(is_read=False)
-                .exclude(sender=request.user)
-                .count()
-            )
-            if unread > 0:
-                conversations_unread.append(
-                    {"id": conv.id, "unread_count": unread}
-                )
-
         return JSONResponseMixin.success_response(
-            {
-                "success": True,
-                "total_unread": total_unread,
-                "private_unread": private_unread,
-                "my_routes_unread": my_routes_unread,
-                "shared_routes_unread": shared_routes_unread,
-                "public_routes_unread": public_routes_unread,
-                "conversations": conversations_unread,
-            }
+            UnreadSummaryService.get(request.user)
         )
 
     except Exception as e:
@@ -688,20 +629,17 @@ def mark_route_messages_as_read(request, route_id):
             request.user, route_id
         )
 
-        with transaction.atomic():
-            updated_count = (
-                route_chat.messages.filter(is_read=False)
-                .exclude(user=request.user)
-                .update(is_read=True)
-            )
-            cache.delete(f"chat_dashboard_{request.user.id}")
+        last_read_id = ReadStateService.mark_route_chat_read(
+            request.user, route_chat
+        )
+        cache.delete(f"chat_dashboard_{request.user.id}")
 
         logger.info(
             f"User {request.user.id} marked route messages"
             f" for route {route_id} as read"
         )
         return JSONResponseMixin.success_response(
-            {"success": True, "updated_count": updated_count}
+            {"success": True, "last_read_id": last_read_id}
         )
 
     except PermissionDenied as e:
@@ -0,0 +1,119 @@
+from django.db import migrations
+from django.db.models import Avg, Count
+
+
+def copy_rows(source_qs, target_model, build, unique_fields=None):
+    existing = set()
+    if unique_fields:
+        existing = set(target_model.objects.values_list(*unique_fields))
+
+    created = []
+    originals = []
+    for row in source_qs.iterator():
+        if unique_fields:
+            key = tuple(getattr(row, field) for field in unique_fields)
+            if key in existing:
+                continue
+            existing.add(key)
+        created.append(build(row))
+        originals.append(row.created_at)
+
+    created = target_model.objects.bulk_create(created, batch_size=500)
+    for obj, created_at in zip(created, originals):
+        obj.created_at = created_at
+    if created and created[0].pk is not None:
+        target_model.objects.bulk_update(
+            created, ["created_at"], batch_size=500
+        )
+
+
+def merge_route_interactions(apps, schema_editor):
+    Route = apps.get_model("routes", "Route")
+    RouteRating = apps.get_model("routes", "RouteRating")
+    RouteFavorite = apps.get_model("routes", "RouteFavorite")
+    RouteComment = apps.get_model("routes", "RouteComment")
+    Rating = apps.get_model("interactions", "Rating")
+    Favorite = apps.get_model("interactions", "Favorite")
+    Comment = apps.get_model("interactions", "Comment")
+
+    copy_rows(
+        RouteRating.objects.all(),
+        Rating,
+        lambda row: Rating(
+            user_id=row.user_id, route_id=row.route_id, score=row.rating
+        ),
+        unique_fields=("user_id", "route_id"),
+    )
+    copy_rows(
+        RouteFavorite.objects.all(),
+        Favorite,
+        lambda row: Favorite(user_id=row.user_id, route_id=row.route_id),
+        unique_fields=("user_id", "route_id"),
+    )
+    copy_rows(
+        RouteComment.objects.all(),
+        Comment,
+        lambda row: Comment(
+            user_id=row.user_id, route_id=row.route_id, text=row.text
+        ),
+    )
+    # Ratings no longer carry text, so their remarks become comments.
+    copy_rows(
+        RouteRating.objects.exclude(comment__regex=r"^\s*$"),
+        Comment,
+        lambda row: Comment(
+            user_id=row.user_id,
+            route_id=row.route_id,
+            text=row.comment.strip(),
+        ),
+    )
+
+    ratings = {
+        row["route_id"]: row
+        for row in Rating.objects.values("route_id")
+        .annotate(average=Avg("score"), count=Count("id"))
+        .order_by()
+    }
+    favorites = dict(
+        Favorite.objects.values("route_id")
+        .annotate(count=Count("id"))
+        .order_by()
+        .values_list("route_id", "count")
+    )
+    comments = dict(
+        Comment.objects.values("route_id")
+        .annotate(count=Count("id"))
+        .order_by()
+        .values_list("route_id", "count")
+    )
+    routes = list(Route.objects.only("id"))
+    for route in routes:
+        rating = ratings.get(route.id)
+        route.rating_average = round(rating["average"], 2) if rating else 0
+        route.rating_count = rating["count"] if rating else 0
+        route.favorites_count = favorites.get(route.id, 0)
+        route.comments_count = comments.get(route.id, 0)
+    Route.objects.bulk_update(
+        routes,
+        [
+            "rating_average",
+            "rating_count",
+            "favorites_count",
+            "comments_count",
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0003_routeshare"),
+        ("routes", "0013_route_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_route_interactions, migrations.RunPython.noop
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.test import TestCase, Client
+from django.urls import reverse
 from routes.models import Route
 
 from .models import Favorite, Rating, Comment, RouteShare
@@ -335,3 +336,47 @@ class TestModelTimestamps(TestCase):
         )
         self.assertIsNotNone(comment.created_at)
         self.assertIsNotNone(comment.updated_at)
+
+
+class RouteCountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", password="pass123"
+        )
+        self.user = User.objects.create_user(
+            username="visitor", password="pass123"
+        )
+        self.route = Route.objects.create(
+            name="Test Route", author=self.author, privacy="public"
+        )
+        self.client = Client()
+        self.client.login(username="visitor", password="pass123")
+
+    def test_rating_updates_counters(self):
+        self.client.post(
+            reverse("interactions:add_rating", args=[self.route.id]),
+            {"score": "4"},
+        )
+        Rating.objects.create(user=self.author, route=self.route, score=2)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.rating_count, 2)
+        self.assertEqual(self.route.rating_average, 3)
+
+    def test_favorite_toggle_updates_counter(self):
+        url = reverse("interactions:toggle_favorite", args=[self.route.id])
+        self.client.post(url)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.favorites_count, 1)
+        self.client.post(url)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.favorites_count, 0)
+
+    def test_comment_updates_counter(self):
+        comment = Comment.objects.create(
+            user=self.user, route=self.route, text="Nice"
+        )
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.comments_count, 1)
+        comment.delete()
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.comments_count, 0)
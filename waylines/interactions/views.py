@@ -2,6 +2,7 @@ import logging
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
 from django.http import JsonResponse
@@ -97,9 +98,12 @@ def toggle_favorite(request, route_id):
     route = get_object_or_404(Route, id=route_id)
     is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
 
-    favorite, created = Favorite.objects.get_or_create(
-        user=request.user, route=route
-    )
+    with transaction.atomic():
+        favorite, created = Favorite.objects.get_or_create(
+            user=request.user, route=route
+        )
+        if not created:
+            favorite.delete()
 
     if created:
         message = _("Added to favorites")
@@ -109,7 +113,6 @@ def toggle_favorite(request, route_id):
             f" to favorites"
         )
     else:
-        favorite.delete()
         message = _("Removed from favorites")
         is_favorite = False
         logger.info(
@@ -157,11 +160,12 @@ def add_rating(request, route_id):
         messages.error(request, _("Rating must be between 1 and 5"))
         return redirect("route_detail", id=route_id)
 
-    Rating.objects.update_or_create(
-        user=request.user,
-        route=route,
-        defaults={"score": score, "updated_at": timezone.now()},
-    )
+    with transaction.atomic():
+        Rating.objects.update_or_create(
+            user=request.user,
+            route=route,
+            defaults={"score": score, "updated_at": timezone.now()},
+        )
 
     messages.success(request, _("Thank you for your rating!"))
     return redirect(
@@ -193,7 +197,8 @@ def add_comment(request, route_id):
         messages.error(request, _("Comment cannot be empty"))
         return redirect("route_detail", id=route_id)
 
-    Comment.objects.create(route=route, user=request.user, text=text)
+    with transaction.atomic():
+        Comment.objects.create(route=route, user=request.user, text=text)
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         html = _render_comments_html(route, request.user)
@@ -240,7 +245,8 @@ def delete_comment(request, comment_id):
         return redirect("route_detail", id=comment.route_id)
 
     route = comment.route
-    comment.delete()
+    with transaction.atomic():
+        comment.delete()
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         html = _render_comments_html(route, request.user)
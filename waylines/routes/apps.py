@@ -6,3 +6,6 @@ class RoutesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "routes"
     verbose_name = _("Routes")
+
+    def ready(self):
+        from . import checks  # noqa: F401
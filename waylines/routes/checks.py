@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Several worker processes need one cache they all see.
+
+    Map cluster tiles are invalidated by deleting them from the cache,
+    and single-flight coalescing of ORS and TTS requests shares locks
+    and results through it; with a process-local cache other workers
+    serve stale tiles and repeat the upstream calls.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.WEB_CONCURRENCY <= 1 or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"{backend} is local to one process, but WEB_CONCURRENCY is "
+            f"{settings.WEB_CONCURRENCY}.",
+            hint=(
+                "Set CACHE_BACKEND to a cache shared by all workers "
+                "(database, Redis or Memcached)."
+            ),
+            id="routes.E001",
+        )
+    ]
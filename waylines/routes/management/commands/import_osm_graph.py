@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from routes.services.offline_router import parse_osm, write_graph
+
+
+class Command(BaseCommand):
+    help = "Build the offline routing graph from an OSM XML extract"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source", help="OSM XML file (.osm, .osm.bz2 or .osm.gz)"
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Graph file to write (defaults to OFFLINE_GRAPH_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.OFFLINE_GRAPH_PATH
+        try:
+            nodes, edges = parse_osm(options["source"])
+        except (OSError, SyntaxError) as e:
+            raise CommandError(f"Cannot read {options['source']}: {e}")
+        if not nodes:
+            raise CommandError("The extract contains no routable ways")
+
+        header = write_graph(output, nodes, edges)
+        counts = ", ".join(
+            f"{profile}: {meta['edges']} edges"
+            for profile, meta in header["profiles"].items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {header['nodes']} nodes to {output} ({counts})"
+            )
+        )
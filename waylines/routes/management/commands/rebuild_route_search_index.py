@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from routes.services.search import RouteSearchService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of route ids fetched per query",
+        )
+
+    def handle(self, *args, **options):
+        indexed = RouteSearchService.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} routes for search")
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from routes.services.counters import RouteCounterService
+
+
+class Command(BaseCommand):
+    help = "Recompute rating, favorite and comment counters on routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of routes written per UPDATE batch",
+        )
+
+    def handle(self, *args, **options):
+        updated = RouteCounterService.recompute_all(
+            batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed counters for {updated} routes")
+        )
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0008_remove_route_mood_remove_route_theme_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteGeometry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "profile",
+                    models.CharField(
+                        max_length=50, verbose_name="Routing profile"
+                    ),
+                ),
+                (
+                    "points_hash",
+                    models.CharField(
+                        db_index=True,
+                        max_length=64,
+                        verbose_name="Points hash",
+                    ),
+                ),
+                (
+                    "coordinates",
+                    models.JSONField(default=list, verbose_name="Coordinates"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created"
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="geometries",
+                        to="routes.route",
+                        verbose_name="Route",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Route geometry",
+                "verbose_name_plural": "Route geometries",
+                "indexes": [
+                    models.Index(
+                        fields=["profile", "points_hash"],
+                        name="routes_rout_profile_c25591_idx",
+                    )
+                ],
+                "unique_together": {("route", "profile", "points_hash")},
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0009_routegeometry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="elevation_gain",
+            field=models.FloatField(
+                default=0, verbose_name="Elevation gain (m)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="geometry_elevations",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Encoded elevations"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="geometry_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="Geometry hash",
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="geometry_polyline",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Encoded geometry"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="max_latitude",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Max latitude"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="max_longitude",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Max longitude"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="min_latitude",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Min latitude"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="min_longitude",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Min longitude"
+            ),
+        ),
+    ]
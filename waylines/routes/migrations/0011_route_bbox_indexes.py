@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def backfill_route_bbox(apps, schema_editor):
+    Route = apps.get_model("routes", "Route")
+    RoutePoint = apps.get_model("routes", "RoutePoint")
+    extents = (
+        RoutePoint.objects.values("route_id")
+        .annotate(
+            min_lat=Min("latitude"),
+            max_lat=Max("latitude"),
+            min_lng=Min("longitude"),
+            max_lng=Max("longitude"),
+        )
+        .order_by()
+    )
+    for extent in extents:
+        Route.objects.filter(
+            id=extent["route_id"], min_latitude__isnull=True
+        ).update(
+            min_latitude=extent["min_lat"],
+            max_latitude=extent["max_lat"],
+            min_longitude=extent["min_lng"],
+            max_longitude=extent["max_lng"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0010_route_encoded_geometry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["min_latitude", "max_latitude"],
+                name="route_bbox_lat_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["min_longitude", "max_longitude"],
+                name="route_bbox_lng_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_route_bbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0011_route_bbox_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="routepoint",
+            index=models.Index(
+                fields=["latitude", "longitude"],
+                name="routepoint_location_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0012_routepoint_location_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Comments count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Favorites count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="rating_average",
+            field=models.FloatField(
+                default=0, editable=False, verbose_name="Average rating"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Ratings count"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["-favorites_count", "-created_at"],
+                name="route_popular_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["-rating_average", "-rating_count", "-created_at"],
+                name="route_top_rated_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0013_route_counters"),
+        ("interactions", "0004_merge_route_interactions"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="routefavorite",
+            unique_together=None,
+        ),
+        migrations.RemoveField(
+            model_name="routefavorite",
+            name="route",
+        ),
+        migrations.RemoveField(
+            model_name="routefavorite",
+            name="user",
+        ),
+        migrations.AlterUniqueTogether(
+            name="routerating",
+            unique_together=None,
+        ),
+        migrations.RemoveField(
+            model_name="routerating",
+            name="route",
+        ),
+        migrations.RemoveField(
+            model_name="routerating",
+            name="user",
+        ),
+        migrations.DeleteModel(
+            name="RouteComment",
+        ),
+        migrations.DeleteModel(
+            name="RouteFavorite",
+        ),
+        migrations.DeleteModel(
+            name="RouteRating",
+        ),
+    ]
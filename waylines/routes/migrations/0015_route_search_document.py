@@ -0,0 +1,105 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = "routes_routesearchdocument_fts"
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "title, body, content='routes_routesearchdocument', "
+    "content_rowid='route_id', tokenize='unicode61')",
+    "CREATE TRIGGER routes_routesearchdocument_ai "
+    "AFTER INSERT ON routes_routesearchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+    "VALUES (new.route_id, new.title, new.body); END",
+    "CREATE TRIGGER routes_routesearchdocument_ad "
+    "AFTER DELETE ON routes_routesearchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+    "VALUES ('delete', old.route_id, old.title, old.body); END",
+    "CREATE TRIGGER routes_routesearchdocument_au "
+    "AFTER UPDATE ON routes_routesearchdocument BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+    "VALUES ('delete', old.route_id, old.title, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+    "VALUES (new.route_id, new.title, new.body); END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS routes_routesearchdocument_ai",
+    "DROP TRIGGER IF EXISTS routes_routesearchdocument_ad",
+    "DROP TRIGGER IF EXISTS routes_routesearchdocument_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_FORWARD = [
+    "CREATE INDEX routes_search_vector_idx "
+    "ON routes_routesearchdocument USING gin (("
+    "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, body), 'B')))",
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS routes_search_vector_idx"]
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD},
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    run_statements(
+        schema_editor,
+        {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0014_delete_duplicate_interactions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteSearchDocument",
+            fields=[
+                (
+                    "route",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="routes.route",
+                        verbose_name="Route",
+                    ),
+                ),
+                (
+                    "title",
+                    models.TextField(blank=True, verbose_name="Indexed title"),
+                ),
+                (
+                    "body",
+                    models.TextField(blank=True, verbose_name="Indexed body"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Updated"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Route search document",
+                "verbose_name_plural": "Route search documents",
+            },
+        ),
+        # Existing routes are indexed by rebuild_route_search_index, so
+        # the migration does not depend on the analyzer of the day.
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0015_route_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="geometry_lods",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Simplified geometries",
+            ),
+        ),
+    ]
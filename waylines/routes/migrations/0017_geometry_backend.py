@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("routes", "0016_route_geometry_lods"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="geometry_backend",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=10,
+                verbose_name="Geometry backend",
+            ),
+        ),
+        migrations.AddField(
+            model_name="routegeometry",
+            name="backend",
+            field=models.CharField(
+                choices=[
+                    ("ors", "OpenRouteService"),
+                    ("offline", "Offline graph"),
+                ],
+                default="ors",
+                max_length=10,
+                verbose_name="Backend",
+            ),
+        ),
+    ]
@@ -4,6 +4,8 @@ from io import BytesIO
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 import qrcode
 from django.core.files import File
@@ -57,6 +59,42 @@ class Route(models.Model):
         _("Country"), max_length=100, blank=True, null=True
     )
     total_distance = models.FloatField(_("Total distance (km)"), default=0)
+    elevation_gain = models.FloatField(_("Elevation gain (m)"), default=0)
+    geometry_polyline = models.TextField(
+        _("Encoded geometry"), blank=True, editable=False
+    )
+    geometry_elevations = models.TextField(
+        _("Encoded elevations"), blank=True, editable=False
+    )
+    geometry_hash = models.CharField(
+        _("Geometry hash"), max_length=64, blank=True, editable=False
+    )
+    geometry_backend = models.CharField(
+        _("Geometry backend"), max_length=10, blank=True, editable=False
+    )
+    geometry_lods = models.JSONField(
+        _("Simplified geometries"), default=dict, blank=True, editable=False
+    )
+    min_latitude = models.FloatField(_("Min latitude"), null=True, blank=True)
+    min_longitude = models.FloatField(
+        _("Min longitude"), null=True, blank=True
+    )
+    max_latitude = models.FloatField(_("Max latitude"), null=True, blank=True)
+    max_longitude = models.FloatField(
+        _("Max longitude"), null=True, blank=True
+    )
+    rating_average = models.FloatField(
+        _("Average rating"), default=0, editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        _("Ratings count"), default=0, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        _("Favorites count"), default=0, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        _("Comments count"), default=0, editable=False
+    )
     is_active = models.BooleanField(_("Active"), default=True)
     has_audio_guide = models.BooleanField(_("Has audio guide"), default=False)
     is_elderly_friendly = models.BooleanField(
@@ -81,6 +119,24 @@ class Route(models.Model):
         verbose_name = _("Route")
         verbose_name_plural = _("Routes")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["min_latitude", "max_latitude"],
+                name="route_bbox_lat_idx",
+            ),
+            models.Index(
+                fields=["min_longitude", "max_longitude"],
+                name="route_bbox_lng_idx",
+            ),
+            models.Index(
+                fields=["-favorites_count", "-created_at"],
+                name="route_popular_idx",
+            ),
+            models.Index(
+                fields=["-rating_average", "-rating_count", "-created_at"],
+                name="route_top_rated_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} (ID: {self.id})"
@@ -121,18 +177,10 @@ class Route(models.Model):
         super().save(*args, **kwargs)
 
     def get_average_rating(self):
-        from django.db.models import Avg
-        from interactions.models import Rating
-
-        result = Rating.objects.filter(route=self).aggregate(
-            average=Avg("score")
-        )
-        return result["average"] or 0
+        return self.rating_average
 
     def get_ratings_count(self):
-        from interactions.models import Rating
-
-        return Rating.objects.filter(route=self).count()
+        return self.rating_count
 
     @property
     def interaction_comments(self):
@@ -175,52 +223,6 @@ class RoutePhoto(models.Model):
         return f"Photo for {self.route.name}"
 
 
-class RouteRating(models.Model):
-    route = models.ForeignKey(
-        Route,
-        on_delete=models.CASCADE,
-        related_name="ratings",
-        verbose_name=_("Route"),
-    )
-    user = models.ForeignKey(
-        User, on_delete=models.CASCADE, verbose_name=_("User")
-    )
-    rating = models.IntegerField(
-        _("Rating"), validators=[MinValueValidator(1), MaxValueValidator(5)]
-    )
-    comment = models.TextField(_("Comment"), blank=True)
-    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
-
-    class Meta:
-        verbose_name = _("Route rating")
-        verbose_name_plural = _("Route ratings")
-        unique_together = ["route", "user"]
-
-    def __str__(self):
-        return f"{self.rating}★ for {self.route.name}"
-
-
-class RouteFavorite(models.Model):
-    route = models.ForeignKey(
-        Route,
-        on_delete=models.CASCADE,
-        related_name="favorites",
-        verbose_name=_("Route"),
-    )
-    user = models.ForeignKey(
-        User, on_delete=models.CASCADE, verbose_name=_("User")
-    )
-    created_at = models.DateTimeField(_("Added"), auto_now_add=True)
-
-    class Meta:
-        verbose_name = _("Favorite route")
-        verbose_name_plural = _("Favorite routes")
-        unique_together = ["route", "user"]
-
-    def __str__(self):
-        return f"{self.user.username} → {self.route.name}"
-
-
 class RoutePoint(models.Model):
     CATEGORY_CHOICES = [
         ("attraction", _("Attraction")),
@@ -273,11 +275,74 @@ class RoutePoint(models.Model):
         verbose_name = _("Route point")
         verbose_name_plural = _("Route points")
         ordering = ["order"]
+        indexes = [
+            models.Index(
+                fields=["latitude", "longitude"],
+                name="routepoint_location_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} (lat: {self.latitude}, lng: {self.longitude})"
 
 
+class RouteGeometry(models.Model):
+    BACKEND_ORS = "ors"
+    BACKEND_OFFLINE = "offline"
+    BACKEND_CHOICES = [
+        (BACKEND_ORS, _("OpenRouteService")),
+        (BACKEND_OFFLINE, _("Offline graph")),
+    ]
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="geometries",
+        verbose_name=_("Route"),
+    )
+    profile = models.CharField(_("Routing profile"), max_length=50)
+    points_hash = models.CharField(
+        _("Points hash"), max_length=64, db_index=True
+    )
+    coordinates = models.JSONField(_("Coordinates"), default=list)
+    backend = models.CharField(
+        _("Backend"),
+        max_length=10,
+        choices=BACKEND_CHOICES,
+        default=BACKEND_ORS,
+    )
+    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Route geometry")
+        verbose_name_plural = _("Route geometries")
+        unique_together = ["route", "profile", "points_hash"]
+        indexes = [models.Index(fields=["profile", "points_hash"])]
+
+    def __str__(self):
+        return f"{self.profile} geometry for {self.route.name}"
+
+
+class RouteSearchDocument(models.Model):
+    route = models.OneToOneField(
+        Route,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+        verbose_name=_("Route"),
+    )
+    title = models.TextField(_("Indexed title"), blank=True)
+    body = models.TextField(_("Indexed body"), blank=True)
+    updated_at = models.DateTimeField(_("Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Route search document")
+        verbose_name_plural = _("Route search documents")
+
+    def __str__(self):
+        return f"Search document for route {self.route_id}"
+
+
 class PointPhoto(models.Model):
     point = models.ForeignKey(
         RoutePoint,
@@ -322,29 +387,6 @@ class PointComment(models.Model):
         return f"Comment by {self.user.username} for {self.point.name}"
 
 
-class RouteComment(models.Model):
-    route = models.ForeignKey(
-        Route,
-        on_delete=models.CASCADE,
-        related_name="comments",
-        verbose_name=_("Route"),
-    )
-    user = models.ForeignKey(
-        User, on_delete=models.CASCADE, verbose_name=_("User")
-    )
-    text = models.TextField(_("Comment text"))
-    created_at = models.DateTimeField(_("Created"), auto_now_add=True)
-    updated_at = models.DateTimeField(_("Updated"), auto_now=True)
-
-    class Meta:
-        verbose_name = _("Route comment")
-        verbose_name_plural = _("Route comments")
-        ordering = ["-created_at"]
-
-    def __str__(self):
-        return f"Comment by {self.user.username} for {self.route.name}"
-
-
 class UserVisitedPoint(models.Model):
     user = models.ForeignKey(
         User,
@@ -364,3 +406,86 @@ class UserVisitedPoint(models.Model):
 
     def __str__(self):
         return f"{self.user.username} visited {self.point.name}"
+
+
+@receiver(pre_save, sender=RoutePoint)
+def remember_point_location(sender, instance, **kwargs):
+    instance._previous_location = None
+    if instance.pk:
+        instance._previous_location = (
+            RoutePoint.objects.filter(pk=instance.pk)
+            .values_list("latitude", "longitude")
+            .first()
+        )
+
+
+@receiver(post_save, sender=RoutePoint)
+def invalidate_point_clusters(sender, instance, **kwargs):
+    from routes.services.clustering import PointClusterService
+
+    locations = [(instance.latitude, instance.longitude)]
+    previous = getattr(instance, "_previous_location", None)
+    if previous and previous != locations[0]:
+        locations.append(previous)
+    PointClusterService.invalidate(locations)
+
+
+@receiver(post_delete, sender=RoutePoint)
+def invalidate_deleted_point_clusters(sender, instance, **kwargs):
+    from routes.services.clustering import PointClusterService
+
+    PointClusterService.invalidate([(instance.latitude, instance.longitude)])
+
+
+@receiver(pre_save, sender=Route)
+def remember_route_visibility(sender, instance, **kwargs):
+    instance._visibility_changed = False
+    if instance.pk:
+        previous = (
+            Route.objects.filter(pk=instance.pk)
+            .values_list("privacy", "is_active")
+            .first()
+        )
+        instance._visibility_changed = previous is not None and previous != (
+            instance.privacy,
+            instance.is_active,
+        )
+
+
+@receiver(post_save, sender=Route)
+def invalidate_route_clusters(sender, instance, **kwargs):
+    if not getattr(instance, "_visibility_changed", False):
+        return
+    from routes.services.clustering import PointClusterService
+
+    PointClusterService.invalidate(
+        instance.points.values_list("latitude", "longitude")
+    )
+
+
+@receiver(post_save, sender=Route)
+def index_route(sender, instance, update_fields=None, **kwargs):
+    from routes.services.search import INDEXED_ROUTE_FIELDS
+    from routes.services.search import RouteSearchService
+
+    if update_fields and not INDEXED_ROUTE_FIELDS & set(update_fields):
+        return
+    RouteSearchService.index_route(instance.id)
+
+
+@receiver(post_save, sender=RoutePoint)
+def index_point_route(sender, instance, **kwargs):
+    from routes.services.search import RouteSearchService
+
+    RouteSearchService.index_route(instance.route_id)
+
+
+@receiver(post_delete, sender=RoutePoint)
+def index_deleted_point_route(sender, instance, origin=None, **kwargs):
+    # Points removed by a route cascade must not re-create its document.
+    origin_model = getattr(origin, "model", type(origin))
+    if origin_model is Route:
+        return
+    from routes.services.search import RouteSearchService
+
+    RouteSearchService.index_route(instance.route_id)
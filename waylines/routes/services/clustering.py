@@ -0,0 +1,143 @@
+import math
+
+from django.core.cache import cache
+
+from routes.models import RoutePoint
+
+TILE_SIZE = 256
+CELL_SIZE = 64
+MAX_CLUSTER_ZOOM = 16
+MAX_TILES_PER_REQUEST = 64
+TILE_CACHE_TIMEOUT = 60 * 60
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lng_to_world_x(lng, zoom):
+    return (lng + 180.0) / 360.0 * TILE_SIZE * 2**zoom
+
+
+def lat_to_world_y(lat, zoom):
+    lat = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return y * TILE_SIZE * 2**zoom
+
+
+def world_y_to_lat(y, zoom):
+    n = math.pi - 2 * math.pi * y / (TILE_SIZE * 2**zoom)
+    return math.degrees(math.atan(math.sinh(n)))
+
+
+def world_x_to_lng(x, zoom):
+    return x / (TILE_SIZE * 2**zoom) * 360.0 - 180.0
+
+
+class PointClusterService:
+    @staticmethod
+    def tile_for(lat, lng, zoom):
+        limit = 2**zoom - 1
+        x = int(lng_to_world_x(lng, zoom) // TILE_SIZE)
+        y = int(lat_to_world_y(lat, zoom) // TILE_SIZE)
+        return min(max(x, 0), limit), min(max(y, 0), limit)
+
+    @staticmethod
+    def tile_cache_key(zoom, x, y):
+        return f"map_clusters_{zoom}_{x}_{y}"
+
+    @staticmethod
+    def get_clusters(bbox, zoom):
+        """Return clusters for every tile that intersects ``bbox``.
+
+        Returns None when the viewport spans too many tiles.
+        """
+        zoom = min(max(zoom, 0), MAX_CLUSTER_ZOOM)
+        west, south, east, north = bbox
+        min_x, min_y = PointClusterService.tile_for(north, west, zoom)
+        max_x, max_y = PointClusterService.tile_for(south, east, zoom)
+        if west > east:
+            max_x += 2**zoom
+        tiles = [
+            (x % 2**zoom, y)
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+        ]
+        if len(tiles) > MAX_TILES_PER_REQUEST:
+            return None
+
+        keys = {
+            PointClusterService.tile_cache_key(zoom, x, y): (x, y)
+            for x, y in tiles
+        }
+        cached = cache.get_many(list(keys))
+        clusters = []
+        for key, (x, y) in keys.items():
+            tile_clusters = cached.get(key)
+            if tile_clusters is None:
+                tile_clusters = PointClusterService.build_tile(zoom, x, y)
+                cache.set(key, tile_clusters, TILE_CACHE_TIMEOUT)
+            clusters.extend(tile_clusters)
+        return clusters
+
+    @staticmethod
+    def build_tile(zoom, x, y):
+        north = world_y_to_lat(y * TILE_SIZE, zoom)
+        south = world_y_to_lat((y + 1) * TILE_SIZE, zoom)
+        west = world_x_to_lng(x * TILE_SIZE, zoom)
+        east = world_x_to_lng((x + 1) * TILE_SIZE, zoom)
+
+        points = RoutePoint.objects.filter(
+            route__privacy="public",
+            route__is_active=True,
+            latitude__gte=south,
+            latitude__lt=north,
+            longitude__gte=west,
+            longitude__lt=east,
+        ).values_list("id", "route_id", "name", "latitude", "longitude")
+
+        cells = {}
+        for point_id, route_id, name, lat, lng in points:
+            key = (
+                int(lng_to_world_x(lng, zoom) // CELL_SIZE),
+                int(lat_to_world_y(lat, zoom) // CELL_SIZE),
+            )
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = {
+                    "count": 1,
+                    "lat_sum": lat,
+                    "lng_sum": lng,
+                    "point": {
+                        "id": point_id,
+                        "route_id": route_id,
+                        "name": name,
+                    },
+                }
+            else:
+                cell["count"] += 1
+                cell["lat_sum"] += lat
+                cell["lng_sum"] += lng
+
+        clusters = []
+        for cell in cells.values():
+            cluster = {
+                "lat": cell["lat_sum"] / cell["count"],
+                "lng": cell["lng_sum"] / cell["count"],
+                "count": cell["count"],
+            }
+            if cell["count"] == 1:
+                cluster["point"] = cell["point"]
+            clusters.append(cluster)
+        return clusters
+
+    @staticmethod
+    def invalidate(locations):
+        """Drop cached tiles containing any of the (lat, lng) pairs."""
+        keys = set()
+        for lat, lng in locations:
+            if lat is None or lng is None:
+                continue
+            for zoom in range(MAX_CLUSTER_ZOOM + 1):
+                x, y = PointClusterService.tile_for(lat, lng, zoom)
+                keys.add(PointClusterService.tile_cache_key(zoom, x, y))
+        if keys:
+            cache.delete_many(list(keys))
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from interactions.models import Comment, Favorite, Rating
+from routes.models import Route
+
+
+class RouteCounterService:
+    @staticmethod
+    def refresh(route_id):
+        """Recompute the denormalized counters of a single route.
+
+        The route row is locked so concurrent rating and favorite writes
+        for the same route are applied one after another.
+        """
+        with transaction.atomic():
+            locked = Route.objects.select_for_update().filter(id=route_id)
+            if not locked.values_list("id", flat=True):
+                return
+
+            ratings = Rating.objects.filter(route_id=route_id).aggregate(
+                total=Sum("score"), count=Count("id")
+            )
+            rating_total = ratings["total"] or 0
+            rating_count = ratings["count"]
+            favorites_count = Favorite.objects.filter(
+                route_id=route_id
+            ).count()
+            comments_count = Comment.objects.filter(route_id=route_id).count()
+
+            Route.objects.filter(id=route_id).update(
+                rating_average=(
+                    round(rating_total / rating_count, 2)
+                    if rating_count
+                    else 0
+                ),
+                rating_count=rating_count,
+                favorites_count=favorites_count,
+                comments_count=comments_count,
+            )
+
+    @staticmethod
+    def recompute_all(batch_size=500):
+        """Rebuild counters for every route with grouped aggregates."""
+        totals = {
+            row["route_id"]: (row["total"] or 0, row["count"])
+            for row in Rating.objects.values("route_id")
+            .annotate(total=Sum("score"), count=Count("id"))
+            .order_by()
+        }
+        favorites = RouteCounterService._count_by_route(Favorite)
+        comments = RouteCounterService._count_by_route(Comment)
+
+        updated = 0
+        batch = []
+        for route in Route.objects.only("id").iterator():
+            total, count = totals.get(route.id, (0, 0))
+            route.rating_average = round(total / count, 2) if count else 0
+            route.rating_count = count
+            route.favorites_count = favorites.get(route.id, 0)
+            route.comments_count = comments.get(route.id, 0)
+            batch.append(route)
+            if len(batch) >= batch_size:
+                updated += RouteCounterService._save_batch(batch)
+                batch = []
+        if batch:
+            updated += RouteCounterService._save_batch(batch)
+        return updated
+
+    @staticmethod
+    def _count_by_route(model):
+        return dict(
+            model.objects.values("route_id")
+            .annotate(count=Count("id"))
+            .order_by()
+            .values_list("route_id", "count")
+        )
+
+    @staticmethod
+    def _save_batch(routes):
+        Route.objects.bulk_update(
+            routes,
+            [
+                "rating_average",
+                "rating_count",
+                "favorites_count",
+                "comments_count",
+            ],
+        )
+        return len(routes)
@@ -0,0 +1,405 @@
+import bz2
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import xml.etree.ElementTree as ElementTree
+from array import array
+
+from django.conf import settings
+
+from routes.services.routing import haversine_km
+
+logger = logging.getLogger(__name__)
+
+GRAPH_VERSION = 1
+GRID_CELL_DEG = 0.01
+SNAP_RINGS = 3
+EARTH_KM_PER_DEG = 111.2
+# Settled nodes after which a search gives up, so that unreachable
+# targets on a country-sized graph cannot hold a request for long.
+MAX_EXPANSIONS = 500_000
+
+ORS_PROFILES = {
+    "foot-walking": "foot",
+    "cycling-regular": "bike",
+    "driving-car": "car",
+}
+
+# Travel speed in km/h per highway type; missing types are not routable.
+PROFILE_SPEEDS = {
+    "foot": {
+        "primary": 5,
+        "primary_link": 5,
+        "secondary": 5,
+        "secondary_link": 5,
+        "tertiary": 5,
+        "tertiary_link": 5,
+        "unclassified": 5,
+        "residential": 5,
+        "living_street": 5,
+        "service": 5,
+        "road": 5,
+        "pedestrian": 5,
+        "footway": 5,
+        "path": 5,
+        "track": 5,
+        "cycleway": 5,
+        "bridleway": 4,
+        "steps": 3,
+    },
+    "bike": {
+        "primary": 16,
+        "primary_link": 16,
+        "secondary": 17,
+        "secondary_link": 17,
+        "tertiary": 18,
+        "tertiary_link": 18,
+        "unclassified": 16,
+        "residential": 16,
+        "living_street": 10,
+        "service": 14,
+        "road": 14,
+        "cycleway": 20,
+        "track": 12,
+        "path": 12,
+        "pedestrian": 8,
+        "footway": 6,
+    },
+    "car": {
+        "motorway": 100,
+        "motorway_link": 50,
+        "trunk": 80,
+        "trunk_link": 45,
+        "primary": 60,
+        "primary_link": 40,
+        "secondary": 50,
+        "secondary_link": 35,
+        "tertiary": 40,
+        "tertiary_link": 30,
+        "unclassified": 30,
+        "residential": 25,
+        "living_street": 10,
+        "service": 15,
+        "road": 30,
+    },
+}
+PROFILE_ACCESS_TAGS = {
+    "foot": ("foot",),
+    "bike": ("bicycle",),
+    "car": ("motor_vehicle", "motorcar"),
+}
+DENIED = {"no", "private"}
+
+
+def _open(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _directions(tags, profile):
+    """Return (forward, backward) travel permissions for a way."""
+    if tags.get("access") in DENIED:
+        allowed = any(
+            tags.get(tag) not in (None, *DENIED)
+            for tag in PROFILE_ACCESS_TAGS[profile]
+        )
+        if not allowed:
+            return False, False
+    if any(tags.get(tag) in DENIED for tag in PROFILE_ACCESS_TAGS[profile]):
+        return False, False
+    if profile == "foot":
+        return True, True
+
+    oneway = tags.get("oneway")
+    if profile == "bike" and tags.get("oneway:bicycle") == "no":
+        oneway = "no"
+    if oneway is None and (
+        tags.get("junction") == "roundabout"
+        or tags.get("highway") == "motorway"
+    ):
+        oneway = "yes"
+    if oneway in ("yes", "1", "true"):
+        return True, False
+    if oneway == "-1":
+        return False, True
+    return True, True
+
+
+def parse_osm(path):
+    """Read routable ways from an OSM XML extract (.osm, .bz2, .gz).
+
+    Returns ``(nodes, edges)``: node coordinates as ``{osm_id: (lat,
+    lng)}`` and per-profile lists of ``(from_id, to_id, seconds)``.
+    """
+    coordinates = {}
+    ways = []
+    with _open(path) as source:
+        for _, element in ElementTree.iterparse(source, events=("end",)):
+            if element.tag == "node":
+                coordinates[int(element.get("id"))] = (
+                    float(element.get("lat")),
+                    float(element.get("lon")),
+                )
+                element.clear()
+            elif element.tag == "way":
+                tags = {
+                    tag.get("k"): tag.get("v") for tag in element.iter("tag")
+                }
+                if tags.get("highway") and tags.get("area") != "yes":
+                    refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                    ways.append((refs, tags))
+                element.clear()
+
+    edges = {profile: [] for profile in PROFILE_SPEEDS}
+    used = set()
+    for refs, tags in ways:
+        refs = [ref for ref in refs if ref in coordinates]
+        for profile, speeds in PROFILE_SPEEDS.items():
+            speed = speeds.get(tags["highway"])
+            if speed is None:
+                continue
+            forward, backward = _directions(tags, profile)
+            if not (forward or backward):
+                continue
+            for a, b in zip(refs, refs[1:]):
+                km = haversine_km(*coordinates[a], *coordinates[b])
+                seconds = km / speed * 3600
+                if forward:
+                    edges[profile].append((a, b, seconds))
+                if backward:
+                    edges[profile].append((b, a, seconds))
+                used.update((a, b))
+    nodes = {osm_id: coordinates[osm_id] for osm_id in used}
+    return nodes, edges
+
+
+def _max_speed(nodes, edges):
+    """Fastest edge speed in km/h, which keeps the A* estimate tight."""
+    fastest = max(
+        (
+            haversine_km(*nodes[a], *nodes[b]) / seconds * 3600
+            for a, b, seconds in edges
+            if seconds > 0
+        ),
+        default=1.0,
+    )
+    # Headroom for weights rounded to single precision.
+    return fastest * 1.001
+
+
+def write_graph(path, nodes, edges):
+    """Store the graph as compact adjacency (CSR) arrays."""
+    ids = sorted(nodes)
+    index = {osm_id: i for i, osm_id in enumerate(ids)}
+    lats = array("d", (nodes[osm_id][0] for osm_id in ids))
+    lngs = array("d", (nodes[osm_id][1] for osm_id in ids))
+
+    arrays = [lats, lngs]
+    header = {"version": GRAPH_VERSION, "nodes": len(ids), "profiles": {}}
+    for profile in sorted(edges):
+        profile_edges = sorted(
+            (index[a], index[b], seconds) for a, b, seconds in edges[profile]
+        )
+        offsets = array("q", [0] * (len(ids) + 1))
+        for source, _, _ in profile_edges:
+            offsets[source + 1] += 1
+        for i in range(len(ids)):
+            offsets[i + 1] += offsets[i]
+        arrays.append(offsets)
+        arrays.append(array("q", (target for _, target, _ in profile_edges)))
+        arrays.append(array("f", (seconds for _, _, seconds in profile_edges)))
+        header["profiles"][profile] = {
+            "edges": len(profile_edges),
+            "max_speed": _max_speed(nodes, edges[profile]),
+        }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as output:
+        output.write(json.dumps(header).encode() + b"\n")
+        for values in arrays:
+            values.tofile(output)
+    return header
+
+
+class OfflineGraph:
+    """Road graph imported from OpenStreetMap, queried with A*."""
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            header = json.loads(source.readline())
+            if header.get("version") != GRAPH_VERSION:
+                raise ValueError(f"Unsupported graph version in {path}")
+            count = header["nodes"]
+            self.lats = self._read(source, "d", count)
+            self.lngs = self._read(source, "d", count)
+            self.profiles = {}
+            for profile in sorted(header["profiles"]):
+                meta = header["profiles"][profile]
+                self.profiles[profile] = (
+                    self._read(source, "q", count + 1),
+                    self._read(source, "q", meta["edges"]),
+                    self._read(source, "f", meta["edges"]),
+                    meta["max_speed"],
+                )
+        self._grids = {}
+
+    @staticmethod
+    def _read(source, typecode, count):
+        values = array(typecode)
+        values.fromfile(source, count)
+        return values
+
+    def _grid(self, profile):
+        if profile not in self._grids:
+            offsets = self.profiles[profile][0]
+            grid = {}
+            for node in range(len(self.lats)):
+                if offsets[node + 1] > offsets[node]:
+                    grid.setdefault(self._cell(node), []).append(node)
+            self._grids[profile] = grid
+        return self._grids[profile]
+
+    def _cell(self, node):
+        return (
+            math.floor(self.lats[node] / GRID_CELL_DEG),
+            math.floor(self.lngs[node] / GRID_CELL_DEG),
+        )
+
+    def nearest_node(self, lat, lng, profile):
+        grid = self._grid(profile)
+        row = math.floor(lat / GRID_CELL_DEG)
+        col = math.floor(lng / GRID_CELL_DEG)
+        # Cells in ring k lie at least (k - 1) cell widths away.
+        cell_km = (
+            GRID_CELL_DEG
+            * EARTH_KM_PER_DEG
+            * max(math.cos(math.radians(lat)), 0.01)
+        )
+        best, best_km = None, None
+        for ring in range(SNAP_RINGS + 1):
+            if best_km is not None and (ring - 1) * cell_km > best_km:
+                break
+            for d_row in range(-ring, ring + 1):
+                for d_col in range(-ring, ring + 1):
+                    if max(abs(d_row), abs(d_col)) != ring:
+                        continue
+                    for node in grid.get((row + d_row, col + d_col), ()):
+                        km = haversine_km(
+                            lat, lng, self.lats[node], self.lngs[node]
+                        )
+                        if best_km is None or km < best_km:
+                            best, best_km = node, km
+        return best
+
+    def shortest_path(
+        self, source, target, profile, max_expansions=MAX_EXPANSIONS
+    ):
+        """A* from ``source`` to ``target``; node list or None.
+
+        Also None once ``max_expansions`` nodes were settled without
+        reaching the target.
+        """
+        offsets, targets, weights, max_speed = self.profiles[profile]
+        lats, lngs = self.lats, self.lngs
+        goal_lat, goal_lng = lats[target], lngs[target]
+        seconds_per_km = 3600 / max_speed
+
+        def estimate(node):
+            return (
+                haversine_km(lats[node], lngs[node], goal_lat, goal_lng)
+                * seconds_per_km
+            )
+
+        best = {source: 0.0}
+        previous = {}
+        queue = [(estimate(source), 0.0, source)]
+        expansions = 0
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1]
+            if cost > best[node]:
+                continue
+            expansions += 1
+            if expansions > max_expansions:
+                logger.warning(
+                    f"Offline search gave up after {max_expansions} nodes"
+                )
+                return None
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                new_cost = cost + weights[edge]
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    previous[neighbour] = node
+                    heapq.heappush(
+                        queue,
+                        (new_cost + estimate(neighbour), new_cost, neighbour),
+                    )
+        return None
+
+    def route(self, coordinates, ors_profile):
+        """Path through [lng, lat] waypoints as [lng, lat, 0] triples."""
+        profile = ORS_PROFILES.get(ors_profile, "foot")
+        if profile not in self.profiles:
+            return None
+        nodes = []
+        for lng, lat in ((c[0], c[1]) for c in coordinates):
+            node = self.nearest_node(float(lat), float(lng), profile)
+            if node is None:
+                return None
+            nodes.append(node)
+
+        path = [nodes[0]]
+        for source, target in zip(nodes, nodes[1:]):
+            if source == target:
+                continue
+            leg = self.shortest_path(source, target, profile)
+            if leg is None:
+                return None
+            path.extend(leg[1:])
+        if len(path) < 2:
+            return None
+        return [[self.lngs[node], self.lats[node], 0] for node in path]
+
+
+_graph = None
+_graph_key = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The imported graph, reloaded when the file changes; or None."""
+    global _graph, _graph_key
+    path = settings.OFFLINE_GRAPH_PATH
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    with _graph_lock:
+        if key != _graph_key:
+            try:
+                _graph = OfflineGraph(path)
+            except (OSError, ValueError, EOFError) as e:
+                logger.error(f"Cannot load offline graph {path}: {e}")
+                return None
+            _graph_key = key
+        return _graph
+
+
+def route_offline(coordinates, ors_profile):
+    graph = get_graph()
+    if graph is None:
+        return None
+    return graph.route(coordinates, ors_profile)
@@ -0,0 +1,56 @@
+def encode(rows, precision=5):
+    """Encode rows of numbers with the Google polyline algorithm.
+
+    Every row must have the same number of values. Each column is
+    delta-encoded against the previous row, so lat/lng pairs give the
+    standard polyline format and single values give a compact series.
+    """
+    factor = 10**precision
+    previous = None
+    chunks = []
+    for row in rows:
+        current = [int(round(value * factor)) for value in row]
+        if previous is None:
+            previous = [0] * len(current)
+        for value, last in zip(current, previous):
+            chunks.append(_encode_value(value - last))
+        previous = current
+    return "".join(chunks)
+
+
+def decode(encoded, dimensions=2, precision=5):
+    factor = 10**precision
+    rows = []
+    current = [0] * dimensions
+    index = 0
+    length = len(encoded)
+    while index < length:
+        for dim in range(dimensions):
+            delta, index = _decode_value(encoded, index)
+            current[dim] += delta
+        rows.append([value / factor for value in current])
+    return rows
+
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def _decode_value(encoded, index):
+    result = 0
+    shift = 0
+    while True:
+        byte = ord(encoded[index]) - 63
+        index += 1
+        result |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            break
+    value = ~(result >> 1) if result & 1 else result >> 1
+    return value, index
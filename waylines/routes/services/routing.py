@@ -0,0 +1,409 @@
+import hashlib
+import json
+import logging
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from routes.models import Route, RouteGeometry
+from routes.services import polyline
+from routes.services.simplify import douglas_peucker, zoom_tolerance
+from waylines import http_client, single_flight
+
+logger = logging.getLogger(__name__)
+
+ORS_DIRECTIONS_URL = "https://api.openrouteservice.org/v2/directions"
+
+PROFILE_MAP = {
+    "walking": "foot-walking",
+    "driving": "driving-car",
+    "cycling": "cycling-regular",
+}
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Zoom levels with a precomputed simplified geometry. Anything more
+# detailed than the last level gets the full geometry.
+LOD_ZOOMS = (6, 9, 12, 16)
+
+# Seconds between ORS attempts for points with provisional geometry.
+OFFLINE_RETRY_INTERVAL = 5 * 60
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def path_distance_km(path):
+    return sum(
+        haversine_km(a[1], a[0], b[1], b[0]) for a, b in zip(path, path[1:])
+    )
+
+
+def build_lods(latlngs):
+    """Encode a [lat, lng] path simplified for each of ``LOD_ZOOMS``."""
+    return {
+        str(zoom): polyline.encode(
+            douglas_peucker(latlngs, zoom_tolerance(zoom))
+        )
+        for zoom in LOD_ZOOMS
+    }
+
+
+def elevation_gain_m(path):
+    return sum(
+        max(b[2] - a[2], 0) for a, b in zip(path, path[1:]) if len(b) > 2
+    )
+
+
+class RouteGeometryService:
+    @staticmethod
+    def get_profile(route):
+        return PROFILE_MAP.get(route.route_type, "foot-walking")
+
+    @staticmethod
+    def get_coordinates(points):
+        return [[float(p.longitude), float(p.latitude)] for p in points]
+
+    @staticmethod
+    def get_points_hash(profile, coordinates):
+        payload = json.dumps(
+            [profile, [[round(c, 6) for c in pair] for pair in coordinates]],
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_provisional(backend):
+        """Whether geometry from ``backend`` should be rebuilt later.
+
+        In ``auto`` mode the offline graph only stands in while ORS is
+        unavailable, so its results are retried against ORS, at most
+        once per ``OFFLINE_RETRY_INTERVAL``.
+        """
+        return (
+            settings.ROUTING_BACKEND == "auto"
+            and backend == RouteGeometry.BACKEND_OFFLINE
+        )
+
+    @staticmethod
+    def get_geometry(route, points=None):
+        """Return road geometry as [lng, lat, elevation] triples.
+
+        The result is cached per route profile and point sequence, so
+        the routing backend is only called once for an unchanged route.
+        Provisional offline geometry is served only while ORS still
+        fails. Returns None if the geometry cannot be built.
+        """
+        result = RouteGeometryService.get_geometry_with_backend(route, points)
+        return result[0] if result else None
+
+    @staticmethod
+    def get_geometry_with_backend(route, points=None):
+        """Like ``get_geometry``, paired with the backend that built it."""
+        if points is None:
+            points = route.points.all().order_by("order")
+        points = list(points)
+        if len(points) < 2:
+            return None
+
+        profile = RouteGeometryService.get_profile(route)
+        coordinates = RouteGeometryService.get_coordinates(points)
+        points_hash = RouteGeometryService.get_points_hash(
+            profile, coordinates
+        )
+
+        cached = (
+            RouteGeometry.objects.filter(
+                profile=profile, points_hash=points_hash
+            )
+            .order_by("-backend")
+            .only("route_id", "coordinates", "backend")
+            .first()
+        )
+        retry = (
+            cached is not None
+            and RouteGeometryService.is_provisional(cached.backend)
+            and cache.add(
+                f"route-geometry-retry:{profile}:{points_hash}",
+                True,
+                OFFLINE_RETRY_INTERVAL,
+            )
+        )
+        if cached and not retry:
+            if cached.route_id != route.id:
+                RouteGeometry.objects.get_or_create(
+                    route=route,
+                    profile=profile,
+                    points_hash=points_hash,
+                    defaults={
+                        "coordinates": cached.coordinates,
+                        "backend": cached.backend,
+                    },
+                )
+            return cached.coordinates, cached.backend
+
+        # Viewers of a popular route share one ORS request; across
+        # workers this needs the shared cache routes.E001 enforces.
+        # With a provisional result at hand only ORS is worth asking.
+        fallback = cached is None
+        result = single_flight.do(
+            single_flight.flight_key(
+                "ors-directions",
+                {
+                    "profile": profile,
+                    "coordinates": coordinates,
+                    "fallback": fallback,
+                },
+            ),
+            lambda: RouteGeometryService._fetch_geometry(
+                profile, coordinates, fallback
+            ),
+        )
+        if not result:
+            if cached:
+                return cached.coordinates, cached.backend
+            return None
+
+        geometry, backend = result
+        RouteGeometry.objects.update_or_create(
+            route=route,
+            profile=profile,
+            points_hash=points_hash,
+            defaults={"coordinates": geometry, "backend": backend},
+        )
+        if cached:
+            # Other routes with these points had the same stand-in.
+            RouteGeometry.objects.filter(
+                profile=profile,
+                points_hash=points_hash,
+                backend=RouteGeometry.BACKEND_OFFLINE,
+            ).update(coordinates=geometry, backend=backend)
+        return geometry, backend
+
+    @staticmethod
+    def get_route_path(route, points=None, fetch=True):
+        """Return the route path as [lng, lat, elevation] triples.
+
+        Reads the encoded geometry stored on the route while it still
+        matches the points. Otherwise rebuilds it when ``fetch`` is set.
+        """
+        if points is None:
+            points = route.points.all().order_by("order")
+        points = list(points)
+        if len(points) < 2:
+            return None
+
+        profile = RouteGeometryService.get_profile(route)
+        points_hash = RouteGeometryService.get_points_hash(
+            profile, RouteGeometryService.get_coordinates(points)
+        )
+        if route.geometry_hash == points_hash and route.geometry_polyline:
+            if fetch and RouteGeometryService.is_provisional(
+                route.geometry_backend
+            ):
+                result = RouteGeometryService.get_geometry_with_backend(
+                    route, points
+                )
+                # Only an ORS answer is worth writing to the route.
+                if result and result[1] != route.geometry_backend:
+                    return RouteGeometryService.update_route_geometry(
+                        route, points
+                    )
+            return RouteGeometryService.decode_route_geometry(route)
+        if not fetch:
+            return None
+        return RouteGeometryService.update_route_geometry(route, points)
+
+    @staticmethod
+    def decode_route_geometry(route):
+        latlngs = polyline.decode(route.geometry_polyline)
+        elevations = polyline.decode(
+            route.geometry_elevations, dimensions=1, precision=1
+        )
+        if len(elevations) != len(latlngs):
+            elevations = [[0]] * len(latlngs)
+        return [
+            [lng, lat, elevation[0]]
+            for (lat, lng), elevation in zip(latlngs, elevations)
+        ]
+
+    @staticmethod
+    def get_lod_polyline(route, zoom):
+        """Encoded [lat, lng] geometry with enough detail for ``zoom``.
+
+        Routes stored before levels were introduced get them built on
+        first use.
+        """
+        if not route.geometry_polyline:
+            return ""
+        if not route.geometry_lods:
+            route.geometry_lods = build_lods(
+                polyline.decode(route.geometry_polyline)
+            )
+            Route.objects.filter(id=route.id).update(
+                geometry_lods=route.geometry_lods
+            )
+        level = next((z for z in LOD_ZOOMS if z >= zoom), None)
+        if level is None:
+            return route.geometry_polyline
+        return route.geometry_lods.get(str(level), route.geometry_polyline)
+
+    @staticmethod
+    def update_route_geometry(route, points=None):
+        """Store the encoded geometry and server-side stats on the route.
+
+        Falls back to the straight line between points for the bounding
+        box when ORS is unavailable; the client distance is kept then.
+        """
+        if points is None:
+            points = route.points.all().order_by("order")
+        points = list(points)
+        RouteGeometryService.invalidate(route, points)
+
+        result = RouteGeometryService.get_geometry_with_backend(route, points)
+        geometry, backend = result or (None, "")
+        path = geometry or [
+            [float(p.longitude), float(p.latitude), 0] for p in points
+        ]
+
+        if geometry:
+            profile = RouteGeometryService.get_profile(route)
+            route.geometry_hash = RouteGeometryService.get_points_hash(
+                profile, RouteGeometryService.get_coordinates(points)
+            )
+            route.geometry_backend = backend
+            route.geometry_polyline = polyline.encode(
+                [(coord[1], coord[0]) for coord in geometry]
+            )
+            route.geometry_elevations = polyline.encode(
+                [(coord[2],) for coord in geometry], precision=1
+            )
+            route.geometry_lods = build_lods(
+                [[coord[1], coord[0]] for coord in geometry]
+            )
+            route.total_distance = round(path_distance_km(geometry), 3)
+            route.elevation_gain = round(elevation_gain_m(geometry), 1)
+        else:
+            route.geometry_hash = ""
+            route.geometry_backend = ""
+            route.geometry_polyline = ""
+            route.geometry_elevations = ""
+            route.geometry_lods = {}
+            route.elevation_gain = 0
+
+        if path:
+            route.min_latitude = min(coord[1] for coord in path)
+            route.max_latitude = max(coord[1] for coord in path)
+            route.min_longitude = min(coord[0] for coord in path)
+            route.max_longitude = max(coord[0] for coord in path)
+        else:
+            route.min_latitude = route.max_latitude = None
+            route.min_longitude = route.max_longitude = None
+
+        Route.objects.filter(id=route.id).update(
+            total_distance=route.total_distance,
+            elevation_gain=route.elevation_gain,
+            geometry_polyline=route.geometry_polyline,
+            geometry_elevations=route.geometry_elevations,
+            geometry_hash=route.geometry_hash,
+            geometry_backend=route.geometry_backend,
+            geometry_lods=route.geometry_lods,
+            min_latitude=route.min_latitude,
+            min_longitude=route.min_longitude,
+            max_latitude=route.max_latitude,
+            max_longitude=route.max_longitude,
+        )
+        return geometry
+
+    @staticmethod
+    def invalidate(route, points=None):
+        """Drop cached geometries that no longer match the route points."""
+        if points is None:
+            points = route.points.all().order_by("order")
+        profile = RouteGeometryService.get_profile(route)
+        coordinates = RouteGeometryService.get_coordinates(points)
+        points_hash = RouteGeometryService.get_points_hash(
+            profile, coordinates
+        )
+        RouteGeometry.objects.filter(route=route).exclude(
+            profile=profile, points_hash=points_hash
+        ).delete()
+
+    @staticmethod
+    def _fetch_geometry(profile, coordinates, fallback=True):
+        """Ask the backend chosen by ``ROUTING_BACKEND`` for geometry.
+
+        ``ors`` and ``offline`` use only that backend; ``auto`` falls
+        back to the imported OSM graph when ORS gives no result, unless
+        ``fallback`` is off. Returns ``(geometry, backend)`` or None.
+        """
+        backend = settings.ROUTING_BACKEND
+        if backend != "offline":
+            geometry = RouteGeometryService._request_geometry(
+                profile, coordinates
+            )
+            if geometry is not None:
+                return geometry, RouteGeometry.BACKEND_ORS
+        if backend == "ors" or (backend == "auto" and not fallback):
+            return None
+
+        from routes.services.offline_router import route_offline
+
+        geometry = route_offline(coordinates, profile)
+        if geometry is None:
+            return None
+        return geometry, RouteGeometry.BACKEND_OFFLINE
+
+    @staticmethod
+    def _request_geometry(profile, coordinates):
+        api_key = getattr(settings, "OPENROUTESERVICE_API_KEY", None)
+        if not api_key:
+            return None
+
+        try:
+            response = http_client.post(
+                f"{ORS_DIRECTIONS_URL}/{profile}/geojson",
+                headers={
+                    "Authorization": api_key,
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "coordinates": coordinates,
+                    "elevation": True,
+                    "instructions": False,
+                    "preference": "recommended",
+                },
+            )
+            if response.status_code != 200:
+                logger.warning(
+                    f"ORS error ({response.status_code}): "
+                    f"{response.text[:200]}"
+                )
+                return None
+
+            data = response.json()
+            if not data.get("features"):
+                return None
+
+            geometry = data["features"][0]["geometry"]["coordinates"]
+            return [
+                [
+                    float(coord[0]),
+                    float(coord[1]),
+                    float(coord[2]) if len(coord) > 2 else 0,
+                ]
+                for coord in geometry
+            ]
+        except Exception as e:
+            logger.error(f"ORS request error: {e}")
+            return None
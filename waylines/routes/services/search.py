@@ -0,0 +1,166 @@
+import logging
+
+from django.db import connection, DatabaseError
+from django.db.models import Case, IntegerField, When
+
+from routes.models import Route, RoutePoint, RouteSearchDocument
+from routes.services.stemming import analyze, stem_variants, tokenize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_RESULT_LIMIT = 500
+MAX_QUERY_TERMS = 8
+INDEXED_ROUTE_FIELDS = {"name", "description", "short_description", "country"}
+
+FTS_TABLE = "routes_routesearchdocument_fts"
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# Stemming happens in Python, so Postgres only has to split on spaces.
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, body), 'B')"
+)
+
+
+class RouteSearchService:
+    @staticmethod
+    def is_supported():
+        return connection.vendor in ("sqlite", "postgresql")
+
+    @staticmethod
+    def build_document(route_id):
+        route = (
+            Route.objects.filter(id=route_id)
+            .values("name", "short_description", "description", "country")
+            .first()
+        )
+        if route is None:
+            return None
+
+        texts = [route["short_description"], route["description"]]
+        texts.append(route["country"])
+        for name, description, address in RoutePoint.objects.filter(
+            route_id=route_id
+        ).values_list("name", "description", "address"):
+            texts.extend((name, description, address))
+        return analyze(route["name"]), analyze(*texts)
+
+    @staticmethod
+    def index_route(route_id):
+        document = RouteSearchService.build_document(route_id)
+        if document is None:
+            return
+        title, body = document
+        RouteSearchDocument.objects.update_or_create(
+            route_id=route_id, defaults={"title": title, "body": body}
+        )
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        """Re-index every route. Returns the number of routes indexed."""
+        indexed = 0
+        route_ids = Route.objects.values_list("id", flat=True)
+        for route_id in route_ids.iterator(chunk_size=batch_size):
+            RouteSearchService.index_route(route_id)
+            indexed += 1
+        return indexed
+
+    @staticmethod
+    def parse_query(query):
+        """Split a query into groups of alternative stems.
+
+        Every group has to match; any stem inside a group may.
+        """
+        return [
+            stem_variants(token) for token in tokenize(query)[:MAX_QUERY_TERMS]
+        ]
+
+    @staticmethod
+    def search_ids(query, routes=None, limit=SEARCH_RESULT_LIMIT):
+        """Return route ids ranked by relevance, best first.
+
+        Only routes in the ``routes`` queryset are ranked, so the limit
+        is not used up by routes the caller would hide anyway.
+        Returns None when the database has no full-text support, so the
+        caller can fall back to a plain substring filter.
+        """
+        if not RouteSearchService.is_supported():
+            return None
+        groups = RouteSearchService.parse_query(query)
+        if not groups:
+            return []
+
+        candidates = ("", [])
+        if routes is not None:
+            sql, params = (
+                routes.order_by().values("id").query.sql_with_params()
+            )
+            candidates = (f"IN ({sql})", list(params))
+
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    RouteSearchService._search_postgres(
+                        cursor, groups, candidates, limit
+                    )
+                else:
+                    RouteSearchService._search_sqlite(
+                        cursor, groups, candidates, limit
+                    )
+                return [row[0] for row in cursor.fetchall()]
+        except DatabaseError as e:
+            logger.error(f"Full-text search failed: {e}")
+            return None
+
+    @staticmethod
+    def _search_sqlite(cursor, groups, candidates, limit):
+        last = len(groups) - 1
+        terms = []
+        for position, stems in enumerate(groups):
+            suffix = "*" if position == last else ""
+            alternatives = " OR ".join(f'"{stem}"{suffix}' for stem in stems)
+            terms.append(f"({alternatives})")
+        condition, params = candidates
+        if condition:
+            condition = f"AND rowid {condition} "
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"{condition}"
+            f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) "
+            "LIMIT %s",
+            [" AND ".join(terms), *params, limit],
+        )
+
+    @staticmethod
+    def _search_postgres(cursor, groups, candidates, limit):
+        last = len(groups) - 1
+        terms = []
+        for position, stems in enumerate(groups):
+            suffix = ":*" if position == last else ""
+            alternatives = " | ".join(f"{stem}{suffix}" for stem in stems)
+            terms.append(f"({alternatives})")
+        condition, params = candidates
+        if condition:
+            condition = f"AND route_id {condition} "
+        cursor.execute(
+            f"SELECT route_id FROM routes_routesearchdocument, "
+            f"to_tsquery('simple'::regconfig, %s) query "
+            f"WHERE ({POSTGRES_VECTOR}) @@ query {condition}"
+            f"ORDER BY ts_rank({POSTGRES_VECTOR}, query) DESC LIMIT %s",
+            [" & ".join(terms), *params, limit],
+        )
+
+    @staticmethod
+    def order_by_rank(queryset, route_ids):
+        """Filter ``queryset`` to ``route_ids`` keeping their order."""
+        if not route_ids:
+            return queryset.none()
+        rank = Case(
+            *[
+                When(id=route_id, then=position)
+                for position, route_id in enumerate(route_ids)
+            ],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(id__in=route_ids).order_by(rank)
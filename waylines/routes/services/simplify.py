@@ -0,0 +1,49 @@
+def douglas_peucker(points, tolerance):
+    """Simplify a polyline of [x, y, ...] points.
+
+    Uses an explicit stack instead of recursion so long driving routes
+    do not hit the recursion limit. Extra values such as elevation are
+    kept on the retained points.
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tolerance_sq = tolerance * tolerance
+
+    while stack:
+        start, end = stack.pop()
+        max_dist_sq = 0
+        index = None
+        for i in range(start + 1, end):
+            dist_sq = _segment_distance_sq(
+                points[i], points[start], points[end]
+            )
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+        if index is not None and max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def zoom_tolerance(zoom, tile_size=256):
+    """Degrees covered by one screen pixel at a web map zoom level."""
+    return 360.0 / (tile_size * 2 ** max(zoom, 0))
+
+
+def _segment_distance_sq(point, start, end):
+    x, y = point[0], point[1]
+    x1, y1 = start[0], start[1]
+    dx = end[0] - x1
+    dy = end[1] - y1
+    if dx == 0 and dy == 0:
+        return (x - x1) ** 2 + (y - y1) ** 2
+    t = ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return (x - x1 - t * dx) ** 2 + (y - y1 - t * dy) ** 2
@@ -0,0 +1,231 @@
+import re
+import unicodedata
+
+from django.conf import settings
+
+MIN_STEM_LENGTH = 3
+TOKEN_RE = re.compile(r"[^\W_]+")
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Light suffix-stripping stemmers. Suffixes are written without accents
+# because Latin tokens are folded to ASCII before stemming.
+SUFFIXES = {
+    "en": (
+        "ations",
+        "ation",
+        "ingly",
+        "ments",
+        "ment",
+        "ness",
+        "ings",
+        "ing",
+        "ies",
+        "ers",
+        "er",
+        "ed",
+        "es",
+        "ly",
+        "s",
+        "e",
+    ),
+    "es": (
+        "amientos",
+        "imientos",
+        "amiento",
+        "imiento",
+        "aciones",
+        "uciones",
+        "adores",
+        "ancias",
+        "mente",
+        "acion",
+        "ucion",
+        "ador",
+        "ancia",
+        "ables",
+        "ibles",
+        "able",
+        "ible",
+        "idad",
+        "ando",
+        "iendo",
+        "ados",
+        "idos",
+        "adas",
+        "idas",
+        "ado",
+        "ido",
+        "ada",
+        "ida",
+        "osos",
+        "osas",
+        "oso",
+        "osa",
+        "ar",
+        "er",
+        "ir",
+        "es",
+        "os",
+        "as",
+        "a",
+        "o",
+        "e",
+        "s",
+    ),
+    "de": (
+        "ungen",
+        "heiten",
+        "keiten",
+        "ung",
+        "heit",
+        "keit",
+        "lich",
+        "isch",
+        "ern",
+        "em",
+        "en",
+        "er",
+        "es",
+        "e",
+        "s",
+        "n",
+    ),
+    "fr": (
+        "issements",
+        "issement",
+        "ations",
+        "ateurs",
+        "ements",
+        "ement",
+        "ation",
+        "ateur",
+        "ites",
+        "ite",
+        "euses",
+        "euse",
+        "eux",
+        "ives",
+        "ive",
+        "ances",
+        "ance",
+        "ences",
+        "ence",
+        "ment",
+        "ees",
+        "ee",
+        "es",
+        "er",
+        "ez",
+        "e",
+        "s",
+        "x",
+    ),
+    "ru": (
+        "иями",
+        "ями",
+        "ами",
+        "ого",
+        "его",
+        "ому",
+        "ему",
+        "ыми",
+        "ими",
+        "ией",
+        "ий",
+        "ый",
+        "ой",
+        "ей",
+        "ая",
+        "яя",
+        "ое",
+        "ее",
+        "ую",
+        "юю",
+        "ых",
+        "их",
+        "ом",
+        "ем",
+        "ам",
+        "ям",
+        "ах",
+        "ях",
+        "ов",
+        "ев",
+        "ию",
+        "ия",
+        "ие",
+        "ье",
+        "ья",
+        "а",
+        "я",
+        "о",
+        "е",
+        "ы",
+        "и",
+        "у",
+        "ю",
+        "ь",
+        "й",
+    ),
+}
+SUFFIXES = {
+    code: tuple(sorted(suffixes, key=len, reverse=True))
+    for code, suffixes in SUFFIXES.items()
+}
+
+
+def enabled_languages():
+    return [code for code, _ in settings.LANGUAGES if code in SUFFIXES]
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").casefold())
+
+
+def strip_suffix(token, suffixes):
+    for suffix in suffixes:
+        if token.endswith(suffix) and (
+            len(token) - len(suffix) >= MIN_STEM_LENGTH
+        ):
+            return token[: -len(suffix)]
+    return token
+
+
+def fold_latin(token):
+    decomposed = unicodedata.normalize("NFKD", token)
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    )
+
+
+def stem_variants(token):
+    """Return the stems of ``token`` for every language it may belong to.
+
+    Cyrillic words are stemmed as Russian, Latin words with every other
+    enabled language, since the language of a route is not recorded.
+    Both indexed text and queries go through this, so a word matches
+    when any of its variants overlap.
+    """
+    languages = enabled_languages()
+    if CYRILLIC_RE.search(token):
+        token = token.replace("ё", "е")
+        candidates = ["ru"] if "ru" in languages else []
+    else:
+        token = fold_latin(token)
+        candidates = [code for code in languages if code != "ru"]
+
+    variants = [token]
+    for code in candidates:
+        stem = strip_suffix(token, SUFFIXES[code])
+        if stem not in variants:
+            variants.append(stem)
+    return variants
+
+
+def analyze(*texts):
+    """Turn free text into a space separated string of stems."""
+    stems = []
+    for text in texts:
+        for token in tokenize(text):
+            stems.extend(stem_variants(token))
+    return " ".join(stems)
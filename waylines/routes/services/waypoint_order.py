@@ -0,0 +1,165 @@
+from routes.services.routing import haversine_km
+
+NEIGHBOURS = 10
+MAX_PASSES = 50
+OR_OPT_LENGTHS = (1, 2, 3)
+EPSILON = 1e-9
+
+
+def distance_matrix(coordinates):
+    """Great-circle distances in km between [lng, lat] pairs."""
+    n = len(coordinates)
+    dist = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lng1, lat1 = coordinates[i][0], coordinates[i][1]
+        for j in range(i + 1, n):
+            d = haversine_km(lat1, lng1, coordinates[j][1], coordinates[j][0])
+            dist[i][j] = dist[j][i] = d
+    return dist
+
+
+def path_length(order, dist):
+    return sum(dist[a][b] for a, b in zip(order, order[1:]))
+
+
+def optimize_order(coordinates, fixed_end=True):
+    """Return indices of ``coordinates`` in a short visiting order.
+
+    The first point always stays first, and the last stays last when
+    ``fixed_end`` is set. A nearest-neighbour tour is improved with
+    2-opt and Or-opt moves restricted to each point's nearest
+    neighbours, which keeps a few hundred points well under a second.
+    """
+    n = len(coordinates)
+    movable = n - 2 if fixed_end else n - 1
+    if movable < 2:
+        return list(range(n))
+
+    dist = distance_matrix(coordinates)
+    neighbours = [
+        sorted((j for j in range(n) if j != i), key=row.__getitem__)[
+            :NEIGHBOURS
+        ]
+        for i, row in enumerate(dist)
+    ]
+    order = _nearest_neighbour(dist, fixed_end)
+    for _ in range(MAX_PASSES):
+        improved = _two_opt(order, dist, neighbours, fixed_end)
+        improved = _or_opt(order, dist, neighbours, fixed_end) or improved
+        if not improved:
+            break
+    return order
+
+
+def _nearest_neighbour(dist, fixed_end):
+    n = len(dist)
+    remaining = set(range(1, n - 1 if fixed_end else n))
+    order = [0]
+    while remaining:
+        row = dist[order[-1]]
+        nearest = min(remaining, key=row.__getitem__)
+        remaining.remove(nearest)
+        order.append(nearest)
+    if fixed_end:
+        order.append(n - 1)
+    return order
+
+
+def _positions(order):
+    pos = [0] * len(order)
+    for index, point in enumerate(order):
+        pos[point] = index
+    return pos
+
+
+def _two_opt(order, dist, neighbours, fixed_end):
+    """Reverse segments order[i..j] while that shortens the path."""
+    n = len(order)
+    end = n - 1 if fixed_end else n
+    pos = _positions(order)
+    improved = False
+    for i in range(1, end - 1):
+        a, b = order[i - 1], order[i]
+        for c in neighbours[a]:
+            if dist[a][c] >= dist[a][b]:
+                break
+            j = pos[c]
+            if j <= i or j >= end:
+                continue
+            if j + 1 < n:
+                d = order[j + 1]
+                delta = dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d]
+            else:
+                delta = dist[a][c] - dist[a][b]
+            if delta < -EPSILON:
+                order[i : j + 1] = order[i : j + 1][::-1]
+                for k in range(i, j + 1):
+                    pos[order[k]] = k
+                improved = True
+                a, b = order[i - 1], order[i]
+    return improved
+
+
+def _or_opt(order, dist, neighbours, fixed_end):
+    """Move runs of up to three points next to a nearby point."""
+    n = len(order)
+    end = n - 1 if fixed_end else n
+    improved = False
+    for length in OR_OPT_LENGTHS:
+        i = 1
+        while i + length <= end:
+            move = _best_insertion(order, dist, neighbours, i, length, end)
+            if move is None:
+                i += 1
+                continue
+            after, reverse = move
+            segment = order[i : i + length]
+            if reverse:
+                segment.reverse()
+            rest = order[:i] + order[i + length :]
+            at = rest.index(after) + 1
+            order[:] = rest[:at] + segment + rest[at:]
+            improved = True
+    return improved
+
+
+def _best_insertion(order, dist, neighbours, i, length, end):
+    n = len(order)
+    segment = order[i : i + length]
+    first, last = segment[0], segment[-1]
+    prev = order[i - 1]
+    nxt = order[i + length] if i + length < n else None
+    gain = dist[prev][first]
+    if nxt is not None:
+        gain += dist[last][nxt] - dist[prev][nxt]
+
+    pos = _positions(order)
+    best = None
+    candidates = set()
+    for endpoint in (first, last):
+        for u in neighbours[endpoint]:
+            # Insert between u and its successor, or its predecessor and u.
+            candidates.add(pos[u])
+            candidates.add(pos[u] - 1)
+    for p in candidates:
+        # The segment goes between order[p] and the next point outside it.
+        if p < 0 or i - 1 <= p < i + length:
+            continue
+        q = p + 1
+        if q >= n:
+            if end != n:
+                continue
+            v = None
+        elif p >= end:
+            continue
+        else:
+            v = order[q]
+        u = order[p]
+        for head, tail, reverse in ((first, last, False), (last, first, True)):
+            cost = dist[u][head]
+            if v is not None:
+                cost += dist[tail][v] - dist[u][v]
+            delta = cost - gain
+            if delta < -EPSILON and (best is None or delta < best[0]):
+                best = (delta, u, reverse)
+    return None if best is None else best[1:]
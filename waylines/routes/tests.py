@@ -1,10 +1,39 @@
+import hashlib
 import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-
-from .models import Route, RoutePoint, RoutePhoto, RouteRating, RouteFavorite
+from requests import ConnectionError as RequestsConnectionError
+
+from interactions.models import Comment, Favorite, Rating
+from waylines import http_client, single_flight
+
+from .checks import check_shared_cache
+from .models import (
+    Route,
+    RouteGeometry,
+    RoutePoint,
+    RoutePhoto,
+    RouteSearchDocument,
+)
+from .services import polyline
+from .services.offline_router import OfflineGraph, route_offline
+from .services.routing import RouteGeometryService
+from .services.search import RouteSearchService
+from .services.waypoint_order import (
+    distance_matrix,
+    optimize_order,
+    path_length,
+)
 
 
 class RouteModelsTest(TestCase):
@@ -75,11 +104,9 @@ class RouteModelsTest(TestCase):
             author=self.user, name="Test Route", privacy="public"
         )
 
-        rating = RouteRating.objects.create(
-            route=route, user=self.user, rating=5
-        )
+        rating = Rating.objects.create(route=route, user=self.user, score=5)
 
-        self.assertEqual(rating.rating, 5)
+        self.assertEqual(rating.score, 5)
         self.assertEqual(rating.user.username, "testuser")
         self.assertEqual(rating.route.name, "Test Route")
 
@@ -88,7 +115,7 @@ class RouteModelsTest(TestCase):
             author=self.user, name="Test Route", privacy="public"
         )
 
-        favorite = RouteFavorite.objects.create(route=route, user=self.user)
+        favorite = Favorite.objects.create(route=route, user=self.user)
 
         self.assertEqual(favorite.user.username, "testuser")
         self.assertEqual(favorite.route.name, "Test Route")
@@ -186,9 +213,7 @@ class RouteAPITest(TestCase):
         self.assertTrue(data["success"])
 
         self.assertTrue(
-            RouteFavorite.objects.filter(
-                user=self.user, route=self.route
-            ).exists()
+            Favorite.objects.filter(user=self.user, route=self.route).exists()
         )
 
         response = self.client.post(
@@ -213,8 +238,8 @@ class RouteAPITest(TestCase):
         self.assertTrue(data["success"])
 
         self.assertTrue(
-            RouteRating.objects.filter(
-                user=self.user, route=self.route, rating=4
+            Rating.objects.filter(
+                user=self.user, route=self.route, score=4
             ).exists()
         )
 
@@ -258,6 +283,71 @@ class RouteSearchTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_search_matches_inflected_forms(self):
+        response = self.client.get(reverse("all_routes"), {"q": "лесной"})
+        routes = list(response.context["page_obj"].object_list)
+        self.assertEqual(routes, [self.route1])
+
+        response = self.client.get(reverse("all_routes"), {"q": "дороги"})
+        routes = list(response.context["page_obj"].object_list)
+        self.assertEqual(routes, [self.route2])
+
+    def test_search_indexes_points(self):
+        RoutePoint.objects.create(
+            route=self.route2,
+            name="Old lighthouse",
+            address="Harbour street",
+            latitude=55.0,
+            longitude=37.0,
+        )
+        response = self.client.get(reverse("search"), {"q": "lighthouses"})
+        self.assertEqual(list(response.context["routes"]), [self.route2])
+
+        self.route2.points.all().delete()
+        response = self.client.get(reverse("search"), {"q": "lighthouse"})
+        self.assertEqual(list(response.context["routes"]), [])
+
+    def test_search_ranks_name_matches_first(self):
+        self.route2.description = "Лесной маршрут вдоль дороги"
+        self.route2.save()
+
+        response = self.client.get(reverse("all_routes"), {"q": "лес"})
+        routes = list(response.context["page_obj"].object_list)
+        self.assertEqual(routes, [self.route1, self.route2])
+        self.assertEqual(response.context["current_sort"], "relevance")
+
+    def test_search_stems_latin_languages(self):
+        self.route1.name = "Promenades historiques"
+        self.route1.save()
+
+        response = self.client.get(reverse("search"), {"q": "promenade"})
+        self.assertEqual(list(response.context["routes"]), [self.route1])
+
+    def test_search_limit_skips_hidden_routes(self):
+        Route.objects.create(author=self.user, name="Лес", privacy="personal")
+        self.assertNotEqual(
+            RouteSearchService.search_ids("лес", limit=1), [self.route1.id]
+        )
+        visible = Route.objects.filter(privacy="public", is_active=True)
+        self.assertEqual(
+            RouteSearchService.search_ids("лес", visible, limit=1),
+            [self.route1.id],
+        )
+
+    def test_search_ignores_deleted_routes(self):
+        self.route1.delete()
+        response = self.client.get(reverse("search"), {"q": "маршрут"})
+        self.assertEqual(list(response.context["routes"]), [])
+
+    def test_rebuild_search_index_command(self):
+        RouteSearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_route_search_index", stdout=out)
+        self.assertIn("Indexed 2 routes", out.getvalue())
+
+        response = self.client.get(reverse("search"), {"q": "автомобильн"})
+        self.assertEqual(list(response.context["routes"]), [self.route2])
+
 
 class RoutePrivacyTest(TestCase):
     def setUp(self):
@@ -405,10 +495,8 @@ class RouteCommentsTest(TestCase):
 
         self.assertEqual(response.status_code, 302)
 
-        from routes.models import RouteComment
-
         self.assertTrue(
-            RouteComment.objects.filter(
+            Comment.objects.filter(
                 route=self.route, user=self.user, text="Great route!"
             ).exists()
         )
@@ -516,3 +604,727 @@ class TestRoutePointCategories(TestCase):
 
         point = self.route.points.first()
         self.assertIn(point.category, categories)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY="test-key")
+class RouteGeometryCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client = Client()
+        self.client.login(username="testuser", password="testpass123")
+        self.route = Route.objects.create(
+            author=self.user, name="Test Route", privacy="public"
+        )
+        for i in range(2):
+            RoutePoint.objects.create(
+                route=self.route,
+                name=f"Point {i}",
+                latitude=55.75 + i * 0.01,
+                longitude=37.61 + i * 0.01,
+                order=i,
+            )
+
+    def mock_ors(self, coordinates=None):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {
+            "features": [
+                {
+                    "geometry": {
+                        "coordinates": coordinates
+                        or [
+                            [37.61, 55.75, 120.0],
+                            [37.615, 55.755, 125.0],
+                            [37.62, 55.76, 130.0],
+                        ]
+                    }
+                }
+            ]
+        }
+        return mock.patch(
+            "routes.services.routing.http_client.post", return_value=response
+        )
+
+    def test_geometry_requested_once_for_all_endpoints(self):
+        with self.mock_ors() as post:
+            response = self.client.get(
+                reverse("route_path", args=[self.route.id])
+            )
+            self.assertEqual(len(response.json()["coordinates"]), 3)
+            for name in ("export_gpx", "export_kml", "export_geojson"):
+                response = self.client.get(reverse(name, args=[self.route.id]))
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(post.call_count, 1)
+
+    def test_geometry_invalidated_when_points_change(self):
+        with self.mock_ors() as post:
+            RouteGeometryService.get_geometry(self.route)
+            point = self.route.points.last()
+            point.latitude = 55.8
+            point.save()
+            RouteGeometryService.invalidate(self.route)
+            self.assertFalse(self.route.geometries.exists())
+            RouteGeometryService.get_geometry(self.route)
+        self.assertEqual(post.call_count, 2)
+
+    def test_route_stores_encoded_geometry_and_stats(self):
+        with self.mock_ors():
+            RouteGeometryService.update_route_geometry(self.route)
+        self.route.refresh_from_db()
+        self.assertTrue(self.route.geometry_polyline)
+        self.assertAlmostEqual(self.route.elevation_gain, 10.0)
+        self.assertGreater(self.route.total_distance, 1)
+        self.assertEqual(self.route.min_latitude, 55.75)
+        self.assertEqual(self.route.max_longitude, 37.62)
+
+        with mock.patch("routes.services.routing.http_client.post") as post:
+            path = RouteGeometryService.get_route_path(self.route)
+        post.assert_not_called()
+        self.assertEqual(len(path), 3)
+        self.assertAlmostEqual(path[1][2], 125.0)
+
+    def test_path_simplified_by_zoom_or_tolerance(self):
+        wiggle = [
+            [37.61 + i * 0.0001, 55.75 + (i % 2) * 0.00001, 0]
+            for i in range(200)
+        ]
+        with self.mock_ors(wiggle):
+            RouteGeometryService.update_route_geometry(self.route)
+        self.route.refresh_from_db()
+        self.assertEqual(
+            sorted(self.route.geometry_lods, key=int), ["6", "9", "12", "16"]
+        )
+
+        url = reverse("route_path", args=[self.route.id])
+        full = self.client.get(url).json()["coordinates"]
+        preview = self.client.get(url, {"zoom": 10}).json()["coordinates"]
+        rough = self.client.get(url, {"tolerance": 0.001}).json()
+        self.assertEqual(len(full), 200)
+        self.assertEqual(len(preview), 2)
+        self.assertEqual(len(rough["coordinates"]), 2)
+        self.assertEqual(
+            len(self.client.get(url, {"zoom": 19}).json()["coordinates"]),
+            200,
+        )
+        self.assertEqual(self.client.get(url, {"zoom": "x"}).status_code, 400)
+
+    def test_levels_built_for_routes_stored_without_them(self):
+        Route.objects.filter(id=self.route.id).update(
+            geometry_polyline=polyline.encode([(55.75, 37.61), (55.76, 37.62)])
+        )
+        self.route.refresh_from_db()
+        encoded = RouteGeometryService.get_lod_polyline(self.route, 8)
+        self.assertEqual(len(polyline.decode(encoded)), 2)
+        self.route.refresh_from_db()
+        self.assertIn("9", self.route.geometry_lods)
+
+
+@override_settings(
+    HTTP_RETRIES=2, HTTP_CIRCUIT_THRESHOLD=3, HTTP_CIRCUIT_RESET=30
+)
+@mock.patch("waylines.http_client.time.sleep")
+class OutboundClientTest(TestCase):
+    URL = "https://api.example.com/v1/thing"
+
+    def setUp(self):
+        self.http = http_client.OutboundClient()
+
+    def respond(self, *statuses):
+        responses = [
+            mock.Mock(status_code=code, headers={}) for code in statuses
+        ]
+        return mock.patch.object(
+            self.http.host(self.URL).session,
+            "request",
+            side_effect=responses,
+        )
+
+    def test_retries_server_errors_with_backoff(self, sleep):
+        with self.respond(503, 429, 200) as request:
+            response = self.http.post(self.URL, json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertLessEqual(sleep.call_args_list[0][0][0], 0.5)
+        self.assertEqual(request.call_args.kwargs["timeout"], (5, 30))
+
+    def test_client_errors_are_not_retried(self, sleep):
+        with self.respond(400) as request:
+            self.assertEqual(self.http.get(self.URL).status_code, 400)
+        request.assert_called_once()
+        sleep.assert_not_called()
+
+    def test_circuit_opens_after_repeated_failures(self, sleep):
+        session = self.http.host(self.URL).session
+        with mock.patch.object(
+            session, "request", side_effect=RequestsConnectionError("down")
+        ) as request:
+            # Retries inside one call count as a single failure.
+            for _ in range(3):
+                with self.assertRaises(RequestsConnectionError):
+                    self.http.post(self.URL)
+            self.assertEqual(request.call_count, 9)
+            with self.assertRaises(http_client.CircuitOpenError):
+                self.http.post(self.URL)
+            self.assertEqual(request.call_count, 9)
+
+        breaker = self.http.host(self.URL).breaker
+        breaker.opened_at -= 31
+        with self.respond(200):
+            self.assertEqual(self.http.post(self.URL).status_code, 200)
+        self.assertIsNone(breaker.opened_at)
+
+    def test_queue_timeout_does_not_wedge_half_open_trial(self, sleep):
+        host = self.http.host(self.URL)
+        host.breaker.failures = 3
+        host.breaker.opened_at = time.monotonic() - 31
+        with (
+            override_settings(HTTP_QUEUE_TIMEOUT=0),
+            mock.patch.object(host.slots, "acquire", return_value=False),
+        ):
+            with self.assertRaises(http_client.OutboundError) as raised:
+                self.http.post(self.URL)
+        self.assertNotIsInstance(
+            raised.exception, http_client.CircuitOpenError
+        )
+        self.assertFalse(host.breaker.trial_running)
+        with self.respond(200):
+            self.assertEqual(self.http.post(self.URL).status_code, 200)
+        self.assertIsNone(host.breaker.opened_at)
+
+    def test_ors_outage_returns_service_unavailable(self, sleep):
+        User.objects.create_user(username="u", password="p")
+        self.client.login(username="u", password="p")
+        error = http_client.CircuitOpenError("api.openrouteservice.org")
+        with (
+            override_settings(OPENROUTESERVICE_API_KEY="key"),
+            mock.patch("routes.views.http_client.post", side_effect=error),
+        ):
+            response = self.client.post(
+                reverse("build_route_api"),
+                data=json.dumps({"coordinates": [[37.6, 55.7], [37.7, 55.8]]}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 503)
+
+
+@override_settings(SINGLE_FLIGHT_TIMEOUT=2)
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flights = single_flight.SingleFlight(namespace="test")
+
+    def lock_key(self, key):
+        return f"test:lock:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def result_key(self, key):
+        return f"test:result:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def run_concurrently(self, fn, callers=5):
+        release = threading.Event()
+        outcomes = []
+
+        def upstream():
+            release.wait(2)
+            return fn()
+
+        def caller():
+            try:
+                outcomes.append(self.flights.do("route:1", upstream))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=caller) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_calls_share_one_request(self):
+        upstream = mock.Mock(return_value=[[37.6, 55.7, 0]])
+        outcomes = self.run_concurrently(upstream)
+        upstream.assert_called_once()
+        self.assertEqual(outcomes, [[[37.6, 55.7, 0]]] * 5)
+
+    def test_waiters_receive_the_error(self):
+        upstream = mock.Mock(side_effect=ValueError("ORS down"))
+        outcomes = self.run_concurrently(upstream, callers=3)
+        upstream.assert_called_once()
+        self.assertTrue(all(isinstance(e, ValueError) for e in outcomes))
+
+    def test_waits_for_result_of_another_worker(self):
+        cache.add(self.lock_key("route:1"), True, 10)
+
+        def other_worker():
+            time.sleep(0.1)
+            cache.set(self.result_key("route:1"), ("shared",))
+            cache.delete(self.lock_key("route:1"))
+
+        threading.Thread(target=other_worker).start()
+        upstream = mock.Mock(return_value="own")
+        self.assertEqual(self.flights.do("route:1", upstream), "shared")
+        upstream.assert_not_called()
+
+    def test_takes_over_when_other_worker_fails(self):
+        cache.add(self.lock_key("route:1"), True, 10)
+        threading.Timer(
+            0.1, cache.delete, args=[self.lock_key("route:1")]
+        ).start()
+        upstream = mock.Mock(return_value="own")
+        self.assertEqual(self.flights.do("route:1", upstream), "own")
+        upstream.assert_called_once()
+        self.assertIsNone(cache.get(self.lock_key("route:1")))
+
+
+class WaypointOrderTest(TestCase):
+    # A row of stops along one street, entered out of order.
+    STREET = [[37.60 + 0.01 * x, 55.75] for x in (0, 3, 1, 4, 2, 5)]
+
+    def test_reorders_intermediate_points(self):
+        order = optimize_order(self.STREET)
+        self.assertEqual(order, [0, 2, 4, 1, 3, 5])
+
+    def test_open_end_may_move_last_point(self):
+        points = [[37.60, 55.75], [37.65, 55.75], [37.61, 55.75]]
+        self.assertEqual(optimize_order(points, fixed_end=False), [0, 2, 1])
+        self.assertEqual(optimize_order(points), [0, 1, 2])
+
+    def test_never_longer_than_input_order(self):
+        points = [
+            [37.6 + ((i * 37) % 101) / 500, 55.7 + ((i * 59) % 97) / 500]
+            for i in range(150)
+        ]
+        order = optimize_order(points)
+        self.assertEqual(sorted(order), list(range(150)))
+        self.assertEqual((order[0], order[-1]), (0, 149))
+        dist = distance_matrix(points)
+        self.assertLess(
+            path_length(order, dist),
+            path_length(list(range(150)), dist) / 3,
+        )
+
+    @override_settings(OPENROUTESERVICE_API_KEY="key")
+    def test_build_route_api_optimizes_before_ors(self):
+        User.objects.create_user(username="u", password="p")
+        self.client.login(username="u", password="p")
+        ors = mock.Mock(status_code=200)
+        ors.json.return_value = {"features": []}
+        with mock.patch(
+            "routes.views.http_client.post", return_value=ors
+        ) as post:
+            response = self.client.post(
+                reverse("build_route_api"),
+                data=json.dumps(
+                    {"coordinates": self.STREET, "optimize": True}
+                ),
+                content_type="application/json",
+            )
+        self.assertEqual(response.json()["waypoint_order"], [0, 2, 4, 1, 3, 5])
+        sent = post.call_args.kwargs["json"]["coordinates"]
+        self.assertEqual(
+            [round(lng, 2) for lng, _ in sent],
+            [37.60, 37.61, 37.62, 37.63, 37.64, 37.65],
+        )
+
+    @override_settings(ROUTING_BACKEND="ors", OPENROUTESERVICE_API_KEY=None)
+    def test_build_route_api_returns_order_when_routing_fails(self):
+        User.objects.create_user(username="u", password="p")
+        self.client.login(username="u", password="p")
+        response = self.client.post(
+            reverse("build_route_api"),
+            data=json.dumps({"coordinates": self.STREET, "optimize": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["waypoint_order"], [0, 2, 4, 1, 3, 5])
+
+
+OSM_EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="55.750" lon="37.600"/>
+  <node id="2" lat="55.750" lon="37.610"/>
+  <node id="3" lat="55.760" lon="37.610"/>
+  <node id="4" lat="55.760" lon="37.600"/>
+  <node id="5" lat="55.900" lon="37.900"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/>
+    <tag k="highway" v="residential"/>
+  </way>
+  <way id="11">
+    <nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="residential"/>
+    <tag k="oneway" v="yes"/>
+    <tag k="oneway:bicycle" v="no"/>
+  </way>
+  <way id="12">
+    <nd ref="3"/><nd ref="4"/><nd ref="1"/>
+    <tag k="highway" v="tertiary"/>
+  </way>
+  <way id="13">
+    <nd ref="1"/><nd ref="3"/>
+    <tag k="highway" v="footway"/>
+  </way>
+  <way id="14">
+    <nd ref="4"/><nd ref="5"/>
+    <tag k="highway" v="service"/>
+    <tag k="access" v="private"/>
+  </way>
+</osm>
+"""
+
+
+class OfflineRouterTest(TestCase):
+    A = [37.600, 55.750]
+    B = [37.610, 55.750]
+    C = [37.610, 55.760]
+    D = [37.600, 55.760]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        source = os.path.join(self.tmp.name, "city.osm")
+        with open(source, "w") as extract:
+            extract.write(OSM_EXTRACT)
+        self.graph_path = os.path.join(self.tmp.name, "graph.bin")
+        out = StringIO()
+        call_command(
+            "import_osm_graph", source, output=self.graph_path, stdout=out
+        )
+        self.assertIn("Wrote 4 nodes", out.getvalue())
+        self.graph = OfflineGraph(self.graph_path)
+
+    def path(self, start, end, profile):
+        return [
+            [round(lng, 3), round(lat, 3)]
+            for lng, lat, _ in self.graph.route([start, end], profile)
+        ]
+
+    def test_profiles_use_their_own_edges(self):
+        self.assertEqual(
+            self.path(self.A, self.C, "foot-walking"), [self.A, self.C]
+        )
+        self.assertEqual(
+            self.path(self.A, self.C, "driving-car"),
+            [self.A, self.D, self.C],
+        )
+
+    def test_oneway_applies_to_cars_only(self):
+        self.assertEqual(
+            self.path(self.C, self.B, "driving-car"),
+            [self.C, self.D, self.A, self.B],
+        )
+        self.assertEqual(
+            self.path(self.C, self.B, "cycling-regular"), [self.C, self.B]
+        )
+
+    def test_waypoints_snap_to_nearest_routable_node(self):
+        path = self.path([37.6004, 55.7502], [37.6098, 55.7501], "foot")
+        self.assertEqual(path, [self.A, self.B])
+        self.assertIsNone(
+            self.graph.route([self.A, [10.0, 10.0]], "foot-walking")
+        )
+
+    def test_geometry_falls_back_to_offline_graph(self):
+        user = User.objects.create_user(username="u", password="p")
+        route = Route.objects.create(
+            author=user, name="Offline", route_type="walking"
+        )
+        for order, (lng, lat) in enumerate((self.A, self.C)):
+            RoutePoint.objects.create(
+                route=route,
+                name=str(order),
+                latitude=lat,
+                longitude=lng,
+                order=order,
+            )
+        with override_settings(
+            ROUTING_BACKEND="auto",
+            OPENROUTESERVICE_API_KEY=None,
+            OFFLINE_GRAPH_PATH=self.graph_path,
+        ):
+            RouteGeometryService.update_route_geometry(route)
+        route.refresh_from_db()
+        self.assertEqual(
+            len(RouteGeometryService.decode_route_geometry(route)), 2
+        )
+        self.assertEqual(route.geometry_backend, RouteGeometry.BACKEND_OFFLINE)
+        self.assertEqual(
+            route.geometries.get().backend, RouteGeometry.BACKEND_OFFLINE
+        )
+
+        # While ORS keeps failing, reads retry it once per interval and
+        # leave the stored geometry alone.
+        cache.clear()
+        failure = mock.Mock(status_code=503, text="down")
+        with (
+            override_settings(
+                ROUTING_BACKEND="auto",
+                OPENROUTESERVICE_API_KEY="key",
+                OFFLINE_GRAPH_PATH=self.graph_path,
+            ),
+            mock.patch(
+                "routes.services.routing.http_client.post",
+                return_value=failure,
+            ) as post,
+            mock.patch.object(
+                RouteGeometryService, "update_route_geometry"
+            ) as update,
+        ):
+            for _ in range(3):
+                self.assertEqual(
+                    len(RouteGeometryService.get_route_path(route)), 2
+                )
+        self.assertEqual(post.call_count, 1)
+        update.assert_not_called()
+
+        # Once ORS answers, the stand-in is replaced for good.
+        cache.clear()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {
+            "features": [
+                {"geometry": {"coordinates": [self.A, self.B, self.C]}}
+            ]
+        }
+        with (
+            override_settings(
+                ROUTING_BACKEND="auto",
+                OPENROUTESERVICE_API_KEY="key",
+                OFFLINE_GRAPH_PATH=self.graph_path,
+            ),
+            mock.patch(
+                "routes.services.routing.http_client.post",
+                return_value=response,
+            ) as post,
+        ):
+            self.assertEqual(
+                len(RouteGeometryService.get_route_path(route)), 3
+            )
+            route.refresh_from_db()
+            self.assertEqual(
+                len(RouteGeometryService.get_route_path(route)), 3
+            )
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(route.geometry_backend, RouteGeometry.BACKEND_ORS)
+        self.assertEqual(
+            route.geometries.get().backend, RouteGeometry.BACKEND_ORS
+        )
+
+    def test_search_gives_up_after_expansion_cap(self):
+        source = self.graph.nearest_node(self.A[1], self.A[0], "car")
+        target = self.graph.nearest_node(self.C[1], self.C[0], "car")
+        self.assertIsNotNone(self.graph.shortest_path(source, target, "car"))
+        self.assertIsNone(
+            self.graph.shortest_path(source, target, "car", max_expansions=1)
+        )
+
+    def test_build_route_api_offline_backend(self):
+        User.objects.create_user(username="u", password="p")
+        self.client.login(username="u", password="p")
+        with (
+            override_settings(
+                ROUTING_BACKEND="offline", OFFLINE_GRAPH_PATH=self.graph_path
+            ),
+            mock.patch("routes.views.http_client.post") as post,
+        ):
+            response = self.client.post(
+                reverse("build_route_api"),
+                data=json.dumps(
+                    {"coordinates": [self.C, self.B], "profile": "driving-car"}
+                ),
+                content_type="application/json",
+            )
+        post.assert_not_called()
+        data = response.json()
+        self.assertEqual(data["metadata"]["backend"], "offline")
+        self.assertEqual(
+            len(data["features"][0]["geometry"]["coordinates"]), 4
+        )
+
+    @override_settings(ROUTING_BACKEND="ors", OPENROUTESERVICE_API_KEY=None)
+    def test_ors_backend_does_not_fall_back(self):
+        with override_settings(OFFLINE_GRAPH_PATH=self.graph_path):
+            self.assertIsNotNone(route_offline([self.A, self.C], "foot"))
+            User.objects.create_user(username="u", password="p")
+            self.client.login(username="u", password="p")
+            response = self.client.post(
+                reverse("build_route_api"),
+                data=json.dumps({"coordinates": [self.A, self.C]}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 500)
+
+
+class PolylineTest(TestCase):
+    def test_round_trip(self):
+        coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        encoded = polyline.encode(coords)
+        self.assertEqual(encoded, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        for decoded, original in zip(polyline.decode(encoded), coords):
+            self.assertAlmostEqual(decoded[0], original[0])
+            self.assertAlmostEqual(decoded[1], original[1])
+
+
+class MapViewportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.moscow = Route.objects.create(
+            author=self.user,
+            name="Moscow",
+            privacy="public",
+            min_latitude=55.7,
+            max_latitude=55.8,
+            min_longitude=37.5,
+            max_longitude=37.7,
+            geometry_polyline=polyline.encode(
+                [(55.7, 37.5), (55.75, 37.6), (55.8, 37.7)]
+            ),
+        )
+        self.paris = Route.objects.create(
+            author=self.user,
+            name="Paris",
+            privacy="public",
+            min_latitude=48.8,
+            max_latitude=48.9,
+            min_longitude=2.3,
+            max_longitude=2.4,
+        )
+        Route.objects.create(
+            author=self.user,
+            name="Private Moscow",
+            privacy="private",
+            min_latitude=55.7,
+            max_latitude=55.8,
+            min_longitude=37.5,
+            max_longitude=37.7,
+        )
+
+    def get_viewport(self, bbox, zoom):
+        return self.client.get(
+            reverse("map_viewport"), {"bbox": bbox, "zoom": zoom}
+        )
+
+    def test_returns_only_intersecting_public_routes(self):
+        response = self.get_viewport("37.0,55.0,38.0,56.0", 12)
+        self.assertEqual(response.status_code, 200)
+        routes = response.json()["routes"]
+        self.assertEqual([r["id"] for r in routes], [self.moscow.id])
+        self.assertIn("path", routes[0])
+
+    def test_low_zoom_omits_paths(self):
+        response = self.get_viewport("-10,40,60,60", 3)
+        routes = response.json()["routes"]
+        self.assertEqual(len(routes), 2)
+        self.assertTrue(all("path" not in r for r in routes))
+
+    def test_invalid_bbox(self):
+        response = self.get_viewport("bad", 10)
+        self.assertEqual(response.status_code, 400)
+
+
+class MapClustersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.route = Route.objects.create(
+            author=self.user, name="Moscow", privacy="public"
+        )
+        for i in range(3):
+            RoutePoint.objects.create(
+                route=self.route,
+                name=f"Point {i}",
+                latitude=55.75 + i * 0.001,
+                longitude=37.61 + i * 0.001,
+                order=i,
+            )
+
+    def get_clusters(self, zoom):
+        response = self.client.get(
+            reverse("map_clusters"),
+            {"bbox": "-180,-85,180,85", "zoom": zoom},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["clusters"]
+
+    def test_points_grouped_at_low_zoom(self):
+        clusters = self.get_clusters(2)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]["count"], 3)
+        self.assertAlmostEqual(clusters[0]["lat"], 55.751)
+
+    def test_tile_invalidated_when_point_added(self):
+        self.assertEqual(self.get_clusters(2)[0]["count"], 3)
+        RoutePoint.objects.create(
+            route=self.route,
+            name="Point 3",
+            latitude=55.76,
+            longitude=37.62,
+            order=3,
+        )
+        self.assertEqual(self.get_clusters(2)[0]["count"], 4)
+
+    def test_tile_invalidated_when_route_hidden(self):
+        self.assertEqual(len(self.get_clusters(2)), 1)
+        self.route.is_active = False
+        self.route.save()
+        self.assertEqual(self.get_clusters(2), [])
+
+    def test_several_workers_require_shared_cache(self):
+        with override_settings(WEB_CONCURRENCY=1):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(WEB_CONCURRENCY=4):
+            self.assertEqual(
+                [error.id for error in check_shared_cache(None)],
+                ["routes.E001"],
+            )
+        with override_settings(
+            WEB_CONCURRENCY=4,
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                    "LOCATION": "cache",
+                }
+            },
+        ):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_too_many_tiles(self):
+        response = self.client.get(
+            reverse("map_clusters"),
+            {"bbox": "-180,-85,180,85", "zoom": 10},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RouteCountersCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.popular = Route.objects.create(
+            author=self.user, name="Popular", privacy="public"
+        )
+        self.quiet = Route.objects.create(
+            author=self.user, name="Quiet", privacy="public"
+        )
+        Favorite.objects.create(route=self.popular, user=self.user)
+
+    def test_recompute_route_counters(self):
+        Route.objects.update(favorites_count=0, rating_count=7)
+        call_command("recompute_route_counters", stdout=StringIO())
+        self.popular.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.popular.favorites_count, 1)
+        self.assertEqual(self.quiet.rating_count, 0)
+
+    def test_all_routes_sorted_by_popularity(self):
+        response = self.client.get(reverse("all_routes"), {"sort": "popular"})
+        routes = response.context["page_obj"].object_list
+        self.assertEqual(routes[0], self.popular)
@@ -12,6 +12,8 @@ urlpatterns = [
         views.get_route_path,
         name="route_path",
     ),
+    path("api/map/routes/", views.map_viewport, name="map_viewport"),
+    path("api/map/clusters/", views.map_clusters, name="map_clusters"),
     path("api/routes/", views.RouteCreateView.as_view(), name="route_create"),
     path(
         "api/routes/<int:pk>/",
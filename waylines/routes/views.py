@@ -3,23 +3,24 @@ import json
 from pathlib import Path
 import os
 
-import requests
 from gpxpy import gpx
+import requests
 
 
 from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.contrib import messages
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
+from django.db.models import Q
 from django.http import JsonResponse
 from django.http import HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.utils import timezone
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
@@ -31,13 +32,18 @@ from routes.models import (
     RoutePhoto,
     PointPhoto,
     User,
-    RouteRating,
-    RouteFavorite,
-    RouteComment,
     PointComment,
 )
+from routes.services import polyline
+from routes.services.clustering import PointClusterService
+from routes.services.offline_router import route_offline
+from routes.services.routing import RouteGeometryService, path_distance_km
+from routes.services.search import RouteSearchService
+from routes.services.simplify import douglas_peucker
+from routes.services.waypoint_order import optimize_order
 from users.models import Friendship
 from interactions.models import Favorite, Rating, Comment
+from waylines import http_client
 from django.utils.translation import gettext_lazy as _
 
 
@@ -85,7 +91,9 @@ def home(request):
 def all_routes(request):
     route_type = request.GET.get("type", "")
     search_query = request.GET.get("q", "")
-    sort_by = request.GET.get("sort", "newest")
+    sort_by = request.GET.get("sort") or (
+        "relevance" if search_query else "newest"
+    )
 
     routes = Route.objects.filter(
         privacy="public", is_active=True
@@ -93,25 +101,29 @@ def all_routes(request):
 
     if route_type:
         routes = routes.filter(route_type=route_type)
+
+    ranked_ids = None
     if search_query:
-        routes = routes.filter(
-            Q(name__icontains=search_query)
-            | Q(description__icontains=search_query)
-            | Q(short_description__icontains=search_query)
-            | Q(points__name__icontains=search_query)
-            | Q(points__description__icontains=search_query)
-        ).distinct()
-
-    routes = routes.annotate(
-        avg_rating=Avg("ratings__rating"),
-        rating_count=Count("ratings"),
-        favorites_count=Count("favorites"),
-    )
+        ranked_ids = RouteSearchService.search_ids(search_query, routes)
+        if ranked_ids is None:
+            routes = routes.filter(
+                Q(name__icontains=search_query)
+                | Q(description__icontains=search_query)
+                | Q(short_description__icontains=search_query)
+                | Q(points__name__icontains=search_query)
+                | Q(points__description__icontains=search_query)
+            ).distinct()
+        else:
+            routes = routes.filter(id__in=ranked_ids)
 
-    if sort_by == "popular":
+    if sort_by == "relevance" and ranked_ids is not None:
+        routes = RouteSearchService.order_by_rank(routes, ranked_ids)
+    elif sort_by == "popular":
         routes = routes.order_by("-favorites_count", "-created_at")
     elif sort_by == "rating":
-        routes = routes.order_by("-avg_rating", "-rating_count", "-created_at")
+        routes = routes.order_by(
+            "-rating_average", "-rating_count", "-created_at"
+        )
     else:
         routes = routes.order_by("-created_at")
 
@@ -151,9 +163,7 @@ def my_routes(request):
     user_routes = Route.objects.filter(author=request.user).prefetch_related(
         "photos"
     )
-    user_routes = user_routes.annotate(
-        rating=Avg("ratings__rating"), rating_count=Count("ratings")
-    ).order_by("-created_at")
+    user_routes = user_routes.order_by("-created_at")
 
     active_routes = user_routes.filter(is_active=True)
     inactive_routes = user_routes.filter(is_active=False)
@@ -173,13 +183,9 @@ def my_routes(request):
             if fav.route.is_active:
                 favorite_routes_list.append(fav.route)
 
-        favorite_routes = (
-            Route.objects.filter(id__in=[r.id for r in favorite_routes_list])
-            .prefetch_related("photos")
-            .annotate(
-                rating=Avg("ratings__rating"), rating_count=Count("ratings")
-            )
-        )
+        favorite_routes = Route.objects.filter(
+            id__in=[r.id for r in favorite_routes_list]
+        ).prefetch_related("photos")
     else:
         favorite_routes = []
 
@@ -223,9 +229,7 @@ def shared_routes(request):
             user=request.user
         ).values_list("route_id", flat=True)
 
-    routes = routes.annotate(
-        rating=Avg("ratings__rating"), rating_count=Count("ratings")
-    ).order_by("-created_at")
+    routes = routes.order_by("-created_at")
 
     shared_count = (
         Route.objects.filter(shared_with=request.user, is_active=True)
@@ -256,6 +260,10 @@ def shared_routes(request):
     return render(request, "routes/shared_routes.html", context)
 
 
+# The detail map fits the whole route; street-level detail is enough.
+ROUTE_DETAIL_ZOOM = 16
+
+
 def route_detail(request, route_id):
     route = get_object_or_404(
         Route.objects.select_related("author").prefetch_related(
@@ -273,6 +281,9 @@ def route_detail(request, route_id):
         .prefetch_related("photos")
         .order_by("order")
     )
+    route_path = RouteGeometryService.get_route_path(
+        route, points, fetch=False
+    )
     route_photos = route.photos.all().order_by("order")
     comments = (
         Comment.objects.filter(route=route)
@@ -286,7 +297,12 @@ def route_detail(request, route_id):
     try:
         from ai_audio.models import RouteAudioGuide
 
-        full_audio_guide = RouteAudioGuide.objects.filter(route=route).first()
+        full_audio_guide = (
+            RouteAudioGuide.objects.filter(route=route)
+            .exclude(audio_file="")
+            .exclude(audio_file=None)
+            .first()
+        )
         for point in points:
             if point.audio_guide:
                 points_with_audio.append(point.id)
@@ -335,6 +351,13 @@ def route_detail(request, route_id):
         "similar_routes": similar_routes,
         "full_audio_guide": full_audio_guide,
         "points_with_audio": points_with_audio,
+        "route_path_json": json.dumps(
+            polyline.decode(
+                RouteGeometryService.get_lod_polyline(route, ROUTE_DETAIL_ZOOM)
+            )
+            if route_path
+            else []
+        ),
     }
 
     if request.user.is_authenticated:
@@ -527,6 +550,7 @@ def create_route(request):
                                 photo_data, point, PointPhoto, order=j
                             )
 
+            RouteGeometryService.update_route_geometry(route)
             return JsonResponse({"success": True, "route_id": route.id})
         except json.JSONDecodeError:
             return JsonResponse(
@@ -634,6 +658,7 @@ def edit_route(request, route_id):
             RoutePoint.objects.filter(route=route).exclude(
                 id__in=incoming_point_ids
             ).delete()
+            RouteGeometryService.update_route_geometry(route)
 
             for point_data in points_data:
                 point_id = point_data.get("id")
@@ -970,13 +995,14 @@ def rate_route(request, route_id):
                 }
             )
 
-        rating, created = RouteRating.objects.get_or_create(
-            route=route, user=request.user, defaults={"rating": rating_value}
-        )
-        if not created:
-            rating.rating = rating_value
-            rating.save()
+        with transaction.atomic():
+            Rating.objects.update_or_create(
+                route=route,
+                user=request.user,
+                defaults={"score": rating_value},
+            )
 
+        route.refresh_from_db(fields=["rating_average", "rating_count"])
         return JsonResponse(
             {"success": True, "average_rating": route.get_average_rating()}
         )
@@ -988,11 +1014,13 @@ def rate_route(request, route_id):
 def toggle_favorite(request, route_id):
     route = get_object_or_404(Route, id=route_id)
     if request.method == "POST":
-        favorite, created = RouteFavorite.objects.get_or_create(
-            route=route, user=request.user
-        )
+        with transaction.atomic():
+            favorite, created = Favorite.objects.get_or_create(
+                route=route, user=request.user
+            )
+            if not created:
+                favorite.delete()
         if not created:
-            favorite.delete()
             return JsonResponse({"success": True, "is_favorite": False})
         return JsonResponse({"success": True, "is_favorite": True})
     return JsonResponse({"success": False, "error": _("Only POST allowed.")})
@@ -1004,9 +1032,7 @@ def add_route_comment(request, route_id):
     if request.method == "POST":
         text = request.POST.get("text")
         if text:
-            RouteComment.objects.create(
-                route=route, user=request.user, text=text
-            )
+            Comment.objects.create(route=route, user=request.user, text=text)
             messages.success(request, _("Comment added."))
     return redirect("route_detail", route_id=route_id)
 
@@ -1025,48 +1051,120 @@ def add_point_comment(request, point_id):
 
 
 def map_view(request):
+    return render(
+        request,
+        "map/map_view.html",
+        {"viewport_url": reverse("map_viewport")},
+    )
+
+
+MAP_VIEWPORT_LIMIT = 500
+MAP_PATH_MIN_ZOOM = 8
+
+
+def parse_bbox(value):
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= south <= north <= 90):
+        return None
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        return None
+    return west, south, east, north
+
+
+@require_http_methods(["GET"])
+def map_viewport(request):
+    bbox = parse_bbox(request.GET.get("bbox"))
+    if not bbox:
+        return JsonResponse(
+            {"error": "bbox must be west,south,east,north"}, status=400
+        )
+    try:
+        zoom = int(request.GET.get("zoom", MAP_PATH_MIN_ZOOM))
+    except ValueError:
+        return JsonResponse({"error": "Invalid zoom"}, status=400)
+
+    west, south, east, north = bbox
+    if west <= east:
+        lng_filter = Q(min_longitude__lte=east, max_longitude__gte=west)
+    else:
+        lng_filter = Q(min_longitude__lte=east) | Q(max_longitude__gte=west)
+
     routes = (
-        Route.objects.filter(privacy="public", is_active=True)
-        .prefetch_related("points", "photos")
-        .annotate(avg_rating=Avg("ratings__rating"))
+        Route.objects.filter(
+            lng_filter,
+            privacy="public",
+            is_active=True,
+            min_latitude__lte=north,
+            max_latitude__gte=south,
+        )
+        .prefetch_related(
+            models.Prefetch(
+                "photos",
+                queryset=RoutePhoto.objects.order_by("-is_main", "order"),
+            )
+        )
+        .order_by("-created_at")[:MAP_VIEWPORT_LIMIT]
     )
+
+    include_path = zoom >= MAP_PATH_MIN_ZOOM
     routes_data = []
     for route in routes:
+        photos = list(route.photos.all()[:1])
         route_data = {
             "id": route.id,
             "title": route.name,
             "short_description": route.short_description,
-            "description": route.description,
             "distance": route.total_distance,
-            "rating": route.avg_rating or 0,
+            "rating": route.rating_average,
             "has_audio": route.has_audio_guide,
-            "difficulty": route.route_type,
-            "photos": [
-                {"url": photo.image.url, "caption": photo.caption}
-                for photo in route.photos.all()[:3]
-            ],
-            "points": [
-                {
-                    "lat": p.latitude,
-                    "lng": p.longitude,
-                    "name": p.name,
-                    "address": p.address,
-                    "description": p.description,
-                    "order": p.order,
-                }
-                for p in route.points.all()
+            "route_type": route.route_type,
+            "photo": photos[0].image.url if photos else None,
+            "bbox": [
+                route.min_longitude,
+                route.min_latitude,
+                route.max_longitude,
+                route.max_latitude,
             ],
+            "url": route.get_absolute_url(),
         }
+        if include_path and route.geometry_polyline:
+            route_data["path"] = RouteGeometryService.get_lod_polyline(
+                route, zoom
+            )
         routes_data.append(route_data)
 
-    routes_json = json.dumps(routes_data, ensure_ascii=False)
-    return render(
-        request,
-        "map/map_view.html",
-        {"routes_json": routes_json, "routes": routes},
+    return JsonResponse(
+        {
+            "routes": routes_data,
+            "zoom": zoom,
+            "truncated": len(routes_data) == MAP_VIEWPORT_LIMIT,
+        }
     )
 
 
+@require_http_methods(["GET"])
+def map_clusters(request):
+    bbox = parse_bbox(request.GET.get("bbox"))
+    if not bbox:
+        return JsonResponse(
+            {"error": "bbox must be west,south,east,north"}, status=400
+        )
+    try:
+        zoom = int(request.GET.get("zoom", 0))
+    except ValueError:
+        return JsonResponse({"error": "Invalid zoom"}, status=400)
+
+    clusters = PointClusterService.get_clusters(bbox, zoom)
+    if clusters is None:
+        return JsonResponse(
+            {"error": "Viewport is too large for this zoom"}, status=400
+        )
+    return JsonResponse({"clusters": clusters, "zoom": zoom})
+
+
 def can_view_route(user, route):
     if route.privacy == "public":
         return True
@@ -1147,9 +1245,9 @@ def get_user_rating(user, route):
     if not user.is_authenticated:
         return None
     try:
-        rating = RouteRating.objects.get(user=user, route=route)
-        return rating.rating
-    except RouteRating.DoesNotExist:
+        rating = Rating.objects.get(user=user, route=route)
+        return rating.score
+    except Rating.DoesNotExist:
         return None
 
 
@@ -1224,14 +1322,18 @@ def search_routes(request):
     query = request.GET.get("q", "")
     route_type = request.GET.get("type", "")
     routes = Route.objects.filter(is_active=True)
-    if query:
-        routes = routes.filter(
-            Q(name__icontains=query)
-            | Q(description__icontains=query)
-            | Q(country__icontains=query)
-        )
     if route_type:
         routes = routes.filter(route_type=route_type)
+    if query:
+        ranked_ids = RouteSearchService.search_ids(query, routes)
+        if ranked_ids is None:
+            routes = routes.filter(
+                Q(name__icontains=query)
+                | Q(description__icontains=query)
+                | Q(country__icontains=query)
+            )
+        else:
+            routes = RouteSearchService.order_by_rank(routes, ranked_ids)
 
     user_favorites_ids = []
     if request.user.is_authenticated:
@@ -1356,6 +1458,7 @@ class RouteCreateView(LoginRequiredMixin, View):
                             order=j + additional_counter,
                         )
 
+            RouteGeometryService.update_route_geometry(route)
             return JsonResponse(
                 {"success": True, "route_id": route.id, "id": route.id}
             )
@@ -1572,6 +1675,7 @@ class RouteUpdateView(LoginRequiredMixin, View):
                                     caption=caption,
                                 )
 
+            RouteGeometryService.update_route_geometry(route)
             return JsonResponse(
                 {"success": True, "route_id": route.id, "id": route.id}
             )
@@ -1753,13 +1857,44 @@ def build_route_api(request):
                 {"error": "At least 2 coordinates required"}, status=400
             )
 
-        ors_key = settings.OPENROUTESERVICE_API_KEY
-        if not ors_key:
-            return JsonResponse(
-                {"error": "ORS key not configured"}, status=500
+        waypoint_order = None
+        if data.get("optimize"):
+            waypoint_order = optimize_order(
+                coordinates, fixed_end=data.get("fixed_end", True)
             )
+            coordinates = [coordinates[i] for i in waypoint_order]
+
+        backend = settings.ROUTING_BACKEND
+        result, error = None, None
+        if backend != "offline":
+            result, error = _build_ors_route(coordinates, profile)
+        if result is None and backend != "ors":
+            result = _build_offline_route(coordinates, profile)
+            if result is None and error is None:
+                error = ({"error": "Offline routing graph has no route"}, 503)
+        if result is None:
+            payload, status = error
+            # The new order stands even when no road route was found.
+            if waypoint_order is not None:
+                payload["waypoint_order"] = waypoint_order
+            return JsonResponse(payload, status=status)
+
+        if waypoint_order is not None:
+            result["waypoint_order"] = waypoint_order
+        return JsonResponse(result)
 
-        response = requests.post(
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def _build_ors_route(coordinates, profile):
+    """Return (GeoJSON, None) from ORS, or (None, (error, status))."""
+    ors_key = settings.OPENROUTESERVICE_API_KEY
+    if not ors_key:
+        return None, ({"error": "ORS key not configured"}, 500)
+
+    try:
+        response = http_client.post(
             "https://api.openrouteservice.org/v2/"
             f"directions/{profile}/geojson",
             headers={
@@ -1772,22 +1907,47 @@ def build_route_api(request):
                 "preference": "recommended",
                 "language": "ru",
             },
-            timeout=10,
+            timeout=(5, 10),
         )
+    except http_client.OutboundError as e:
+        return None, ({"error": str(e)}, 503)
+    except requests.RequestException as e:
+        return None, ({"error": str(e)}, 500)
 
-        if response.status_code != 200:
-            return JsonResponse(
-                {
-                    "error": f"ORS error: {response.status_code}",
-                    "details": response.text[:200],
-                },
-                status=400,
-            )
+    if response.status_code != 200:
+        return None, (
+            {
+                "error": f"ORS error: {response.status_code}",
+                "details": response.text[:200],
+            },
+            400,
+        )
+    return response.json(), None
 
-        return JsonResponse(response.json())
 
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+def _build_offline_route(coordinates, profile):
+    """Route on the imported OSM graph, shaped like the ORS response."""
+    path = route_offline(coordinates, profile)
+    if not path:
+        return None
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": [[lng, lat] for lng, lat, _ in path],
+                },
+                "properties": {
+                    "summary": {
+                        "distance": round(path_distance_km(path) * 1000, 1)
+                    },
+                },
+            }
+        ],
+        "metadata": {"backend": "offline"},
+    }
 
 
 @login_required
@@ -1800,43 +1960,28 @@ def get_route_path(request, route_id):
     if len(points) < 2:
         return JsonResponse({"error": "Not enough points"}, status=400)
 
-    ors_key = getattr(settings, "OPENROUTESERVICE_API_KEY", None)
-    if not ors_key:
-        return JsonResponse({"error": "ORS key not configured"}, status=500)
-
-    coordinates = [[float(p.longitude), float(p.latitude)] for p in points]
-    profile_map = {
-        "walking": "foot-walking",
-        "driving": "driving-car",
-        "cycling": "cycling-regular",
-    }
-    profile = profile_map.get(route.route_type, "foot-walking")
-
     try:
-        response = requests.post(
-            "https://api.openrouteservice.org/v2/"
-            f"directions/{profile}/geojson",
-            headers={
-                "Authorization": ors_key,
-                "Content-Type": "application/json",
-            },
-            json={
-                "coordinates": coordinates,
-                "instructions": False,
-                "preference": "recommended",
-                "language": "ru",
-            },
-            timeout=15,
-        )
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("features"):
-                geometry = data["features"][0]["geometry"]["coordinates"]
-                route_coords = [[coord[1], coord[0]] for coord in geometry]
-                return JsonResponse({"coordinates": route_coords})
-        return JsonResponse({"error": "ORS returned invalid data"}, status=400)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        zoom = request.GET.get("zoom")
+        zoom = int(zoom) if zoom else None
+        tolerance = request.GET.get("tolerance")
+        tolerance = float(tolerance) if tolerance else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid zoom or tolerance"}, status=400)
+
+    geometry = RouteGeometryService.get_route_path(route, points)
+    if geometry:
+        route_coords = [[coord[1], coord[0]] for coord in geometry]
+        if tolerance is not None:
+            route_coords = douglas_peucker(route_coords, tolerance)
+        elif zoom is not None and route.geometry_polyline:
+            route_coords = polyline.decode(
+                RouteGeometryService.get_lod_polyline(route, zoom)
+            )
+        return JsonResponse({"coordinates": route_coords})
+
+    if not getattr(settings, "OPENROUTESERVICE_API_KEY", None):
+        return JsonResponse({"error": "ORS key not configured"}, status=500)
+    return JsonResponse({"error": "ORS returned invalid data"}, status=400)
 
 
 def export_gpx(request, route_id):
@@ -1859,76 +2004,17 @@ def export_gpx(request, route_id):
     gpx_track.name = route.name
     gpx_segment = gpx.GPXTrackSegment()
 
-    try:
-        from django.conf import settings
-
-        api_key = settings.OPENROUTESERVICE_API_KEY
-
-        if api_key and len(points) >= 2:
-            coordinates = [
-                [float(p.longitude), float(p.latitude)] for p in points
-            ]
-            profile_map = {
-                "walking": "foot-walking",
-                "cycling": "cycling-regular",
-                "driving": "driving-car",
-            }
-            profile = profile_map.get(route.route_type, "foot-walking")
-
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json",
-            }
-            body = {
-                "coordinates": coordinates,
-                "elevation": True,
-                "instructions": False,
-                "format": "geojson",
-            }
-
-            response = requests.post(
-                "https://api.openrouteservice.org"
-                f"/v2/directions/{profile}/geojson",
-                headers=headers,
-                data=json.dumps(body),
-                timeout=30,
-            )
-
-            if response.status_code == 200:
-                route_data = response.json()
-                if "features" in route_data and route_data["features"]:
-                    geometry = route_data["features"][0]["geometry"][
-                        "coordinates"
-                    ]
-                    for coord in geometry:
-                        if len(coord) >= 3:
-                            track_point = gpx.GPXTrackPoint(
-                                latitude=coord[1],
-                                longitude=coord[0],
-                                elevation=coord[2],
-                            )
-                        else:
-                            track_point = gpx.GPXTrackPoint(
-                                latitude=coord[1], longitude=coord[0]
-                            )
-                        gpx_segment.points.append(track_point)
-            else:
-                for point in points:
-                    gpx_segment.points.append(
-                        gpx.GPXTrackPoint(
-                            latitude=float(point.latitude),
-                            longitude=float(point.longitude),
-                        )
-                    )
-        else:
-            for point in points:
-                gpx_segment.points.append(
-                    gpx.GPXTrackPoint(
-                        latitude=float(point.latitude),
-                        longitude=float(point.longitude),
-                    )
+    geometry = RouteGeometryService.get_route_path(route, points)
+    if geometry:
+        for coord in geometry:
+            gpx_segment.points.append(
+                gpx.GPXTrackPoint(
+                    latitude=coord[1],
+                    longitude=coord[0],
+                    elevation=coord[2],
                 )
-    except Exception:
+            )
+    else:
         for point in points:
             gpx_segment.points.append(
                 gpx.GPXTrackPoint(
@@ -1975,52 +2061,9 @@ def export_kml(request, route_id):
     points = route.points.all().order_by("order")
 
     route_coordinates = []
-    try:
-        from django.conf import settings
-
-        api_key = getattr(settings, "OPENROUTESERVICE_API_KEY", None)
-
-        if api_key and len(points) >= 2:
-            coordinates = [
-                [float(p.longitude), float(p.latitude)] for p in points
-            ]
-            profile_map = {
-                "walking": "foot-walking",
-                "cycling": "cycling-regular",
-                "driving": "driving-car",
-            }
-            profile = profile_map.get(route.route_type, "foot-walking")
-
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json",
-            }
-            body = {
-                "coordinates": coordinates,
-                "elevation": False,
-                "instructions": False,
-                "format": "geojson",
-            }
-
-            response = requests.post(
-                "https://api.openrouteservice.org"
-                f"/v2/directions/{profile}/geojson",
-                headers=headers,
-                data=json.dumps(body),
-                timeout=30,
-            )
-
-            if response.status_code == 200:
-                route_data = response.json()
-                if "features" in route_data and route_data["features"]:
-                    geometry = route_data["features"][0]["geometry"][
-                        "coordinates"
-                    ]
-                    route_coordinates = [
-                        f"{coord[0]},{coord[1]},0" for coord in geometry
-                    ]
-    except Exception:
-        pass
+    geometry = RouteGeometryService.get_route_path(route, points)
+    if geometry:
+        route_coordinates = [f"{coord[0]},{coord[1]},0" for coord in geometry]
 
     if not route_coordinates:
         route_coordinates = [
@@ -2096,58 +2139,7 @@ def export_geojson(request, route_id):
     route = get_object_or_404(Route, id=route_id)
     points = route.points.all().order_by("order")
 
-    route_coordinates = []
-    try:
-        from django.conf import settings
-
-        api_key = getattr(settings, "OPENROUTESERVICE_API_KEY", None)
-
-        if api_key and len(points) >= 2:
-            coordinates = [
-                [float(p.longitude), float(p.latitude)] for p in points
-            ]
-            profile_map = {
-                "walking": "foot-walking",
-                "cycling": "cycling-regular",
-                "driving": "driving-car",
-            }
-            profile = profile_map.get(route.route_type, "foot-walking")
-
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json",
-            }
-            body = {
-                "coordinates": coordinates,
-                "elevation": True,
-                "instructions": False,
-                "format": "geojson",
-            }
-
-            response = requests.post(
-                "https://api.openrouteservice.org"
-                f"/v2/directions/{profile}/geojson",
-                headers=headers,
-                data=json.dumps(body),
-                timeout=30,
-            )
-
-            if response.status_code == 200:
-                route_data = response.json()
-                if "features" in route_data and route_data["features"]:
-                    geometry = route_data["features"][0]["geometry"][
-                        "coordinates"
-                    ]
-                    route_coordinates = [
-                        [
-                            float(coord[0]),
-                            float(coord[1]),
-                            float(coord[2]) if len(coord) > 2 else 0,
-                        ]
-                        for coord in geometry
-                    ]
-    except Exception:
-        pass
+    route_coordinates = RouteGeometryService.get_route_path(route, points)
 
     if not route_coordinates:
         route_coordinates = [
@@ -2248,6 +2240,7 @@ def save_point(request, point_id=None):
             point.tags = []
 
         point.save()
+        RouteGeometryService.update_route_geometry(route)
 
         existing_photos_json = request.POST.get("existing_photos_json", "[]")
         try:
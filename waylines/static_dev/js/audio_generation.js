@@ -142,22 +142,33 @@ class AudioGenerationManager {
             const language = document.getElementById('ai-language-select')?.value || 'ru-RU';
             const csrfToken = this.getCsrfToken();
 
+            const options = {
+                text: text,
+                voice_type: voice,
+                language: language
+            };
+
+            // The preview starts playing with the first synthesized chunk;
+            // the point audio is queued once it has been fetched and is
+            // served from the TTS cache.
+            await this.playStreamingPreview(options, csrfToken);
+
             const response = await fetch(`/api/ai-audio/generate/${this.currentPointId}/`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': csrfToken
                 },
-                body: JSON.stringify({
-                    text: text,
-                    voice_type: voice,
-                    language: language
-                })
+                body: JSON.stringify(options)
             });
 
-            const data = await response.json();
+            let data = await response.json();
+
+            if (response.ok && data.status_url) {
+                data = await this.waitForGeneration(data.status_url);
+            }
             
-            if (response.ok && data.status === 'success') {
+            if (response.ok && data.status === 'completed') {
                 this.audioUrl = data.audio_url;
                 const filename = `AI-audio-guide_${new Date().toLocaleDateString('ru-RU')}.mp3`;
                 
@@ -181,6 +192,54 @@ class AudioGenerationManager {
         }
     }
 
+    async playStreamingPreview(options, csrfToken) {
+        if (!this.audioElement) return;
+        try {
+            const response = await fetch('/api/ai-audio/generate-temp-audio/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfToken
+                },
+                body: JSON.stringify({...options, stream: true})
+            });
+            const data = await response.json();
+            if (!response.ok || !data.audio_url) return;
+
+            const audio = this.audioElement;
+            const fetched = new Promise(resolve => {
+                const done = () => {
+                    if (audio.networkState !== HTMLMediaElement.NETWORK_LOADING) {
+                        audio.removeEventListener('suspend', done);
+                        audio.removeEventListener('ended', done);
+                        audio.removeEventListener('error', done);
+                        resolve();
+                    }
+                };
+                audio.addEventListener('suspend', done);
+                audio.addEventListener('ended', done);
+                audio.addEventListener('error', done);
+                setTimeout(resolve, 60000);
+            });
+            audio.src = data.audio_url;
+            audio.play().catch(() => {});
+            await fetched;
+        } catch (error) {
+            // Without a preview the point audio is still generated.
+        }
+    }
+
+    async waitForGeneration(statusUrl) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            if (!response.ok || data.status === 'completed' || data.status === 'failed') {
+                return data;
+            }
+        }
+    }
+
     showAudioPlayer(audioUrl, filename = 'Point audio guide') {
         document.getElementById('point-audio-player').style.display = 'block';
         document.getElementById('point-audio-recorder').style.display = 'none';
@@ -190,7 +249,14 @@ class AudioGenerationManager {
         document.getElementById('enable-audio-guide').checked = true;
         
         if (this.audioElement) {
-            this.audioElement.src = audioUrl;
+            if (this.audioElement.paused) {
+                this.audioElement.src = audioUrl;
+            } else {
+                // Let the streamed preview finish before switching over.
+                this.audioElement.addEventListener('ended', () => {
+                    this.audioElement.src = audioUrl;
+                }, {once: true});
+            }
             this.setupAudioPlayerControls();
         }
         
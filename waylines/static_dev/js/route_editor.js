@@ -373,6 +373,8 @@ class RouteEditor {
         const coordinates = this.points.map(point => [point.lng, point.lat]);
         const profiles = { walking: 'foot-walking', driving: 'driving-car', cycling: 'cycling-regular' };
         const profile = profiles[this.routeType] || 'foot-walking';
+        const optimize = this.optimizeOnBuild === true;
+        this.optimizeOnBuild = false;
 
         const response = await fetch('/routes/api/build-route/', {
             method: 'POST',
@@ -380,21 +382,31 @@ class RouteEditor {
                 'Content-Type': 'application/json',
                 'X-CSRFToken': this.getCSRFToken(),
             },
-            body: JSON.stringify({ coordinates, profile })
+            body: JSON.stringify({ coordinates, profile, optimize })
         });
 
+        const data = await response.json();
+        if (optimize && data.waypoint_order) {
+            this.applyWaypointOrder(data.waypoint_order);
+        }
         if (!response.ok) {
-            const err = await response.json();
-            throw new Error(err.error || 'Failed to build route');
+            throw new Error(data.error || 'Failed to build route');
         }
-
-        const data = await response.json();
         if (data.features && data.features[0]?.geometry) {
             return data.features[0].geometry.coordinates.map(coord => [coord[1], coord[0]]);
         }
         throw new Error('No route geometry');
     }
 
+    applyWaypointOrder(order) {
+        this.points = order.map(index => this.points[index]);
+        this.markers.forEach(marker => this.map.removeLayer(marker));
+        this.markers = this.points.map((point, index) => this.createMarker(point, index).addTo(this.map));
+        this.updateStats();
+        this.updatePointsList();
+        this.showToast('Маршрут оптимизирован!', 'success');
+    }
+
     buildStraightRoute() {
         if (this.routeLine) {
             this.map.removeLayer(this.routeLine);
@@ -1462,18 +1474,8 @@ class RouteEditor {
             return;
         }
         this.saveToHistory();
-        const firstPoint = this.points[0];
-        const otherPoints = this.points.slice(1, -1);
-        const lastPoint = this.points[this.points.length - 1];
-        otherPoints.sort((a, b) => {
-            const distA = this.calculateDistance(firstPoint.lat, firstPoint.lng, a.lat, a.lng);
-            const distB = this.calculateDistance(firstPoint.lat, firstPoint.lng, b.lat, b.lng);
-            return distA - distB;
-        });
-        this.points = [firstPoint, ...otherPoints, lastPoint];
-        this.updateMap();
+        this.optimizeOnBuild = true;
         await this.buildRoute();
-        this.showToast('Маршрут оптимизирован!', 'success');
     }
 
     showResetConfirm() {
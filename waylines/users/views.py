@@ -10,7 +10,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
 from django.utils.translation import gettext
 
-from routes.models import Route, RouteFavorite
+from interactions.models import Favorite
+from routes.models import Route
 from users.forms import UserRegistrationForm
 from users.models import Friendship, UserProfile, User
 
@@ -288,7 +289,7 @@ def profile(request):
         {
             "profile": profile,
             "routes_count": user_routes.count(),
-            "favorites_count": RouteFavorite.objects.filter(
+            "favorites_count": Favorite.objects.filter(
                 user=request.user
             ).count(),
             "total_distance": total_distance,
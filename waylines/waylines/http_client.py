@@ -0,0 +1,192 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = (5, 30)
+MAX_RETRY_AFTER = 10
+
+
+class OutboundError(Exception):
+    """An outbound request was refused before reaching the network."""
+
+
+class CircuitOpenError(OutboundError):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling a host after repeated failures.
+
+    After ``threshold`` consecutive failed requests the circuit opens
+    and requests fail at once. Once ``reset_timeout`` seconds have
+    passed a single trial request is let through; its outcome closes
+    the circuit or opens it again.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            if self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release_trial(self):
+        """Let another trial through when one ended without an outcome."""
+        with self._lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class _Host:
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.HTTP_POOL_SIZE
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.slots = threading.BoundedSemaphore(
+            settings.HTTP_MAX_CONCURRENCY_PER_HOST
+        )
+        self.breaker = CircuitBreaker(
+            settings.HTTP_CIRCUIT_THRESHOLD, settings.HTTP_CIRCUIT_RESET
+        )
+
+
+class OutboundClient:
+    """Pooled HTTP client shared by every call to an external API.
+
+    Each host gets a keep-alive session, a cap on concurrent requests,
+    retries with jittered exponential backoff on 429/5xx and network
+    errors, and a circuit breaker, so a degraded API makes callers
+    fail fast instead of tying up workers.
+    """
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        name = urlsplit(url).netloc
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = _Host()
+            return self._hosts[name]
+
+    def request(self, method, url, retries=None, **kwargs):
+        host = self.host(url)
+        if retries is None:
+            retries = settings.HTTP_RETRIES
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+        # The breaker counts logical requests, not attempts, and a
+        # half-open trial covers all of its retries.
+        if not host.breaker.allow():
+            raise CircuitOpenError(f"{urlsplit(url).netloc} is failing")
+        succeeded = None
+        try:
+            response = self._send(host, method, url, retries, **kwargs)
+            succeeded = response.status_code not in RETRY_STATUSES
+            return response
+        except requests.RequestException:
+            succeeded = False
+            raise
+        finally:
+            if succeeded is None:
+                host.breaker.release_trial()
+            elif succeeded:
+                host.breaker.record_success()
+            else:
+                host.breaker.record_failure()
+
+    def _send(self, host, method, url, retries, **kwargs):
+        for attempt in range(retries + 1):
+            if not host.slots.acquire(timeout=settings.HTTP_QUEUE_TIMEOUT):
+                raise OutboundError(
+                    f"Too many concurrent requests to {urlsplit(url).netloc}"
+                )
+            try:
+                response = host.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"{method} {url} failed: {e}, retrying")
+                delay = None
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == retries
+                ):
+                    return response
+                logger.warning(
+                    f"{method} {url} returned {response.status_code}, "
+                    f"retrying"
+                )
+                delay = self._retry_after(response)
+                response.close()
+            finally:
+                host.slots.release()
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    @staticmethod
+    def _backoff(attempt):
+        ceiling = settings.HTTP_RETRY_BACKOFF * 2**attempt
+        return random.uniform(ceiling / 2, ceiling)
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+        return min(max(delay, 0), MAX_RETRY_AFTER)
+
+
+client = OutboundClient()
+
+
+def get(url, **kwargs):
+    return client.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return client.post(url, **kwargs)
@@ -65,6 +65,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "waylines.wsgi.application"
+ASGI_APPLICATION = "waylines.asgi.application"
 
 DATABASES = {
     "default": {
@@ -73,9 +74,66 @@ DATABASES = {
     }
 }
 
+# Use a backend shared by all workers (database, Redis, Memcached) when
+# running several processes: cache deletes invalidate map cluster tiles
+# and request coalescing works across them. The routes.E001 check
+# refuses a process-local cache when WEB_CONCURRENCY is above one.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CHANNEL_LAYER_BACKEND", "channels.layers.InMemoryChannelLayer"
+        ),
+    }
+}
+if os.getenv("CHANNEL_LAYER_HOSTS"):
+    CHANNEL_LAYERS["default"]["CONFIG"] = {
+        "hosts": os.getenv("CHANNEL_LAYER_HOSTS").split(",")
+    }
+
 YANDEX_API_KEY = os.getenv("YANDEX_API_KEY")
 YANDEX_FOLDER_ID = os.getenv("YANDEX_FOLDER_ID")
 OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
+ROUTING_BACKEND = os.getenv("ROUTING_BACKEND", "auto")
+OFFLINE_GRAPH_PATH = os.getenv(
+    "OFFLINE_GRAPH_PATH", str(BASE_DIR / "data" / "osm_graph.bin")
+)
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_MAX_CONCURRENCY_PER_HOST = int(
+    os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", "8")
+)
+HTTP_QUEUE_TIMEOUT = float(os.getenv("HTTP_QUEUE_TIMEOUT", "5"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+HTTP_CIRCUIT_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_THRESHOLD", "5"))
+HTTP_CIRCUIT_RESET = float(os.getenv("HTTP_CIRCUIT_RESET", "30"))
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "35"))
+
+AUDIO_WORKER_IN_PROCESS = (
+    os.getenv("AUDIO_WORKER_IN_PROCESS", "True") == "True"
+)
+AUDIO_WORKER_CONCURRENCY = int(os.getenv("AUDIO_WORKER_CONCURRENCY", "2"))
+AUDIO_JOB_MAX_ATTEMPTS = int(os.getenv("AUDIO_JOB_MAX_ATTEMPTS", "3"))
+AUDIO_JOBS_PER_MINUTE = int(os.getenv("AUDIO_JOBS_PER_MINUTE", "0"))
+TTS_CACHE_TEMP_MAX_BYTES = int(
+    os.getenv("TTS_CACHE_TEMP_MAX_BYTES", str(200 * 1024 * 1024))
+)
+DESCRIPTION_CACHE_TTL = int(
+    os.getenv("DESCRIPTION_CACHE_TTL", str(30 * 24 * 60 * 60))
+)
+DESCRIPTION_CACHE_GEOHASH_PRECISION = int(
+    os.getenv("DESCRIPTION_CACHE_GEOHASH_PRECISION", "7")
+)
 
 
 AUTH_PASSWORD_VALIDATORS = [
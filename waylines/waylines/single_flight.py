@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+RESULT_TTL = 60
+
+
+def flight_key(endpoint, payload):
+    """Key for a call to ``endpoint`` with a JSON-serializable payload."""
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return f"{endpoint}:{hashlib.sha256(body.encode()).hexdigest()}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one upstream request.
+
+    Callers in the same process wait for the first one and share its
+    result or exception. Across processes the leader holds a lock in
+    the default cache and publishes its result there; other workers
+    poll for it, and take over if the leader fails or the wait exceeds
+    ``SINGLE_FLIGHT_TIMEOUT``. That only reaches other workers when
+    the cache is shared: with the default LocMemCache each process
+    coalesces on its own, which is why the routes.E001 system check
+    refuses a process-local cache when ``WEB_CONCURRENCY`` is above 1.
+    """
+
+    def __init__(self, namespace="single-flight"):
+        self.namespace = namespace
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_shared(self, key, fn):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        lock_key = f"{self.namespace}:lock:{digest}"
+        result_key = f"{self.namespace}:result:{digest}"
+        timeout = settings.SINGLE_FLIGHT_TIMEOUT
+        deadline = time.monotonic() + timeout
+
+        while True:
+            if cache.add(lock_key, True, timeout):
+                cache.delete(result_key)
+                try:
+                    result = fn()
+                    # Wrapped so that a None result is still published.
+                    cache.set(result_key, (result,), RESULT_TTL)
+                    return result
+                finally:
+                    cache.delete(lock_key)
+
+            while time.monotonic() < deadline:
+                shared = cache.get(result_key)
+                if shared is not None:
+                    return shared[0]
+                if cache.get(lock_key) is None:
+                    break
+                time.sleep(POLL_INTERVAL)
+            else:
+                logger.warning(f"Gave up waiting for in-flight {key}")
+                return fn()
+
+            shared = cache.get(result_key)
+            if shared is not None:
+                return shared[0]
+
+
+flights = SingleFlight()
+
+
+def do(key, fn):
+    return flights.do(key, fn)